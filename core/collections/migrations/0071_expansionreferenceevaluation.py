@@ -0,0 +1,34 @@
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collections', '0070_alter_expansion_parameters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpansionReferenceEvaluation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checksum', models.CharField(max_length=255)),
+                ('concept_ids', django.contrib.postgres.fields.ArrayField(
+                    base_field=models.BigIntegerField(), blank=True, default=list, size=None)),
+                ('mapping_ids', django.contrib.postgres.fields.ArrayField(
+                    base_field=models.BigIntegerField(), blank=True, default=list, size=None)),
+                ('expansion', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='reference_evaluations',
+                    to='collections.expansion')),
+                ('reference', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='+',
+                    to='collections.collectionreference')),
+            ],
+            options={
+                'db_table': 'collection_expansion_reference_evaluations',
+                'unique_together': {('expansion', 'reference')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concepts', '0086_concepthierarchyclosure'),
+        ('mappings', '0059_mapping_head_parent_updated'),
+        ('collections', '0071_expansionreferenceevaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluatedConcept',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('concept', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='concepts.concept')),
+                ('evaluation', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, to='collections.expansionreferenceevaluation')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EvaluatedMapping',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mapping', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mappings.mapping')),
+                ('evaluation', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, to='collections.expansionreferenceevaluation')),
+            ],
+        ),
+        # evaluations are reused only when unchanged, those without members are evaluated again on the next seed
+        migrations.RunSQL('DELETE FROM collection_expansion_reference_evaluations', migrations.RunSQL.noop),
+        migrations.RemoveField(
+            model_name='expansionreferenceevaluation',
+            name='concept_ids',
+        ),
+        migrations.RemoveField(
+            model_name='expansionreferenceevaluation',
+            name='mapping_ids',
+        ),
+        migrations.AddField(
+            model_name='expansionreferenceevaluation',
+            name='concepts',
+            field=models.ManyToManyField(
+                related_name='+', through='collections.EvaluatedConcept', to='concepts.concept'),
+        ),
+        migrations.AddField(
+            model_name='expansionreferenceevaluation',
+            name='mappings',
+            field=models.ManyToManyField(
+                related_name='+', through='collections.EvaluatedMapping', to='mappings.mapping'),
+        ),
+    ]
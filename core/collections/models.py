@@ -4,9 +4,9 @@ from celery_once import AlreadyQueued
 from dirtyfields import DirtyFieldsMixin
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
-from django.core.exceptions import ValidationError
-from django.db import models, transaction
-from django.db.models import UniqueConstraint, F, QuerySet, Max
+from django.core.exceptions import ValidationError, EmptyResultSet
+from django.db import models, transaction, connection
+from django.db.models import UniqueConstraint, F, QuerySet, Max, Exists, OuterRef
 from django.utils import timezone
 from django.utils.functional import cached_property
 from pydash import get, compact
@@ -19,19 +19,22 @@ from core.collections.constants import (
 from core.collections.parsers import CollectionReferenceParser
 from core.collections.translators import CollectionReferenceTranslator
 from core.collections.utils import is_concept, is_mapping
+from core.common.checksums import Checksum
 from core.common.constants import (
     ACCESS_TYPE_VIEW, ACCESS_TYPE_EDIT,
     ES_REQUEST_TIMEOUT, ES_REQUEST_TIMEOUT_ASYNC, HEAD, ALL, EXCLUDE_WILDCARD_SEARCH_PARAM, EXCLUDE_FUZZY_SEARCH_PARAM,
     SEARCH_MAP_CODES_PARAM, INCLUDE_SEARCH_META_PARAM, VERBOSE_PARAM)
 from core.common.es import ESScript
+from core.common.m2m import M2MWriter
 from core.common.models import ConceptContainerModel, BaseResourceModel
 from core.common.search import CustomESSearch
 from core.common.tasks import seed_children_to_expansion, batch_index_resources, index_expansion_concepts, \
     index_expansion_mappings, readd_references_to_expansion_on_references_removal, resolve_url_registry_entries
 from core.common.utils import drop_version, to_owner_uri, generate_temp_version, es_id_in, \
     get_resource_class_from_resource_name, to_snake_case, \
-    es_to_pks, batch_qs, split_list_by_condition, decode_string, is_canonical_uri, encode_string, \
-    get_truthy_values, get_falsy_values, get_current_authorized_user, to_camel_case, to_parent_kwargs_from_uri
+    es_to_pks, keyset_batches, split_list_by_condition, decode_string, is_canonical_uri, encode_string, \
+    get_truthy_values, get_falsy_values, get_current_authorized_user, to_camel_case, to_parent_kwargs_from_uri, \
+    bump_response_cache_generation
 from core.concepts.constants import LOCALES_FULLY_SPECIFIED
 from core.concepts.models import Concept
 from core.mappings.models import Mapping
@@ -297,8 +300,8 @@ class Collection(DirtyFieldsMixin, ConceptContainerModel):
             for reference in head.references.all():
                 new_reference = reference.clone(last_resolved_at=timezone.now(), collection=self)
                 new_reference.save()
-                new_reference.concepts.set(reference.concepts.all())
-                new_reference.mappings.set(reference.mappings.all())
+                M2MWriter(new_reference.concepts).add(reference.concepts.all())
+                M2MWriter(new_reference.mappings).add(reference.mappings.all())
 
     @staticmethod
     def is_validation_necessary():
@@ -705,18 +708,11 @@ class CollectionReference(models.Model):
 
     def _apply_cascade(self, concept_queryset, mapping_queryset, system_version, valueset_versions):
         cascade_params = self.get_concept_cascade_params(system_version or valueset_versions[0])
-        concept_ids = set()
-        mapping_ids = set()
-        traversed = []
-
+        roots = {}
         for concept in concept_queryset:
-            concept_uri = drop_version(concept.uri)
-            if concept_uri in traversed:
-                continue
-            traversed.append(concept_uri)
-            result = concept.cascade(**cascade_params)
-            concept_ids.update(set(result['concepts'].values_list('id', flat=True)))
-            mapping_ids.update(set(result['mappings'].values_list('id', flat=True)))
+            roots.setdefault(drop_version(concept.uri), concept)
+
+        concept_ids, mapping_ids = Concept.cascade_many(roots.values(), **cascade_params)
 
         concept_ids.update(set(concept_queryset.values_list('id', flat=True)))
         mapping_ids.update(set(mapping_queryset.values_list('id', flat=True)))
@@ -910,10 +906,10 @@ class CollectionReference(models.Model):
                     search = search.filter("match", **{filter_def["property"]: filter_def["value"]})
                 else:
                     search = search.filter("match", **{to_snake_case(filter_def["property"]): filter_def["value"]})
-            for _queryset in batch_qs(queryset.order_by('id'), 500):
+            for batch_ids in keyset_batches(queryset, 500, flat=True):
                 # iterating on queryset because ES has max_clause limit default to 1024
-                search_within_queryset = es_id_in(search, list(_queryset.values_list('id', flat=True)))
-                pks += es_to_pks(search_within_queryset.params(request_timeout=ES_REQUEST_TIMEOUT_ASYNC))
+                search_within_queryset = es_id_in(search, batch_ids)
+                pks.extend(es_to_pks(search_within_queryset.params(request_timeout=ES_REQUEST_TIMEOUT_ASYNC)))
             if pks:
                 resource_versions = resource_klass.objects.filter(id__in=set(pks))
                 if self.version or self.valueset or self.is_static_transform:
@@ -1072,9 +1068,9 @@ class CollectionReference(models.Model):
 
         if self.id and get(self, '_fetched'):
             if self._concepts is not None and self._concepts.exists():
-                self.concepts.set(self._concepts)
+                M2MWriter(self.concepts).set(self._concepts)
             if self._mappings is not None and self._mappings.exists():
-                self.mappings.set(self._mappings)
+                M2MWriter(self.mappings).set(self._mappings)
 
     @property
     def is_concept(self):
@@ -1261,9 +1257,17 @@ class Expansion(BaseResourceModel):
         Uses a Painless script so existing values from other expansions are preserved.
         Falls back to full re-index for any docs not yet present in ES.
         """
-        if get(settings, 'TEST_MODE', False):
-            return
+        if not get(settings, 'TEST_MODE', False):
+            self.__append_collection_fields(queryset, document, **kwargs)
+        self.invalidate_response_cache()
+
+    def invalidate_response_cache(self):
+        # concepts/mappings lists and searches of the collection version are of its expansion's resources
+        scope = get(self, 'collection_version.response_cache_scope')
+        if scope:
+            bump_response_cache_generation(scope)
 
+    def __append_collection_fields(self, queryset, document, **kwargs):
         collection_fields = self._get_resources_index_collection_fields()
         from core.common.models import BaseModel  # avoid circular import at module level
         index_name = document()._index._name  # pylint: disable=protected-access
@@ -1357,7 +1361,7 @@ class Expansion(BaseResourceModel):
             if ids:
                 ids = compact(set(ids))
                 filters = {'id__in': ids}
-                queryset.set(queryset.exclude(**filters))
+                M2MWriter(queryset).remove(queryset.model.objects.filter(**filters))
                 batch_index_resources.apply_async((rel, filters), queue='indexing', permanent=False)
 
         process(self.concepts, 'concept', concept_ids)
@@ -1370,6 +1374,7 @@ class Expansion(BaseResourceModel):
                 readd_task(self.id, removed_reference_ids)
             else:
                 readd_task.apply_async((self.id, removed_reference_ids), queue='default', permanent=False)
+            self.invalidate_response_cache()
 
     def delete_expressions(self, expressions):  # Deprecated: Old way, must use delete_references instead
         concepts_filters = None
@@ -1388,10 +1393,10 @@ class Expansion(BaseResourceModel):
             mapping_expressions = [expression for expression in expressions if is_mapping(expression)]
             if concept_expressions:
                 concepts_filters = {'uri__in': concept_expressions}
-                self.concepts.set(self.concepts.exclude(**concepts_filters))
+                M2MWriter(self.concepts).remove(Concept.objects.filter(**concepts_filters))
             if mapping_expressions:
                 mappings_filters = {'uri__in': mapping_expressions}
-                self.mappings.set(self.mappings.exclude(**mappings_filters))
+                M2MWriter(self.mappings).remove(Mapping.objects.filter(**mappings_filters))
 
         if not get(settings, 'TEST_MODE', False):
             if concepts_filters:
@@ -1400,6 +1405,8 @@ class Expansion(BaseResourceModel):
             if mappings_filters:
                 batch_index_resources.apply_async(
                     ('mapping', mappings_filters), queue='indexing', permanent=False)
+        if concepts_filters or mappings_filters:
+            self.invalidate_response_cache()
 
     def add_references(  # pylint: disable=too-many-locals,too-many-statements,too-many-branches,too-many-arguments
             self, references, index=True, is_adding_all=False, attempt_reevaluate=True, force_reevaluate=False):
@@ -1410,6 +1417,7 @@ class Expansion(BaseResourceModel):
         evaluated_system_versions = []
         unresolved_repo_versions = []
         _system_version_cache = {}
+        _repo_version_checksums = {}
 
         if not is_adding_all:
             existing_exclude_refs = self.collection_version.references.exclude(
@@ -1423,6 +1431,9 @@ class Expansion(BaseResourceModel):
 
         # attempt_reevaluate is False for delete reference(s)
         should_reevaluate = force_reevaluate or (attempt_reevaluate and not self.is_auto_generated)
+        evaluations = {
+            evaluation.reference_id: evaluation for evaluation in self.reference_evaluations.all()
+        } if should_reevaluate else {}
 
         include_system_versions = []
         system_versions = self.parameters.get(ExpansionParameters.INCLUDE_SYSTEM)
@@ -1445,7 +1456,7 @@ class Expansion(BaseResourceModel):
                 return _system_version_cache[__cache_key]
             return None
 
-        def get_ref_results(ref):   # pylint: disable=too-many-branches,too-many-locals
+        def get_ref_system_versions(ref):   # pylint: disable=too-many-branches
             nonlocal explicit_valueset_versions
             nonlocal explicit_system_versions
             nonlocal evaluated_system_versions
@@ -1493,29 +1504,55 @@ class Expansion(BaseResourceModel):
             if ref_system_versions:
                 ref_system_versions = list(set(ref_system_versions))
 
-            _concepts = Concept.objects.none()
-            _mappings = Mapping.objects.none()
-
-            if should_reevaluate:
-                for _system_version in ref_system_versions:
-                    if ref.is_mapping:
-                        _mappings = _mappings.union(ref.get_mappings(_system_version))
-                    else:
-                        __concepts, __mappings = ref.get_concepts(_system_version)
-                        _concepts = Concept.objects.filter(
-                            id__in=_concepts.union(__concepts).values_list('id', flat=True)
-                        )
-                        _mappings = _mappings.union(__mappings)
-                    _mappings = Mapping.objects.filter(id__in=_mappings.values_list('id', flat=True))
-            else:
-                _concepts = ref.concepts.filter()
-                _mappings = ref.mappings.filter()
-
             if ref.is_versionless_expression:
                 evaluated_system_versions += ref_system_versions
             else:
                 explicit_system_versions += ref_system_versions
-            return _concepts, _mappings
+            return ref_system_versions
+
+        def get_ref_evaluation(ref):
+            """
+            What ref evaluated to, as its concepts and mappings: the reference itself when not reevaluating, its
+            evaluation in this expansion otherwise, evaluated again only when its checksum changed.
+            """
+            ref_system_versions = get_ref_system_versions(ref)
+            if not should_reevaluate:
+                return ref
+
+            checksum = ExpansionReferenceEvaluation.get_checksum(ref, ref_system_versions, _repo_version_checksums)
+            evaluation = evaluations.get(ref.id)
+            if checksum and evaluation and evaluation.checksum == checksum:
+                return evaluation
+
+            if not evaluation:
+                evaluation = ExpansionReferenceEvaluation.objects.create(expansion=self, reference=ref, checksum='')
+            concepts_writer, mappings_writer = M2MWriter(evaluation.concepts), M2MWriter(evaluation.mappings)
+            concepts_writer.clear()
+            mappings_writer.clear()
+            for _system_version in ref_system_versions:
+                if ref.is_mapping:
+                    mappings_writer.add(ref.get_mappings(_system_version))
+                else:
+                    __concepts, __mappings = ref.get_concepts(_system_version)
+                    concepts_writer.add(__concepts)
+                    mappings_writer.add(__mappings)
+            # only once its members are written, so that an interrupted evaluation is never reused
+            evaluation.checksum = checksum or ''
+            evaluation.save(update_fields=['checksum'])
+            return evaluation
+
+        def get_ref_results(ref):
+            evaluation = get_ref_evaluation(ref)
+            return evaluation.concepts.filter(), evaluation.mappings.filter()
+
+        if is_adding_all:
+            self.__apply_evaluations(
+                [get_ref_evaluation(reference) for reference in include_refs],
+                [(reference, get_ref_evaluation(reference)) for reference in exclude_refs],
+                ExpansionReferenceEvaluation if should_reevaluate else CollectionReference,
+                index
+            )
+            include_refs = exclude_refs = []
 
         for reference in include_refs:
             concepts, mappings = get_ref_results(reference)
@@ -1553,25 +1590,106 @@ class Expansion(BaseResourceModel):
         if unresolved_repo_versions:
             self.unresolved_repo_versions = unresolved_repo_versions
             self.save()
-        self.dedupe_resources()
+        if not is_adding_all:  # the delta of all the references is deduped already
+            self.dedupe_resources()
         if index:
             self.index_resources(index_concepts, index_mappings)
 
-    def dedupe_resources(self):
-        self.__dedupe_concepts()
-        self.__dedupe_mappings()
+    def __apply_evaluations(self, include, exclude, evaluation_model, index):  # pylint: disable=too-many-locals
+        """
+        Sets the concepts and mappings of the expansion to what the references evaluated to, include being their
+        evaluations and exclude [(reference, evaluation)], evaluations being evaluation_model (references or
+        ExpansionReferenceEvaluation). Their members stay in the through tables of the evaluations, the delta is
+        computed in SQL and only the rows added or removed are written.
+        """
+        include_ids = [evaluation.id for evaluation in include]
+        exclude_ids = [evaluation.id for reference, evaluation in exclude if reference.resource_version]
+        exclude_all_versions_ids = [
+            evaluation.id for reference, evaluation in exclude if not reference.resource_version]
+        for rel, resource_type in [(self.concepts, 'concept'), (self.mappings, 'mapping')]:
+            model = rel.model
+            field = evaluation_model._meta.get_field(f'{resource_type}s')  # pylint: disable=protected-access
+            members = field.remote_field.through.objects
+            evaluation_field, member_field = field.m2m_field_name(), field.m2m_reverse_field_name()
+            resources = model.objects.filter(
+                id__in=members.filter(**{f'{evaluation_field}__in': include_ids}).values(member_field)
+            ) if include_ids else model.objects.none()
+            if self.parameters:
+                resources = self.apply_parameters(resources, model is Concept)
+            if exclude_ids:
+                resources = resources.filter(~Exists(members.filter(
+                    **{f'{evaluation_field}__in': exclude_ids, member_field: OuterRef('id')})))
+            if exclude_all_versions_ids:
+                resources = resources.filter(~Exists(members.filter(**{
+                    f'{evaluation_field}__in': exclude_all_versions_ids,
+                    f'{member_field}__versioned_object_id': OuterRef('versioned_object_id')
+                })))
+            added, removed = self.__apply_delta(rel, resources)
+            if index:
+                if added:
+                    (self.index_concepts if resource_type == 'concept' else self.index_mappings)(added)
+                if removed:
+                    filters = {'id__in': removed}
+                    if get(settings, 'TEST_MODE', False):
+                        batch_index_resources(resource_type, filters)
+                    else:
+                        batch_index_resources.apply_async((resource_type, filters), queue='indexing', permanent=False)
 
-    def __dedupe_concepts(self):
-        self.concepts.set(self.concepts.order_by('versioned_object_id', '-id').distinct('versioned_object_id'))
+    def __apply_delta(self, rel, resources):
+        """
+        Sets rel (concepts or mappings) to the latest version of each versioned object of resources.
+        Only the rows not already in rel are inserted and only those not in the result are deleted, in one statement.
+        Returns (added ids, removed ids).
+        """
+        try:
+            sql, params = resources.order_by().values_list('id', 'versioned_object_id').query.sql_with_params()
+        except EmptyResultSet:
+            sql, params = 'SELECT NULL::bigint, NULL::bigint WHERE FALSE', []
+        writer = M2MWriter(rel)
+        through_table, expansion_column, resource_column = writer.table, writer.source_column, writer.target_column
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH target AS ('
+                f'SELECT DISTINCT ON (resource.versioned_object_id) resource.id '
+                f'FROM ({sql}) AS resource(id, versioned_object_id) '
+                f'ORDER BY resource.versioned_object_id, resource.id DESC), '
+                f'removed AS ('
+                f'DELETE FROM {through_table} WHERE {expansion_column} = %s '
+                f'AND {resource_column} NOT IN (SELECT id FROM target) RETURNING {resource_column}), '
+                f'added AS ('
+                f'INSERT INTO {through_table} ({expansion_column}, {resource_column}) SELECT %s, id FROM target '
+                f'ON CONFLICT DO NOTHING RETURNING {resource_column}) '
+                f'SELECT {resource_column}, TRUE FROM added UNION ALL SELECT {resource_column}, FALSE FROM removed',
+                [*params, self.id, self.id]
+            )
+            rows = cursor.fetchall()
+        return [_id for _id, is_added in rows if is_added], [_id for _id, is_added in rows if not is_added]
 
-    def __dedupe_mappings(self):
-        self.mappings.set(self.mappings.order_by('versioned_object_id', '-id').distinct('versioned_object_id'))
+    def dedupe_resources(self):
+        self.__dedupe(self.concepts)
+        self.__dedupe(self.mappings)
+
+    def __dedupe(self, rel):
+        """Deletes the rows of all but the latest version of each versioned object in rel (concepts or mappings)"""
+        writer = M2MWriter(rel)
+        table = rel.model._meta.db_table  # pylint: disable=protected-access
+        through_table, expansion_column, resource_column = writer.table, writer.source_column, writer.target_column
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {through_table} duplicate USING {table} resource, {through_table} other, '
+                f'{table} other_resource '
+                f'WHERE duplicate.{expansion_column} = %s AND resource.id = duplicate.{resource_column} '
+                f'AND other.{expansion_column} = %s AND other_resource.id = other.{resource_column} '
+                f'AND other_resource.versioned_object_id = resource.versioned_object_id '
+                f'AND other_resource.id > resource.id',
+                [self.id, self.id]
+            )
 
     def __include_resources(self, rel, resources, is_concept_queryset):
         resources_updated = False
         if resources.exists():
             resources_updated = self.apply_parameters(resources, is_concept_queryset)
-            rel.add(*resources_updated)
+            M2MWriter(rel).add(resources_updated)
         return resources_updated
 
     @staticmethod
@@ -1580,11 +1698,10 @@ class Expansion(BaseResourceModel):
         if resources.exists():
             if ref.resource_version:
                 resources_updated = resources
-                rel.remove(*resources)
             else:
                 resources_updated = klass.objects.filter(
                     versioned_object_id__in=resources.values_list('versioned_object_id', flat=True))
-                rel.remove(*resources_updated)
+            M2MWriter(rel).remove(resources_updated)
         return resources_updated
 
     def index_resources(self, concepts, mappings):
@@ -1716,6 +1833,55 @@ class Expansion(BaseResourceModel):
                 self.save(update_fields=['is_processing'])
 
 
+class EvaluatedConcept(models.Model):
+    evaluation = models.ForeignKey('collections.ExpansionReferenceEvaluation', on_delete=models.CASCADE)
+    concept = models.ForeignKey('concepts.Concept', on_delete=models.CASCADE)
+
+
+class EvaluatedMapping(models.Model):
+    evaluation = models.ForeignKey('collections.ExpansionReferenceEvaluation', on_delete=models.CASCADE)
+    mapping = models.ForeignKey('mappings.Mapping', on_delete=models.CASCADE)
+
+
+class ExpansionReferenceEvaluation(models.Model):
+    """
+    Concepts and mappings a reference evaluated to in an expansion, with the checksum of what it was evaluated from
+    (see get_checksum), so that re-evaluating the expansion only evaluates again the references whose checksum
+    changed. The checksum is blank while it is evaluated, and for evaluations not to be reused.
+    """
+    class Meta:
+        db_table = 'collection_expansion_reference_evaluations'
+        unique_together = ('expansion', 'reference')
+
+    expansion = models.ForeignKey(
+        'collections.Expansion', related_name='reference_evaluations', on_delete=models.CASCADE)
+    reference = models.ForeignKey('collections.CollectionReference', related_name='+', on_delete=models.CASCADE)
+    checksum = models.CharField(max_length=255)
+    concepts = models.ManyToManyField('concepts.Concept', related_name='+', through='collections.EvaluatedConcept')
+    mappings = models.ManyToManyField('mappings.Mapping', related_name='+', through='collections.EvaluatedMapping')
+
+    @classmethod
+    def get_checksum(cls, reference, system_versions, repo_version_checksums=None):
+        """
+        Checksum of the reference and the contents of the system versions it is evaluated against, the last child
+        update for HEAD, other versions being unchanged once created. None (not to be cached) for references to
+        valuesets and while a system version is processing.
+        """
+        if reference.valueset:
+            return None
+        repo_version_checksums = {} if repo_version_checksums is None else repo_version_checksums
+        versions = []
+        for version in system_versions:
+            if version.id not in repo_version_checksums:
+                repo_version_checksums[version.id] = None if version.is_processing else \
+                    f'{version.uri}|{version.last_child_update if version.is_head else version.updated_at}'
+            if repo_version_checksums[version.id] is None:
+                return None
+            versions.append(repo_version_checksums[version.id])
+        return Checksum.generate(
+            {'reference': f'{reference.id}|{reference.updated_at}', 'versions': sorted(versions)})
+
+
 class ExpansionParameters:
     ACTIVE = 'activeOnly'
     TEXT_FILTER = 'filter'
@@ -1800,9 +1966,9 @@ class ExpansionTextFilterParameter(ExpansionParameter):
                 CustomESSearch.get_exact_match_criterion(
                     self.value, document.get_match_phrase_attrs(), document.get_exact_match_attrs())
             )
-            for _queryset in batch_qs(queryset.order_by('id'), 500):
-                new_search = es_id_in(search, list(_queryset.values_list('id', flat=True)))
-                pks += es_to_pks(new_search.params(request_timeout=ES_REQUEST_TIMEOUT))
+            for batch_ids in keyset_batches(queryset, 500, flat=True):
+                new_search = es_id_in(search, batch_ids)
+                pks.extend(es_to_pks(new_search.params(request_timeout=ES_REQUEST_TIMEOUT)))
             queryset = klass.objects.filter(id__in=set(pks)) if pks else klass.objects.none()
 
         return queryset
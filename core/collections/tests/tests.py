@@ -9,7 +9,7 @@ from rest_framework.response import Response
 
 from core.collections.constants import SOURCE_TO_CONCEPTS, TRANSFORM_TO_RESOURCE_VERSIONS
 from core.collections.documents import CollectionDocument
-from core.collections.models import CollectionReference, Collection, Expansion
+from core.collections.models import CollectionReference, Collection, Expansion, ExpansionReferenceEvaluation
 from core.collections.models import ExpansionParameters, ExpansionSystemParameter
 from core.collections.parsers import CollectionReferenceExpressionStringParser, \
     CollectionReferenceSourceAllExpressionParser, CollectionReferenceOldStyleToExpandedStructureParser, \
@@ -1357,6 +1357,32 @@ class CollectionReferenceTest(OCLTestCase):
         self.assertTrue(concepts.filter(id=concept.id).exists())
         self.assertTrue(concepts.filter(id=concept_v1.id).exists())
 
+    @patch('core.concepts.models.Concept.cascade_many')
+    def test_apply_cascade_cascades_concepts_at_once(self, cascade_many_mock):
+        source = OrganizationSourceFactory()
+        concept1 = ConceptFactory(parent=source)
+        concept2 = ConceptFactory(parent=source)
+        cascaded = ConceptFactory(parent=source)
+        cascade_many_mock.return_value = ({concept1.id, concept2.id, cascaded.id}, set())
+
+        reference = CollectionReference(
+            system=source.uri, created_by=source.created_by, cascade={'method': 'sourcemappings'})
+        concept_queryset = Concept.objects.filter(
+            id__in=[concept1.id, concept1.get_latest_version().id, concept2.id]).order_by('id')
+
+        concepts, mappings = reference._apply_cascade(  # pylint: disable=protected-access
+            concept_queryset, Mapping.objects.none(), reference.resolve_system_version, []
+        )
+
+        self.assertEqual(
+            sorted(concepts.values_list('id', flat=True)),
+            sorted([concept1.id, concept1.get_latest_version().id, concept2.id, cascaded.id])
+        )
+        self.assertEqual(mappings.count(), 0)
+        cascade_many_mock.assert_called_once()
+        self.assertEqual(
+            [concept.id for concept in cascade_many_mock.call_args[0][0]], [concept1.id, concept2.id])
+
     def test_get_repo_and_resource_version_static_transform_head(self):
         source = OrganizationSourceFactory()
         concept = ConceptFactory(parent=source)
@@ -2329,6 +2355,38 @@ class ExpansionTest(OCLTestCase):
         self.assertEqual(expansion.concepts.count(), 0)
         self.assertEqual(expansion.mappings.count(), 0)
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_add_references_invalidates_cached_responses(self):
+        source = OrganizationSourceFactory()
+        concept = ConceptFactory(parent=source)
+        collection = OrganizationCollectionFactory()
+        expansion = ExpansionFactory(collection_version=collection, mnemonic='e1')
+        collection.expansion_uri = expansion.uri
+        collection.save()
+
+        response = self.client.get(collection.uri + 'concepts/?brief=true')
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+        response = self.client.get(collection.uri + 'concepts/?brief=true')
+        self.assertEqual(response['Cache-Status'], 'ocl-api; hit')
+
+        reference = CollectionReference(
+            expression=concept.uri, collection=collection, system=source.uri, code=concept.mnemonic)
+        reference.evaluate()
+        reference.save()
+        expansion.add_references(reference)
+
+        self.assertEqual(expansion.concepts.count(), 1)
+        response = self.client.get(collection.uri + 'concepts/?brief=true')
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+        response = self.client.get(collection.uri + 'concepts/?brief=true')
+        self.assertEqual(response['Cache-Status'], 'ocl-api; hit')
+
+        expansion.delete_references(reference)
+
+        self.assertEqual(expansion.concepts.count(), 0)
+        response = self.client.get(collection.uri + 'concepts/?brief=true')
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+
     def test_add_references_reference_without_system_resolves_none_system_version(self):
         collection = OrganizationCollectionFactory()
         valueset_collection = OrganizationCollectionFactory()
@@ -2350,6 +2408,70 @@ class ExpansionTest(OCLTestCase):
         self.assertEqual(expansion.mappings.count(), 0)
 
 
+    def test_seed_children_applies_delta_and_reuses_evaluations(self):
+        source = OrganizationSourceFactory()
+        concept1 = ConceptFactory(parent=source)
+        concept2 = ConceptFactory(parent=source)
+        stale_concept = ConceptFactory(parent=source)
+        collection = OrganizationCollectionFactory()
+        expansion = ExpansionFactory(collection_version=collection, mnemonic='e1')
+        collection.expansion_uri = expansion.uri
+        collection.save()
+        expansion.concepts.add(stale_concept)
+        references = []
+        for concept in [concept1, concept2]:
+            reference = CollectionReference(
+                expression=concept.uri, collection=collection, system=source.uri, code=concept.mnemonic)
+            reference.evaluate()
+            reference.save()
+            references.append(reference)
+
+        expansion.seed_children(index=False, force_reevaluate=True)
+
+        self.assertEqual(
+            set(expansion.concepts.values_list('versioned_object_id', flat=True)), {concept1.id, concept2.id})
+        self.assertEqual(
+            set(ExpansionReferenceEvaluation.objects.filter(
+                expansion=expansion).values_list('reference_id', flat=True)),
+            {reference.id for reference in references}
+        )
+        concept_ids = set(expansion.concepts.values_list('id', flat=True))
+        self.assertEqual(
+            set(ExpansionReferenceEvaluation.objects.filter(
+                expansion=expansion).values_list('concepts__versioned_object_id', flat=True)),
+            {concept1.id, concept2.id}
+        )
+        self.assertFalse(
+            ExpansionReferenceEvaluation.objects.filter(expansion=expansion, checksum='').exists())
+
+        with patch.object(
+                CollectionReference, 'get_concepts', autospec=True, side_effect=CollectionReference.get_concepts
+        ) as get_concepts_mock:
+            expansion.seed_children(index=False, force_reevaluate=True)
+            get_concepts_mock.assert_not_called()
+
+            references[1].save()  # updated_at changes the checksum
+            expansion.seed_children(index=False, force_reevaluate=True)
+            self.assertEqual(get_concepts_mock.call_count, 1)
+            self.assertEqual(get_concepts_mock.call_args[0][0].id, references[1].id)
+
+        self.assertEqual(set(expansion.concepts.values_list('id', flat=True)), concept_ids)
+
+    def test_dedupe_resources(self):
+        concept = ConceptFactory()
+        concept_version = concept.get_latest_version()
+        other_concept = ConceptFactory()
+        expansion = ExpansionFactory()
+        expansion.concepts.add(concept, concept_version, other_concept)
+
+        expansion.dedupe_resources()
+
+        self.assertEqual(
+            set(expansion.concepts.values_list('id', flat=True)),
+            {max(concept.id, concept_version.id), other_concept.id}
+        )
+
+
 class ExpansionParametersTest(OCLTestCase):
     def test_apply_active_only(self):
         ConceptFactory(id=1, retired=False, mnemonic='active')
@@ -44,7 +44,7 @@ from core.common.exceptions import Http409, Http405, Http400
 from core.common.mixins import (
     ConceptDictionaryCreateMixin, ListWithHeadersMixin, ConceptDictionaryUpdateMixin,
     ConceptContainerExportMixin,
-    ConceptContainerProcessingMixin)
+    ConceptContainerProcessingMixin, ConditionalRetrieveMixin)
 from core.common.permissions import (
     CanViewConceptDictionary, CanEditConceptDictionary, HasAccessToVersionedObject,
     CanViewConceptDictionaryVersion, HasOwnership
@@ -237,7 +237,8 @@ class CollectionLogoView(CollectionBaseView, BaseLogoView):
 
 
 class CollectionRetrieveUpdateDestroyView(
-    CollectionBaseView, ConceptDictionaryUpdateMixin, RetrieveAPIView, UpdateAPIView, TaskMixin
+    CollectionBaseView, ConceptDictionaryUpdateMixin, ConditionalRetrieveMixin, RetrieveAPIView, UpdateAPIView,
+    TaskMixin
 ):
     serializer_class = CollectionDetailSerializer
 
@@ -349,6 +349,41 @@ class ChecksumDiff:
     def print(self):
         print(self.pretty_print_dict(self.result))
 
+    def get_delta(self):
+        """
+        Returns what turns the older resources into the newer ones:
+        - new/changed/retired: DB ids of the newer resources to add
+        - removed: identities of resources no longer present
+        - base_ids: DB ids of the older resources that are replaced or removed
+        Resources whose checksums match but which point to another resource version are reported as changed,
+        so that a delta applied on top of an older export reproduces the newer export.
+        """
+        resources1_map = {**self.resources1_map_retired, **self.resources1_map}
+        resources2_map = {**self.resources2_map_retired, **self.resources2_map}
+        retired = self.retired
+
+        new = set()
+        changed = set()
+        for key, info in resources2_map.items():
+            if key in retired:
+                continue
+            previous = resources1_map.get(key)
+            if previous is None:
+                new.add(key)
+            elif previous['id'] != info['id'] or previous['checksums'] != info['checksums']:
+                changed.add(key)
+
+        removed = set(resources1_map.keys()) - set(resources2_map.keys())
+        replaced = changed | removed | set(retired.keys())
+
+        return {
+            'new': sorted(resources2_map[key]['id'] for key in new),
+            'changed': sorted(resources2_map[key]['id'] for key in changed),
+            'retired': sorted(info['id'] for info in retired.values()),
+            'removed': sorted(removed),
+            'base_ids': sorted(resources1_map[key]['id'] for key in replaced if key in resources1_map),
+        }
+
     def get_db_id_for(self, diff_key, identity):
         """Return the concrete resource DB id represented by a changelog diff key."""
         if diff_key == 'changed_retired':
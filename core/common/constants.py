@@ -79,6 +79,7 @@ MAPPING_LOOKUP_FROM_SOURCE = 'lookupFromSource'
 MAPPING_LOOKUP_TO_SOURCE = 'lookupToSource'
 LIMIT_PARAM = 'limit'
 OFFSET_PARAM = 'offset'
+CURSOR_PARAM = 'cursor'
 FHIR_LIMIT_PARAM = '_count'
 LIST_DEFAULT_LIMIT = 25
 CSV_DEFAULT_LIMIT = 1000
@@ -106,6 +107,7 @@ LATEST = 'latest'
 VERSION_HEADER = 'X-OCL-API-VERSION'
 REQUEST_USER_HEADER = 'X-OCL-REQUEST-USER'
 RESPONSE_TIME_HEADER = 'X-OCL-RESPONSE-TIME'
+CACHE_STATUS_HEADER = 'Cache-Status'
 REQUEST_URL_HEADER = 'X-OCL-REQUEST-URL'
 REQUEST_METHOD_HEADER = 'X-OCL-REQUEST-METHOD'
 DEPRECATED_API_HEADER = 'X-OCL-API-DEPRECATED'
@@ -0,0 +1,105 @@
+"""
+Embeddings of texts, for semantic (knn) search and $match.
+
+Vectors come from the sentence transformer (settings.LM), are computed in one batched encode call for all the texts
+not cached yet, and are cached by model name and text hash in memory (LRU, per process) and in redis (shared by the
+processes and across requests), so that terms repeated across rows and jobs skip inference.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class Embeddings:
+    CACHE_KEY_PREFIX = 'embeddings'
+    CACHE_TIMEOUT = settings.EMBEDDINGS_CACHE_TIMEOUT
+    LOCAL_CACHE_SIZE = settings.EMBEDDINGS_LOCAL_CACHE_SIZE
+    LOCAL_CACHE = OrderedDict()
+    LOCAL_CACHE_LOCK = threading.Lock()
+    MODEL = None
+    MODEL_LOCK = threading.Lock()
+
+    def __init__(self):
+        self.model_name = settings.LM_MODEL_NAME
+        self.vectors = {}
+
+    @classmethod
+    def get_model(cls):
+        if settings.LM:
+            return settings.LM
+        with cls.MODEL_LOCK:  # loaded once per process, not on every call
+            if cls.MODEL is None:
+                from sentence_transformers import SentenceTransformer
+                cls.MODEL = SentenceTransformer(settings.LM_MODEL_NAME)
+        return cls.MODEL
+
+    def get_cache_key(self, txt):
+        return f'{self.CACHE_KEY_PREFIX}:{self.model_name}:{hashlib.sha256(txt.encode()).hexdigest()}'
+
+    def get(self, txt):
+        return self.get_many([txt])[str(txt)]
+
+    def get_many(self, texts):
+        """
+        Vectors of texts, by text. What is not in this instance, the local cache or redis is encoded in a single
+        batch. Vectors got once stay in this instance, e.g. for all the rows of a $match request.
+        """
+        texts = list(dict.fromkeys(str(txt) for txt in texts))
+        if settings.ENV == 'ci':
+            return {txt: None for txt in texts}
+
+        missing = [txt for txt in texts if txt not in self.vectors]
+        if missing:
+            self.vectors.update(self.get_from_local_cache(missing))
+            missing = [txt for txt in missing if txt not in self.vectors]
+        if missing:
+            cached = self.get_from_cache(missing)
+            self.set_in_local_cache(cached)
+            self.vectors.update(cached)
+            missing = [txt for txt in missing if txt not in self.vectors]
+        if missing:
+            encoded = dict(zip(missing, self.get_model().encode(missing)))
+            self.set_in_cache(encoded)
+            self.set_in_local_cache(encoded)
+            self.vectors.update(encoded)
+
+        return {txt: self.vectors[txt] for txt in texts}
+
+    def get_from_local_cache(self, texts):
+        vectors = {}
+        with self.LOCAL_CACHE_LOCK:
+            for txt in texts:
+                key = self.get_cache_key(txt)
+                if key in self.LOCAL_CACHE:
+                    self.LOCAL_CACHE.move_to_end(key)
+                    vectors[txt] = self.LOCAL_CACHE[key]
+        return vectors
+
+    def set_in_local_cache(self, vectors):
+        if not self.LOCAL_CACHE_SIZE:
+            return
+        with self.LOCAL_CACHE_LOCK:
+            for txt, vector in vectors.items():
+                key = self.get_cache_key(txt)
+                self.LOCAL_CACHE[key] = vector
+                self.LOCAL_CACHE.move_to_end(key)
+            while len(self.LOCAL_CACHE) > self.LOCAL_CACHE_SIZE:
+                self.LOCAL_CACHE.popitem(last=False)
+
+    def get_from_cache(self, texts):
+        keys = {self.get_cache_key(txt): txt for txt in texts}
+        try:
+            cached = cache.get_many(list(keys))
+        except Exception:  # pylint: disable=broad-except
+            return {}  # cache unavailable, vectors are encoded
+        return {keys[key]: vector for key, vector in cached.items()}
+
+    def set_in_cache(self, vectors):
+        try:
+            cache.set_many(
+                {self.get_cache_key(txt): vector for txt, vector in vectors.items()}, timeout=self.CACHE_TIMEOUT)
+        except Exception:  # pylint: disable=broad-except
+            pass
@@ -1,4 +1,6 @@
-from django.db.models import URLField
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import URLField, Lookup, Func, Value, BigIntegerField, IntegerField
+from django.db.models.functions import Cast
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from rest_framework.fields import CharField
@@ -28,3 +30,32 @@ class URIField(URLField):
                 **kwargs,
             }
         )
+
+
+class AnyOf(Lookup):  # pylint: disable=abstract-method
+    """
+    field = ANY(array), e.g. Concept.objects.filter(AnyOf(F('id'), ids)).
+    Sends the values as a single array param, unlike IN that has one param per value.
+    """
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [list(value)]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} = ANY({rhs})', [*lhs_params, *rhs_params]
+
+
+class ArrayPosition(Func):  # pylint: disable=abstract-method
+    """
+    array_position(ids, expression), e.g. Concept.objects.order_by(ArrayPosition(ids, F('id'))) for the rows in the
+    order of ids. Sends the ids as a single array param, unlike a CASE WHEN with one param per id.
+    """
+    function = 'array_position'
+    output_field = IntegerField()
+
+    def __init__(self, ids, expression, **extra):
+        super().__init__(Cast(Value(list(ids)), ArrayField(BigIntegerField())), expression, **extra)
@@ -0,0 +1,156 @@
+"""
+Full reindex of a queryset in overlapping stages, instead of fetching, preparing and sending each batch in lock-step.
+"""
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from elasticsearch.helpers import BulkIndexError, streaming_bulk
+
+from core.common.utils import keyset_batches
+
+
+class IndexingPipeline:
+    """
+    Indexes a queryset in three stages, connected by bounded queues so that each stage overlaps the others and a slow
+    one holds back those before it (backpressure) instead of piling batches up in memory:
+      fetch   -- keyset batches of the queryset from the db
+      prepare -- documents of the batches (Document.prepare, including the embeddings), prepare_workers at a time
+      send    -- bulk requests to ES, with at most max_in_flight prepared batches waiting to be sent
+
+    The bulk size adapts to ES: halved when ES rejects documents with a 429 (too many requests), those being retried
+    after a backoff, and grown back while bulks go through.
+    Stages run in threads, each with its own db connection. The expensive part of preparing concept documents is
+    encoding their embeddings, which does not hold the GIL.
+    """
+    MIN_BULK_SIZE = 10
+    MAX_RETRIES = 8
+    INITIAL_BACKOFF = 1  # seconds
+    MAX_BACKOFF = 30  # seconds
+    TOO_MANY_REQUESTS = 429
+    _DONE = object()
+
+    def __init__(self, document, batch_size=500, prepare_workers=None, max_in_flight=None):
+        self.doc = document()
+        self.batch_size = batch_size
+        self.prepare_workers = prepare_workers or settings.INDEX_PIPELINE_PREPARE_WORKERS
+        self.max_in_flight = max_in_flight or settings.INDEX_PIPELINE_MAX_IN_FLIGHT
+        self.bulk_size = batch_size
+        self.fetched = queue.Queue(maxsize=self.prepare_workers)
+        self.prepared = queue.Queue(maxsize=self.max_in_flight)
+        self.stopped = threading.Event()
+        self.errors = []
+        self.indexed = 0
+
+    def run(self, queryset):
+        """Indexes queryset, returns the number of documents indexed. Raises the first error of any stage."""
+        threads = [threading.Thread(target=self.__in_thread, args=(self.fetch, queryset), daemon=True)]
+        threads += [
+            threading.Thread(target=self.__in_thread, args=(self.prepare, ), daemon=True)
+            for _ in range(self.prepare_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self.send()
+        except BaseException as ex:  # pylint: disable=broad-except
+            self.errors.append(ex)
+        finally:
+            self.stopped.set()
+            for thread in threads:
+                thread.join()
+        if self.errors:
+            raise self.errors[0]
+        return self.indexed
+
+    def __in_thread(self, stage, *args):
+        try:
+            stage(*args)
+        except BaseException as ex:  # pylint: disable=broad-except
+            self.errors.append(ex)
+            self.stopped.set()
+        finally:
+            connections.close_all()  # the db connections of this thread
+
+    def put(self, _queue, item):
+        """Waits for room in _queue, unless the pipeline is stopped. Returns False if stopped."""
+        while not self.stopped.is_set():
+            try:
+                _queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def take(self, _queue):
+        """Waits for an item of _queue, unless the pipeline is stopped. Returns _DONE if stopped."""
+        while not self.stopped.is_set():
+            try:
+                return _queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return self._DONE
+
+    def fetch(self, queryset):
+        try:
+            for batch in keyset_batches(queryset, self.batch_size):
+                if not self.put(self.fetched, batch):
+                    return
+        finally:
+            for _ in range(self.prepare_workers):
+                self.put(self.fetched, self._DONE)
+
+    def prepare(self):
+        try:
+            while True:
+                batch = self.take(self.fetched)
+                if batch is self._DONE:
+                    return
+                actions = list(self.doc._get_actions(batch, 'index'))  # pylint: disable=protected-access
+                if actions and not self.put(self.prepared, actions):
+                    return
+        finally:
+            self.put(self.prepared, self._DONE)
+
+    def send(self):
+        workers = self.prepare_workers
+        while workers:
+            actions = self.take(self.prepared)
+            if actions is self._DONE:
+                workers -= 1
+                continue
+            self.bulk(actions)
+
+    def bulk(self, actions):
+        kwargs = {'refresh': self.doc.django.auto_refresh} if self.doc.django.auto_refresh else {}
+        retries = 0
+        while actions:
+            rejected = []
+            errors = []
+            for action, (ok, item) in zip(actions, streaming_bulk(
+                    self.doc._get_connection(), actions, chunk_size=self.bulk_size,  # pylint: disable=protected-access
+                    raise_on_error=False, raise_on_exception=False, max_retries=0, **kwargs
+            )):
+                if ok:
+                    self.indexed += 1
+                elif self.get_status(item) == self.TOO_MANY_REQUESTS:
+                    rejected.append(action)
+                else:
+                    errors.append(item)
+            if errors:
+                raise BulkIndexError(f'{len(errors)} document(s) failed to index.', errors)
+            if rejected:
+                retries += 1
+                if retries > self.MAX_RETRIES:
+                    raise BulkIndexError(f'{len(rejected)} document(s) rejected by ES with 429.', rejected)
+                self.bulk_size = max(self.MIN_BULK_SIZE, self.bulk_size // 2)
+                time.sleep(min(self.INITIAL_BACKOFF * 2 ** (retries - 1), self.MAX_BACKOFF))
+            elif self.bulk_size < self.batch_size:
+                self.bulk_size = min(self.batch_size, self.bulk_size + max(self.batch_size // 10, 1))
+            actions = rejected
+
+    @staticmethod
+    def get_status(item):
+        return next(iter(item.values()), {}).get('status') if isinstance(item, dict) else None
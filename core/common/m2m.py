@@ -0,0 +1,80 @@
+"""
+Set based writes to many to many relations, straight from querysets, instead of rel.add/remove/set(*objects) which
+load every related object, check which rows exist and write them through the ORM.
+"""
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+
+
+class M2MWriter:
+    """
+    Writes the rows of the through table of a related manager (e.g. expansion.concepts, source.concepts) for the
+    resources of a queryset, in one statement each:
+      add    -- INSERT ... SELECT ... ON CONFLICT DO NOTHING, rows already there (even without a unique constraint on
+                the through table) are skipped
+      remove -- DELETE ... USING the queryset
+      set    -- remove what is not in the queryset, then add
+    As with bulk_create, no m2m_changed signal is sent, callers index what they write.
+    """
+    def __init__(self, manager):
+        through = manager.through._meta  # pylint: disable=protected-access
+        self.table = through.db_table
+        self.source_column = through.get_field(manager.source_field_name).column
+        self.target_column = through.get_field(manager.target_field_name).column
+        self.source_id = manager.instance.pk
+
+    @staticmethod
+    def get_queryset_sql(queryset):
+        """SQL of the ids of queryset, None if it can only be empty"""
+        try:
+            return queryset.order_by().values_list('pk', flat=True).query.sql_with_params()
+        except EmptyResultSet:
+            return None
+
+    def execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def add(self, queryset):
+        """Returns the number of rows inserted"""
+        query = self.get_queryset_sql(queryset)
+        if query is None:
+            return 0
+        sql, params = query
+        return self.execute(
+            f'INSERT INTO {self.table} ({self.source_column}, {self.target_column}) '
+            f'SELECT DISTINCT %s, resource.id FROM ({sql}) AS resource(id) '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {self.table} existing '
+            f'WHERE existing.{self.source_column} = %s AND existing.{self.target_column} = resource.id) '
+            f'ON CONFLICT DO NOTHING',
+            [self.source_id, *params, self.source_id]
+        )
+
+    def remove(self, queryset):
+        """Returns the number of rows deleted"""
+        query = self.get_queryset_sql(queryset)
+        if query is None:
+            return 0
+        sql, params = query
+        return self.execute(
+            f'DELETE FROM {self.table} USING ({sql}) AS resource(id) '
+            f'WHERE {self.table}.{self.source_column} = %s AND {self.table}.{self.target_column} = resource.id',
+            [*params, self.source_id]
+        )
+
+    def clear(self):
+        return self.execute(f'DELETE FROM {self.table} WHERE {self.source_column} = %s', [self.source_id])
+
+    def set(self, queryset):
+        """Returns (number of rows inserted, number of rows deleted)"""
+        query = self.get_queryset_sql(queryset)
+        if query is None:
+            return 0, self.clear()
+        sql, params = query
+        removed = self.execute(
+            f'DELETE FROM {self.table} WHERE {self.source_column} = %s '
+            f'AND {self.target_column} NOT IN (SELECT resource.id FROM ({sql}) AS resource(id))',
+            [self.source_id, *params]
+        )
+        return self.add(queryset), removed
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from core.concepts.documents import ConceptDocument
+from core.mappings.documents import MappingDocument
+
+
+class Command(BaseCommand):
+    help = 'put the brief/brief_fields_version fields in the mapping of existing concepts/mappings indexes, ' \
+           'to be run once before enabling ES_BRIEF_FROM_SOURCE'
+
+    FIELDS = ['brief', 'brief_fields_version']
+
+    def handle(self, *args, **options):
+        for document in [ConceptDocument, MappingDocument]:
+            index = document._index  # pylint: disable=protected-access
+            properties = document._doc_type.mapping.to_dict()['properties']  # pylint: disable=protected-access
+            index.put_mapping(properties={field: properties[field] for field in self.FIELDS})
+            self.stdout.write(f'{index._name}: put mapping of {", ".join(self.FIELDS)}')  # pylint: disable=protected-access
@@ -1,18 +1,23 @@
+import hashlib
+import json
 import logging
+from datetime import datetime
 from math import ceil
 from urllib import parse
-from urllib.parse import urlencode
 
 from celery.states import SUCCESS
+from django.conf import settings
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.db import transaction, models
-from django.db.models import Q, F, QuerySet
+from django.db.models import Q, F, QuerySet, Max
 from django.http import HttpResponseForbidden, Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import resolve, Resolver404
+from django.utils.cache import get_conditional_response
 from django.utils.functional import cached_property
+from django.utils.http import http_date
 from ocldev.checksum import Checksum
 from pydash import compact, get
 from rest_framework import status
@@ -23,14 +28,17 @@ from rest_framework.response import Response
 from core.common.constants import HEAD, ACCESS_TYPE_NONE, INCLUDE_FACETS, \
     LIST_DEFAULT_LIMIT, HTTP_COMPRESS_HEADER, CSV_DEFAULT_LIMIT, FACETS_ONLY, INCLUDE_RETIRED_PARAM, \
     SEARCH_STATS_ONLY, INCLUDE_SEARCH_STATS, UPDATED_BY_USERNAME_PARAM, CHECKSUM_STANDARD_HEADER, \
-    CHECKSUM_SMART_HEADER, SEARCH_LATEST_REPO_VERSION, SAME_STANDARD_CHECKSUM_ERROR, ACCESS_TYPE_VIEW, ACCESS_TYPE_EDIT
+    CHECKSUM_SMART_HEADER, SEARCH_LATEST_REPO_VERSION, SAME_STANDARD_CHECKSUM_ERROR, ACCESS_TYPE_VIEW, \
+    ACCESS_TYPE_EDIT, OFFSET_PARAM, CURSOR_PARAM, CACHE_STATUS_HEADER
 from core.common.permissions import HasPrivateAccess, HasOwnership, CanViewConceptDictionary, \
     CanViewConceptDictionaryVersion
 from .checksums import ChecksumModel
 from .exceptions import Http403
+from .fields import ArrayPosition
 from .utils import write_csv_to_s3, get_csv_from_s3, get_query_params_from_url_string, compact_dict_by_values, \
     to_owner_uri, parse_updated_since_param, get_export_service, to_int, get_truthy_values, generate_temp_version, \
-    canonical_url_to_url_and_version, decode_string, to_parent_kwargs_from_uri
+    canonical_url_to_url_and_version, decode_string, to_parent_kwargs_from_uri, get_response_cache_generations, \
+    generate_etag
 from ..concepts.constants import PERSIST_CLONE_ERROR
 from ..toggles.models import Toggle
 
@@ -41,7 +49,7 @@ TRUTHY = get_truthy_values()
 class CustomPaginator:
     def __init__(  # pylint: disable=too-many-arguments
             self, request, total_count, queryset, page_size, is_sliced=False, max_score=None, search_scores=None,
-            highlights=None
+            highlights=None, next_cursor=None
     ):
         self.request = request
         self.queryset = queryset
@@ -62,6 +70,7 @@ class CustomPaginator:
         self.max_score = max_score
         self.search_scores = search_scores or {}
         self.highlights = highlights or {}
+        self.next_cursor = next_cursor
 
     @property
     def current_page_number(self):
@@ -93,6 +102,13 @@ class CustomPaginator:
         query_params['page'] = str(self.current_page_number + 1)
         return self.__get_full_url() + '?' + query_params.urlencode()
 
+    def get_next_cursor_url(self):
+        query_params = self.__get_query_params()
+        query_params.pop('page', None)
+        query_params.pop(OFFSET_PARAM, None)
+        query_params[CURSOR_PARAM] = self.next_cursor
+        return self.__get_full_url() + '?' + query_params.urlencode()
+
     def get_current_page_url(self):
         query_params = self.__get_query_params()
         query_params['page'] = str(self.current_page_number)
@@ -117,7 +133,10 @@ class CustomPaginator:
             'pages': self.page_count,
             'page_number': self.page_number
         }
-        if self.has_next():
+        if self.next_cursor:
+            headers['next_cursor'] = self.next_cursor
+            headers['next'] = self.get_next_cursor_url()
+        elif self.has_next() and CURSOR_PARAM not in self.request.GET:
             headers['next'] = self.get_next_page_url()
         if self.has_previous():
             headers['previous'] = self.get_previous_page_url()
@@ -142,7 +161,72 @@ class CustomPaginator:
         return standard, smart
 
 
-class ListWithHeadersMixin(ListModelMixin):
+class ConditionalResponseMixin:
+    def can_respond_conditionally(self):
+        """
+        Only GET/HEAD requests of representations made of the requested resources alone can be answered from their
+        checksums, not those that include related resources (e.g. includeMappings, includeSummary).
+        """
+        return self.request.method in ['GET', 'HEAD'] and not any(
+            param.startswith('include') for param in self.request.query_params)
+
+    @staticmethod
+    def get_mapped_concepts_updated_at(results):
+        """
+        Latest updated_at of the from/to concepts of the mappings in results, whose representations also have their
+        names (from_concept_name_resolved/to_concept_name_resolved), None if there are none.
+        """
+        mappings = [result for result in results if hasattr(result, 'from_concept_id')]
+        concept_ids = compact({
+            concept_id for mapping in mappings for concept_id in [mapping.from_concept_id, mapping.to_concept_id]})
+        if not concept_ids:
+            return None
+        concept_model = type(mappings[0]).from_concept.field.related_model
+        return concept_model.objects.filter(id__in=concept_ids).aggregate(updated_at=Max('updated_at'))['updated_at']
+
+    def get_not_modified_response(self, etag, last_modified=None):
+        """304 Not Modified if the client already has the representation (If-None-Match/If-Modified-Since)."""
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None)
+        if response is not None:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class ConditionalRetrieveMixin(ConditionalResponseMixin):
+    """
+    Detail responses get an ETag from the resource's checksums and a Last-Modified, so that clients polling them
+    get a 304 Not Modified, before anything is serialized, when nothing has changed.
+    """
+    def get_etag_parts(self, instance):
+        parts = [get(instance, 'checksums') or {}, instance.updated_at]
+        if isinstance(instance, SourceChildMixin):
+            # representation also has the latest released version of the source and its property definitions
+            parts += [get(instance, 'latest_source_version.created_at'), get(instance, 'parent.updated_at')]
+        if hasattr(instance, 'from_concept_id'):
+            parts.append(self.get_mapped_concepts_updated_at([instance]))
+        return parts
+
+    def retrieve(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        instance = self.get_object()
+        if not self.can_respond_conditionally() or not get(
+                instance, f'checksums.{ChecksumModel.STANDARD_CHECKSUM_KEY}'):
+            return Response(self.get_serializer(instance).data)
+
+        parts = self.get_etag_parts(instance)
+        etag = generate_etag(request.get_full_path(), *parts)
+        last_modified = max(part for part in parts if isinstance(part, datetime))
+        response = self.get_not_modified_response(etag, last_modified)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class ListWithHeadersMixin(ListModelMixin, ConditionalResponseMixin):
     default_filters = {}
     object_list = None
     _max_score = None
@@ -150,117 +234,187 @@ class ListWithHeadersMixin(ListModelMixin):
     _highlights = None
     limit = LIST_DEFAULT_LIMIT
     document_model = None
+    RESPONSE_CACHE_VARY_HEADERS = [
+        INCLUDE_FACETS, SEARCH_LATEST_REPO_VERSION, INCLUDE_SEARCH_STATS, HTTP_COMPRESS_HEADER
+    ]
 
     def head(self, request, **kwargs):  # pylint: disable=unused-argument
         queryset = self.filter_queryset()
         res = Response()
-        res['num_found'] = get(self, 'total_count') or queryset.count()
+        res['num_found'] = get(self, 'total_count') or (
+            queryset.count() if isinstance(queryset, QuerySet) else len(queryset))  # hydrated search hits are a list
         return res
 
-    def __get_cached_data_if_any(self, request):
-        base_path = request.get_full_path()
-        params = request.query_params.copy()
-        params.pop('verbose', None)
-        params.pop('brief', None)
-        query_string = urlencode(params, doseq=True)
-        parent = self.parent_resource
-
-        key_body, key_headers = parent.get_concepts_cache_keys() if '/concepts' in base_path else (
-            parent.get_mappings_cache_keys())
-        if query_string:
-            key_body += '?' + query_string
-            key_headers += '?' + query_string
-
-        return key_body, cache.get(key_body) or None, key_headers, cache.get(key_headers) or None
-
-    def __can_cache(self):
-        return (self.should_perform_es_search() and self.is_repo_version_children_request_without_any_search() and
-                get(self, 'parent_resource.is_latest_version', False))
-
-    def list(self, request, *args, **kwargs):  # pylint:disable=too-many-locals,too-many-branches,too-many-statements
-        cache_key_body = None
-        cache_key_headers = None
-        data = None
+    def get_response_cache_key(self, request):
+        """
+        Key of the cached response of a GET concepts/mappings list, search or facets request, None if not cacheable.
+        It has the generations of the content it can be made of (see get_response_cache_generations), that go up on
+        every change, so a cached response is never served after something it was made of has changed.
+        """
+        params = request.query_params
+        if (
+                request.method != 'GET' or not get(settings, 'RESPONSE_CACHE_TIMEOUT') or
+                get(self, 'model.__name__') not in ['Concept', 'Mapping'] or
+                params.get('csv') or CURSOR_PARAM in params  # cursors are for a point in time that expires
+        ):
+            return None
+        repo_scope = get(self, 'parent_resource.response_cache_scope')
+        scopes = compact(['all', repo_scope])
+        if not repo_scope or not repo_scope.startswith('Source:'):
+            # collections are of concepts/mappings of any source, so are lists across repos
+            scopes.append('any')
+        try:
+            generations = get_response_cache_generations(*scopes)
+        except Exception:  # pylint: disable=broad-except
+            return None
+        key = {
+            'path': request.get_full_path(),
+            'headers': [request.META.get(header) for header in self.RESPONSE_CACHE_VARY_HEADERS],
+            'generations': generations,
+            # lists outside a repo are of the repos the user can access, those in a repo are checked for access first
+            'user': None if repo_scope else get(request, 'user.id'),
+            # facets of signed in users also have the updatedBy facet (see format_facets)
+            'authenticated': bool(get(request, 'user.is_authenticated')) if (
+                self.should_include_facets() or self.only_facets()) else None,
+        }
+        return 'response_cache:' + hashlib.md5(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        cache_key = self.get_response_cache_key(request)
+        if not cache_key:
+            return self.__list(request)
+
+        cached = None if request.query_params.get('_force_cache_clear') in TRUTHY else cache.get(cache_key)
+        if cached is not None:
+            etag = cached['headers'].get('ETag')
+            response = self.get_not_modified_response(etag) if etag else None
+            if response is None:
+                response = Response(cached['data'], headers=cached['headers'])
+            response[CACHE_STATUS_HEADER] = 'ocl-api; hit'
+            return response
+
+        response = self.__list(request)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {key: value for key, value in response.items() if key.lower() != 'content-type'}
+            cache.set(
+                cache_key, {'data': response.data, 'headers': headers}, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        response[CACHE_STATUS_HEADER] = 'ocl-api; fwd=miss'
+        return response
+
+    def __list(self, request):  # pylint:disable=too-many-locals,too-many-branches
         headers = {}
         sorted_list = []
         query_params = request.query_params.dict()
         is_csv = query_params.get('csv', False)
 
-        if not is_csv and request.method == 'GET' and self.__can_cache():
-            cache_key_body, data, cache_key_headers, headers = self.__get_cached_data_if_any(request)
-            if self.request.query_params.get('_force_cache_clear') in TRUTHY:
-                data = None
-
-        if not data:
-            search_string = query_params.get('type', None)
-            search_term = query_params.get('q', None)
-            if is_csv:
-                pattern = search_term
-                if pattern:
-                    query_params._mutable = True  # pylint: disable=protected-access
-                    query_params['q'] = "*" + search_term + "*"
-
-            if is_csv and not search_string:
-                return self.get_csv(request)
-
-            if self.only_facets():
-                data = {'facets': {'fields': self.get_facets()}}
-                if cache_key_body is not None:
-                    timeout = 60 * 60 * 24  # 1 day
-                    cache.set(cache_key_body, data, timeout=timeout)
-                    cache.set(cache_key_headers, headers, timeout=timeout)
-                return Response(data)
-            if self.only_search_stats() and search_term:
-                return Response(
-                    self.get_search_stats(
-                        get(self, '_source_versions', []), get(self, '_extra_filters', None)))
-
-            if self.object_list is None:
-                self.object_list = self.filter_queryset()
-
-            if is_csv and search_string:
-                klass = type(self.object_list[0])
-                queryset = klass.objects.filter(id__in=self.get_object_ids())
-                return self.get_csv(request, queryset)
-
-            # Skip pagination if compressed results are requested
-            compress = self.should_compress()
-
-            sorted_list = self.object_list
-
-            headers = {}
-            results = sorted_list
-            paginator = None
-
-            if not compress:
-                self.limit = to_int(self.limit, LIST_DEFAULT_LIMIT)
-                if not self.limit or int(self.limit) == 0 or int(self.limit) > 1000:
-                    if self.is_brief() and self.is_checksums() and self.kwargs.get('source') and get(
-                            self, 'model.__name__') in ['Concept', 'Mapping']:
-                        self.limit = 20000  # for checksums
-                    else:
-                        self.limit = LIST_DEFAULT_LIMIT
-                paginator = CustomPaginator(
-                    request=request, queryset=sorted_list, page_size=self.limit, total_count=self.total_count,
-                    is_sliced=self.is_sliced(), max_score=get(self, '_max_score'),
-                    search_scores=get(self, '_scores'), highlights=get(self, '_highlights')
-                )
-                headers = paginator.headers
-                results = paginator.current_page_results
-            data = self.serialize_list(results, paginator)
-            if cache_key_body is not None:
-                timeout = 60 * 60 * 24  # 1 day
-                cache.set(cache_key_body, data, timeout=timeout)
-                cache.set(cache_key_headers, headers, timeout=timeout)
+        search_string = query_params.get('type', None)
+        search_term = query_params.get('q', None)
+        if is_csv:
+            pattern = search_term
+            if pattern:
+                query_params._mutable = True  # pylint: disable=protected-access
+                query_params['q'] = "*" + search_term + "*"
+
+        if is_csv and not search_string:
+            return self.get_csv(request)
+
+        if self.only_facets():
+            return Response({'facets': {'fields': self.get_facets()}})
+        if self.only_search_stats() and search_term:
+            return Response(
+                self.get_search_stats(
+                    get(self, '_source_versions', []), get(self, '_extra_filters', None)))
+
+        if is_csv and search_string:
+            # model of the searched documents (self.model is the parent's on repo children views), the top hits are
+            # searched on their own, without the page of the list
+            klass = get(self, 'document_model.django.model') or self.model
+            ids = [int(_id) for _id in self.get_object_ids()]
+            queryset = klass.objects.filter(id__in=ids).order_by(ArrayPosition(ids, F('id')))
+            return self.get_csv(request, queryset)
+
+        if self.object_list is None:
+            self.object_list = self.filter_queryset()
+
+        # Skip pagination if compressed results are requested
+        compress = self.should_compress()
+
+        sorted_list = self.object_list
+
+        results = sorted_list
+        paginator = None
+
+        if not compress:
+            self.limit = to_int(self.limit, LIST_DEFAULT_LIMIT)
+            if not self.limit or int(self.limit) == 0 or int(self.limit) > 1000:
+                if self.is_brief() and self.is_checksums() and self.kwargs.get('source') and get(
+                        self, 'model.__name__') in ['Concept', 'Mapping']:
+                    self.limit = 20000  # for checksums
+                else:
+                    self.limit = LIST_DEFAULT_LIMIT
+            paginator = CustomPaginator(
+                request=request, queryset=sorted_list, page_size=self.limit, total_count=self.total_count,
+                is_sliced=self.is_sliced(), max_score=get(self, '_max_score'),
+                search_scores=get(self, '_scores'), highlights=get(self, '_highlights'),
+                next_cursor=get(self, '_next_cursor')
+            )
+            headers = paginator.headers
+            results = paginator.current_page_results
+            etag = self.get_list_etag(paginator, headers)
+            if etag:
+                not_modified = self.get_not_modified_response(etag)
+                if not_modified is not None:
+                    return not_modified
+                headers['ETag'] = etag
+        data = self.serialize_list(results, paginator)
 
         response = Response(data)
         if headers:
             for key, value in headers.items():
                 response[key] = value
-        if not headers and not self.only_facets():
+        if not headers:
             response['num_found'] = len(sorted_list)
         return response
 
+    def get_list_etag(self, paginator, headers):
+        """
+        ETag of a page from the aggregate checksums of its results (CustomPaginator.checksums, already in headers),
+        None if they have no checksums or the response has more than them (facets, search stats, cursors).
+        """
+        if (
+                not headers.get(CHECKSUM_STANDARD_HEADER) or not self.can_respond_conditionally() or
+                CURSOR_PARAM in self.request.query_params or
+                self.should_include_facets() or self.should_include_search_stats()
+        ):
+            return None
+        parts = self.get_list_etag_parts(paginator.current_page_results)
+        if parts is None:
+            return None
+        return generate_etag(
+            self.request.get_full_path(),
+            [self.request.META.get(header) for header in self.RESPONSE_CACHE_VARY_HEADERS],
+            headers,
+            [get(result, 'id') for result in paginator.current_page_results],
+            *parts
+        )
+
+    def get_list_etag_parts(self, results):
+        """
+        What a page is made of besides the rows of its results: representations in a repo also have its latest
+        released version and properties (see ConditionalRetrieveMixin.get_etag_parts), those of mappings the names
+        of their concepts. Lists across repos only have a known ETag when brief, None otherwise.
+        """
+        parent = get(self, 'parent_resource')
+        if not parent:
+            return [self.get_mapped_concepts_updated_at(results)] if self.is_brief() or self.is_checksums() else None
+        head = get(parent, 'head') or parent
+        latest_released_version = head.get_latest_released_version() if hasattr(
+            head, 'get_latest_released_version') else None
+        return [
+            parent.updated_at, head.updated_at, get(latest_released_version, 'created_at'),
+            self.get_mapped_concepts_updated_at(results)
+        ]
+
     def serialize_list(self, results, paginator=None):
         result_dict = self.get_serializer(results, many=True).data
         if self.should_include_facets():
@@ -298,7 +452,10 @@ class ListWithHeadersMixin(ListModelMixin):
         return self.request.META.get(HTTP_COMPRESS_HEADER, False) in TRUTHY
 
     def get_object_ids(self):
-        self.object_list.limit_iter = False
+        if self.object_list is None:
+            self.object_list = self.filter_queryset()
+        if isinstance(self.object_list, QuerySet):
+            self.object_list.limit_iter = False
         return map(lambda o: o.id, self.object_list[0:100])
 
     def get_csv(self, request, queryset=None):
@@ -614,6 +771,11 @@ class SourceChildMixin(ChecksumModel):
     class Meta:
         abstract = True
 
+    @property
+    def response_cache_scope(self):
+        # parent is always the HEAD of the source, whose versions share its scope
+        return f'Source:{self.parent_id}'
+
     def calculate_uri(self):
         uri = self.parent.uri + self.resource_type.lower() + 's/' + str(self.mnemonic) + '/'
         if not self.is_head:
@@ -3,7 +3,6 @@ from celery_once import AlreadyQueued
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.postgres.fields import ArrayField
-from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db import models, IntegrityError, transaction
@@ -22,7 +21,8 @@ from core.common.tasks import update_collection_active_concepts_count, update_co
     delete_s3_objects
 from core.common.utils import reverse_resource, reverse_resource_version, parse_updated_since_param, drop_version, \
     to_parent_uri, is_canonical_uri, get_export_service, from_string_to_date, get_truthy_values, \
-    canonical_url_to_url_and_version, get_current_authorized_user, encode_string, decode_string
+    canonical_url_to_url_and_version, get_current_authorized_user, encode_string, decode_string, keyset_batches, \
+    bump_response_cache_generation
 from core.common.utils import to_owner_uri
 from core.settings import DEFAULT_LOCALE
 from . import ERRBIT_LOGGER
@@ -36,6 +36,7 @@ from .constants import (
 from .es import ESScript
 from .exceptions import Http400
 from .fields import URIField
+from .indexing import IndexingPipeline
 from .mixins import SourceContainerMixin
 from .tasks import handle_save, handle_m2m_changed, seed_children_to_new_version, update_validation_schema, \
     update_source_active_concepts_count, update_source_active_mappings_count
@@ -215,10 +216,12 @@ class BaseModel(models.Model):
                     queryset, document, version, partial_doc.get('is_in_latest_source_version'),
                     single_batch, bool(parallel)
                 )
-                return
-            BaseModel.batch_index_partial(queryset, document, single_batch, partial_doc, bool(parallel))
-            return
-        BaseModel.batch_index_full(single_batch, queryset, document, prefetch, select_related, bool(parallel))
+            else:
+                BaseModel.batch_index_partial(queryset, document, single_batch, partial_doc, bool(parallel))
+        else:
+            BaseModel.batch_index_full(single_batch, queryset, document, prefetch, select_related, bool(parallel))
+        # searches are only up to date once reindexed, and a batch can touch any number of repos
+        bump_response_cache_generation()
 
     @staticmethod
     def batch_index_source_version_append(  # pylint: disable=too-many-arguments
@@ -266,15 +269,11 @@ class BaseModel(models.Model):
 
         if single_batch:
             doc.update(queryset.all(), parallel=parallel)
+        elif parallel:
+            IndexingPipeline(document).run(queryset)
         else:
-            batch_size = 500
-            start = 0
-            while True:
-                batch = list(queryset.order_by('-id')[start:start+batch_size])
-                if not batch:
-                    break
+            for batch in keyset_batches(queryset, 500):
                 doc.update(batch, parallel=parallel)
-                start += batch_size
 
     @staticmethod
     def batch_index_partial_by_ids(  # pylint: disable=too-many-arguments
@@ -309,15 +308,8 @@ class BaseModel(models.Model):
             ids = queryset.all().values_list('id', flat=True)
             index_batch(ids)
         else:
-            batch_size = 500
-            start = 0
-            id_qs = queryset.order_by('-id').values_list('id', flat=True)
-            while True:
-                batch = list(id_qs[start:start + batch_size])
-                if not batch:
-                    break
+            for batch in keyset_batches(queryset, 500, flat=True):
                 index_batch(batch)
-                start += batch_size
 
     @staticmethod
     def full_index_missing_docs_or_raise(err, queryset, document, prefetch=None, select_related=None):
@@ -740,29 +732,12 @@ class ConceptContainerModel(VersionedModel, ChecksumModel):
             delete_s3_objects.apply_async((export_path,), queue='default', permanent=False)
         self.post_delete_actions()
 
-    def get_concepts_cache_keys(self):
-        return self.__get_resources_cache_keys('concepts')
-
-    def get_mappings_cache_keys(self):
-        return self.__get_resources_cache_keys('mappings')
-
-    def __get_resources_cache_keys(self, resources):
-        return f'repo_cache:body:{self.uri}{resources}/', f'repo_cache:headers:{self.uri}{resources}/'
+    @property
+    def response_cache_scope(self):
+        return f'{self.resource_type}:{self.versioned_object_id or self.id}'
 
     def post_delete_actions(self):
-        return self.__clear_cache()
-
-    def __clear_cache(self):
-        try:
-            concepts_body_key, concepts_headers_key = self.get_concepts_cache_keys()
-            mappings_body_key, mappings_headers_key = self.get_mappings_cache_keys()
-            return cache.client.get_client().delete(*[
-                cache.make_key(key) for key in [
-                    concepts_body_key, mappings_body_key, concepts_headers_key, mappings_headers_key
-                ]
-            ])
-        except:  # pylint: disable=bare-except
-            return False
+        return bump_response_cache_generation(self.response_cache_scope)
 
     def delete_pins(self):
         if self.is_head:
@@ -1151,6 +1126,10 @@ class ConceptContainerModel(VersionedModel, ChecksumModel):
         safe_filename = get_valid_filename(filename)
         return f"{base_path}/external/{key}_{safe_filename}"
 
+    def get_version_export_delta_path(self, base_version):
+        base_path = self.get_version_export_path(suffix=None).rstrip('.')
+        return f"{base_path}/deltas/{get_valid_filename(base_version)}.zip"
+
     def get_export_path(self):
         if self.is_head:
             return self.version_export_path
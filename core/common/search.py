@@ -1,4 +1,7 @@
+import base64
+import copy
 import gc
+import json
 import re
 import threading
 import time
@@ -7,14 +10,17 @@ from collections import OrderedDict
 
 from cid.locals import get_cid
 from django.conf import settings
-from django.db.models import Case, When, IntegerField
-from elasticsearch_dsl import FacetedSearch, Q
+from django.db.models import F
+from elasticsearch_dsl import FacetedSearch, Q, MultiSearch
+from elasticsearch_dsl.connections import connections
+from elasticsearch_dsl.faceted_search import FacetedResponse
 from pydash import compact, get, has, set_
 from sentence_transformers import CrossEncoder
 import torch
 
 from core.common.constants import ES_REQUEST_TIMEOUT
-from core.common.utils import is_url_encoded_string
+from core.common.fields import AnyOf
+from core.common.utils import is_url_encoded_string, chunks
 
 
 class CustomESFacetedSearch(FacetedSearch):
@@ -41,16 +47,42 @@ class CustomESFacetedSearch(FacetedSearch):
     def params(self, **kwargs):
         self._s = self._s.params(**kwargs)
 
+    def to_facets(self, response):
+        """Facets of a response of this search's request that was executed elsewhere (e.g. in a multi search)"""
+        response = FacetedResponse(response._search, response.to_dict())  # pylint: disable=protected-access
+        response._faceted_search = self  # pylint: disable=protected-access
+        return response.facets.to_dict()
+
+
+class DocumentResult:
+    """A search hit served from the representation its document stores, in the place of its model instance"""
+    def __init__(self, _id, data):
+        self.id = int(_id)
+        self.data = data
+
+    @property
+    def checksums(self):
+        return self.data.get('checksums')
+
 
 class CustomESSearch:
     MUST_HAVE_PREFIX = '+'
     MUST_NOT_HAVE_PREFIX = ' -'
     MUST_HAVE_REGEX = fr'\{MUST_HAVE_PREFIX}(\w+)'
     MUST_NOT_HAVE_REGEX = fr'\{MUST_NOT_HAVE_PREFIX}(\w+)'
+    MULTI_SEARCH_HEADER_PARAMS = ['request_cache', 'routing', 'preference', 'search_type']
+    POINT_IN_TIME_KEEP_ALIVE = '5m'
 
     def __init__(self, dsl_search, document=None):
         self._dsl_search = dsl_search
         self.document = document
+        self.point_in_time = None
+        self.next_cursor = None
+        self.from_source = False
+        self.bundled_searches = []
+        self.bundled_responses = []
+        self.response = None
+        self.pks = []
         self.queryset = None
         self.max_score = None
         self.scores = {}
@@ -237,11 +269,13 @@ class CustomESSearch:
 
     def to_queryset(  # pylint:disable=too-many-locals,too-many-arguments
             self, keep_order=True, normalized_score=False, exact_count=True, txt=None,
-            encoder_model=None, address_duplicates=False
+            encoder_model=None, address_duplicates=False, hydrate_hits=True
     ):
         """
         This method return a django queryset from the an elasticsearch result.
         It cost a query to the sql db.
+        With hydrate_hits=False only the ids of the hits are kept in pks, to hydrate the hits of many searches at once
+        with hydrate_many.
         """
         encoder = bool(txt)
         s, hits, total = self.__get_response(exact_count, encoder)
@@ -268,29 +302,82 @@ class CustomESSearch:
             highlight = get(result, 'highlight')
             if highlight:
                 self.highlights[int(_id)] = highlight.to_dict()
-        if self.document and self.document.__name__ == 'RepoDocument':
-            from core.sources.models import Source
-            from core.collections.models import Collection
-            qs = compact([
-                (Source if result.meta.index == 'sources' else Collection).objects.filter(
-                    id=result.meta.id
-                ).first() for result in s
-            ])
+        if not hydrate_hits:
+            self.pks = [int(result.meta.id) for result in s]
+            qs = None
+        elif self.document and self.document.__name__ == 'RepoDocument':
+            qs = self.hydrate_repos(s)
+        elif self.from_source:
+            qs = self.hydrate_from_source(s)
         else:
-            pks = [result.meta.id for result in s]
-            if len(pks) == 1:
-                qs = self._dsl_search._model.objects.filter(pk=pks[0])  # pylint: disable=protected-access
-            else:
-                qs = self._dsl_search._model.objects.filter(pk__in=pks)  # pylint: disable=protected-access
-            if keep_order:
-                preserved_order = Case(
-                    *[When(pk=pk, then=pos) for pos, pk in enumerate(pks)],
-                    output_field=IntegerField()
-                )
-                qs = qs.order_by(preserved_order)
+            qs = self.hydrate(
+                self._dsl_search._model.objects, [result.meta.id for result in s], keep_order  # pylint: disable=protected-access
+            )
         self.queryset = qs
         self.total = total or 0
 
+    @staticmethod
+    def hydrate(queryset, pks, keep_order=True):
+        """
+        Rows of queryset with the ids of the hits, in the order of the hits.
+        Fetched in a single id = ANY(array) query and put back in order in python, so that the SQL does not grow
+        with the page like a CASE WHEN ordering does.
+        """
+        pks = [int(pk) for pk in pks]
+        if not pks:
+            return []
+        rows = list(queryset.filter(AnyOf(F('id'), pks)))
+        if not keep_order:
+            return rows
+        rows_by_id = {row.id: row for row in rows}
+        return [rows_by_id[pk] for pk in pks if pk in rows_by_id]
+
+    @classmethod
+    def hydrate_many(cls, es_searches, queryset):
+        """
+        Hydrates the hits of es_searches, executed with to_queryset(hydrate_hits=False), in a single query for all of
+        them. Each search gets its own instances, in the order of its hits, so they can be annotated per search.
+        """
+        rows = {row.id: row for row in cls.hydrate(queryset, {pk for s in es_searches for pk in s.pks}, False)}
+        for es_search in es_searches:
+            es_search.queryset = [copy.copy(rows[pk]) for pk in es_search.pks if pk in rows]
+
+    def serve_from_source(self):
+        """
+        Hits are served from the brief representation their documents store, as DocumentResult, instead of from
+        the db. Hits of documents indexed before the current BRIEF_FIELDS_VERSION of the document are still hydrated.
+        """
+        self.from_source = True
+
+    def hydrate_from_source(self, hits):
+        results = {}
+        for hit in hits:
+            brief = getattr(hit, 'brief', None)
+            if brief and getattr(hit, 'brief_fields_version', None) == self.document.BRIEF_FIELDS_VERSION:
+                results[int(hit.meta.id)] = DocumentResult(hit.meta.id, brief.to_dict())
+        pks = [int(hit.meta.id) for hit in hits]
+        outdated_pks = [pk for pk in pks if pk not in results]
+        if outdated_pks:
+            results.update({
+                row.id: row for row in self.hydrate(
+                    self._dsl_search._model.objects, outdated_pks, False)  # pylint: disable=protected-access
+            })
+        return [results[pk] for pk in pks if pk in results]
+
+    @classmethod
+    def hydrate_repos(cls, hits):
+        """Repos of the hits of the sources and collections indexes, with one query per index"""
+        from core.sources.models import Source
+        from core.collections.models import Collection
+        hits = [(Source if hit.meta.index == 'sources' else Collection, int(hit.meta.id)) for hit in hits]
+        repos = {}
+        for model in (Source, Collection):
+            repos.update({
+                (model, repo.id): repo for repo in cls.hydrate(
+                    model.objects, [pk for _model, pk in hits if _model == model], False)
+            })
+        return [repos[hit] for hit in hits if hit in repos]
+
     def get_aggregations(self, verbose=False, raw=False):
         s, _, total = self.__get_response()
 
@@ -351,24 +438,135 @@ class CustomESSearch:
 
         return [build_confidence(high), build_confidence(medium), build_confidence(low)]
 
+    def bundle(self, search):
+        """
+        Sends `search` in the same multi search request as this search, its response is in bundled_responses.
+        Used to get the facets of a list along with its results in one round-trip.
+        """
+        self.bundled_searches.append(search)
+
+    def paginate_with_cursor(self, cursor=None):
+        """
+        Pages this search with search_after on a point in time, instead of from/size, so that every page of a deep
+        crawl costs the same. Without a cursor the first page is searched and a point in time is opened for the next.
+        The cursor of the next page is in next_cursor once executed, None on the last page.
+        """
+        after = self.decode_cursor(cursor) if cursor else {}
+        self.point_in_time = get(after, 'pit') or self.open_point_in_time()
+        # a point in time already knows its indexes, a search with one cannot have any
+        search = self._dsl_search.index().extra(
+            pit={'id': self.point_in_time, 'keep_alive': self.POINT_IN_TIME_KEEP_ALIVE})
+        if get(after, 'after'):
+            search = search.extra(search_after=after['after'])
+        self._dsl_search = search
+
+    def get_connection(self):
+        return connections.get_connection(self._dsl_search._using)  # pylint: disable=protected-access
+
+    def open_point_in_time(self):
+        index = self._dsl_search._index or [self.document._index._name]  # pylint: disable=protected-access
+        return self.get_connection().open_point_in_time(
+            index=','.join(index), keep_alive=self.POINT_IN_TIME_KEEP_ALIVE)['id']
+
+    def close_point_in_time(self):
+        try:
+            self.get_connection().close_point_in_time(id=self.point_in_time)
+        except Exception:  # pylint: disable=broad-except
+            pass  # expires anyways after its keep alive
+
+    @staticmethod
+    def encode_cursor(point_in_time, after):
+        return base64.urlsafe_b64encode(json.dumps({'pit': point_in_time, 'after': after}).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError) as ex:
+            raise ValueError('Invalid cursor.') from ex
+        if not isinstance(after, dict) or not after.get('pit') or not isinstance(after.get('after'), list):
+            raise ValueError('Invalid cursor.')
+        return after
+
+    def set_next_cursor(self, response):
+        hits = get(response.to_dict(), 'hits.hits') or []
+        # the point in time id can change between requests, the latest one has to be used
+        self.point_in_time = get(response.to_dict(), 'pit_id') or self.point_in_time
+        if hits and len(hits) >= get(self._dsl_search.to_dict(), 'size', 10) and hits[-1].get('sort'):
+            self.next_cursor = self.encode_cursor(self.point_in_time, hits[-1]['sort'])
+        else:
+            self.next_cursor = None
+            self.close_point_in_time()
+
+    @staticmethod
+    def get_track_total_hits():
+        # exact total up to ES_TRACK_TOTAL_HITS hits, a lower bound past it, always exact if not set
+        return get(settings, 'ES_TRACK_TOTAL_HITS') or True
+
+    def get_search(self, exact_count=True, load_fields=False):
+        """The search as it is executed, with only the fields needed from the hits"""
+        # We only need the meta fields with the models ids
+        s = self._dsl_search.source(
+            excludes=['_embeddings', '_synonyms_embeddings']
+        ) if load_fields else self._dsl_search.source(
+            fields=['id', 'brief', 'brief_fields_version'] if self.from_source else ['id'])
+        # the total comes with the hits, instead of a separate count request
+        s = s.extra(track_total_hits=self.get_track_total_hits() if exact_count else False)
+        return s.params(request_cache=True)
+
+    @classmethod
+    def execute_many(cls, es_searches, exact_count=True, load_fields=False):
+        """
+        Executes es_searches in multi search requests of ES_MULTI_SEARCH_CHUNK_SIZE searches, instead of a request
+        per search. Their to_queryset then works with the response they got (with the same exact_count/load_fields).
+        """
+        chunk_size = get(settings, 'ES_MULTI_SEARCH_CHUNK_SIZE') or 100
+        for chunk in chunks(es_searches, chunk_size):
+            multi_search = MultiSearch().params(request_timeout=ES_REQUEST_TIMEOUT)
+            for es_search in chunk:
+                multi_search = multi_search.add(
+                    cls.to_multi_search_request(es_search.get_search(exact_count, load_fields)))
+            # a failed search comes back as None, it is then executed alone by to_queryset to raise its error
+            for es_search, response in zip(chunk, multi_search.execute(raise_on_error=False)):
+                es_search.response = response
+
     def __get_response(self, exact_count=True, load_fields=False):
         # Do not query again if the es result is already cached
         total = None
         if not hasattr(self._dsl_search, '_response'):
-            # We only need the meta fields with the models ids
-            s = self._dsl_search.source(
-                excludes=['_embeddings', '_synonyms_embeddings']
-            ) if load_fields else self._dsl_search.source(fields=['id'])
-            s = s.params(request_timeout=ES_REQUEST_TIMEOUT)
-            if exact_count:
-                total = s.count()
-            s = s.params(track_total_hits=False, request_cache=True)
-            s = s.execute()
+            s = self.response if self.response is not None else self.__execute(
+                self.get_search(exact_count, load_fields))
+            if self.point_in_time:
+                self.set_next_cursor(s)
             hits = s.hits
+            if exact_count:
+                total = get(hits, 'total.value')
             self.max_score = hits.max_score
             return s, hits, total
         return self._dsl_search, None, total
 
+    def __execute(self, search):
+        if not self.bundled_searches:
+            return search.params(request_timeout=ES_REQUEST_TIMEOUT).execute()
+        multi_search = MultiSearch().params(request_timeout=ES_REQUEST_TIMEOUT)
+        for _search in [search, *self.bundled_searches]:
+            multi_search = multi_search.add(self.to_multi_search_request(_search))
+        # failed searches of the bundle come back as None, the main one is then executed alone to raise its error
+        response, *self.bundled_responses = multi_search.execute(raise_on_error=False)
+        if response is None:
+            return search.params(request_timeout=ES_REQUEST_TIMEOUT).execute()
+        return response
+
+    @classmethod
+    def to_multi_search_request(cls, search):
+        # a search's params go in its header of the multi search body, where only a few of them are allowed
+        search = search._clone()  # pylint: disable=protected-access
+        search._params = {  # pylint: disable=protected-access
+            key: value for key, value in search._params.items()  # pylint: disable=protected-access
+            if key in cls.MULTI_SEARCH_HEADER_PARAMS
+        }
+        return search
+
 
 class Reranker:
     """Rerank semantic search hits with model-specific score normalization."""
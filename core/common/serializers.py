@@ -7,6 +7,7 @@ from core.code_systems.constants import RESOURCE_TYPE as CODE_SYSTEM_RESOURCE_TY
 from core.common.constants import INCLUDE_CONCEPTS_PARAM, INCLUDE_MAPPINGS_PARAM, LIMIT_PARAM, OFFSET_PARAM, \
     INCLUDE_VERBOSE_REFERENCES, INCLUDE_SEARCH_META_PARAM
 from core.common.feeds import DEFAULT_LIMIT
+from core.common.search import DocumentResult
 from core.common.utils import to_int, get_truthy_values
 from core.concept_maps.constants import RESOURCE_TYPE as CONCEPT_MAP_RESOURCE_TYPE
 from core.orgs.models import Organization
@@ -232,6 +233,11 @@ class AbstractResourceSerializer(ModelSerializer):
             return SearchResultSerializer(obj).data
         return None
 
+    def to_representation(self, instance):
+        if isinstance(instance, DocumentResult):  # already serialized at indexing, see CustomESSearch.serve_from_source
+            return instance.data
+        return super().to_representation(instance)
+
 
 class AbstractRepoResourcesSerializer(AbstractResourceSerializer):
     concepts = SerializerMethodField()
@@ -1,7 +1,8 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
 from core.common.models import BaseModel
+from core.common.utils import bump_response_cache_generation
 from core.orgs.models import Organization
 from core.users.models import UserProfile
 
@@ -12,6 +13,14 @@ def stamp_uri(sender, instance, **kwargs):  # pylint: disable=unused-argument
         instance.uri = instance.calculate_uri()
 
 
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_response_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    scope = getattr(instance, 'response_cache_scope', None)
+    if scope:
+        bump_response_cache_generation(scope)
+
+
 @receiver(post_save, sender=Organization)
 @receiver(post_save, sender=UserProfile)
 def propagate_owner_status(sender, instance=None, created=False, **kwargs):  # pylint: disable=unused-argument
@@ -24,7 +24,7 @@ from core.celery import app
 from core.common import ERRBIT_LOGGER
 from core.common.constants import CONFIRM_EMAIL_ADDRESS_MAIL_SUBJECT, PASSWORD_RESET_MAIL_SUBJECT
 from core.common.utils import write_export_file, web_url, get_resource_class_from_resource_name, get_export_service, \
-    get_date_range_label
+    get_date_range_label, write_export_delta_file, rebuild_export_file, bump_response_cache_generation
 from core.reports.models import ResourceUsageReport
 from core.tasks.models import QueueOnceCustomTask
 
@@ -134,6 +134,61 @@ def export_source(self, version_id):
         version.remove_processing(self.request.id)
 
 
+@app.task(base=QueueOnceCustomTask, bind=True)
+def export_source_delta(self, version_id, base_version_id=None):
+    start_time = time.time()
+    from core.sources.models import Source
+    logger.info('Finding source version...')
+
+    version = Source.objects.filter(id=version_id).select_related('organization', 'user').first()
+
+    if not version or version.is_head:  # pragma: no cover
+        logger.info('Not found source version %s', version_id)
+        return
+
+    base_version = Source.objects.filter(
+        id=base_version_id).first() if base_version_id else version.get_export_delta_base_version()
+
+    if not base_version:
+        logger.info('Not found base version for %s', version.uri)
+        return
+    if base_version.created_at >= version.created_at:
+        logger.info('Base version %s is not older than %s', base_version.uri, version.uri)
+        return
+
+    version.add_processing(self.request.id)
+    try:
+        logger.info(
+            'Found source version %s.  Beginning delta export from %s...', version.version, base_version.version)
+        write_export_delta_file(version, base_version, logger, start_time)
+        logger.info('Delta export complete!')
+    finally:
+        version.remove_processing(self.request.id)
+
+
+@app.task(base=QueueOnceCustomTask, bind=True)
+def export_source_from_deltas(self, version_id):
+    start_time = time.time()
+    from core.sources.models import Source
+    logger.info('Finding source version...')
+
+    version = Source.objects.filter(id=version_id).select_related('organization', 'user').first()
+
+    if not version:  # pragma: no cover
+        logger.info('Not found source version %s', version_id)
+        return None
+
+    version.add_processing(self.request.id)
+    try:
+        logger.info('Found source version %s.  Rebuilding export from deltas...', version.version)
+        rebuilt = rebuild_export_file(
+            version, 'core.sources.serializers.SourceVersionExportSerializer', logger, start_time)
+        logger.info('Export rebuild complete!' if rebuilt else 'Nothing to rebuild.')
+        return rebuilt
+    finally:
+        version.remove_processing(self.request.id)
+
+
 @app.task(base=QueueOnceCustomTask, bind=True)
 def export_collection(self, version_id):
     start_time = time.time()
@@ -197,6 +252,10 @@ def __handle_save(instance):
     if instance:
         registry.update(instance)
         registry.update_related(instance)
+        # searches see the change only now that it is indexed
+        scope = getattr(instance, 'response_cache_scope', None)
+        if scope:
+            bump_response_cache_generation(scope)
 
 
 def __handle_pre_delete(instance):
@@ -247,28 +306,34 @@ def __run_search_index_command(command, app_names=None):
 @app.task(base=QueueOnceCustomTask, retry_kwargs={'max_retries': 0})
 def bulk_import(to_import, username, update_if_exists):
     from core.importers.models import BulkImport
-    return BulkImport(content=to_import, username=username, update_if_exists=update_if_exists).run()
+    result = BulkImport(content=to_import, username=username, update_if_exists=update_if_exists).run()
+    bump_response_cache_generation()
+    return result
 
 
 @app.task(base=QueueOnceCustomTask, bind=True, retry_kwargs={'max_retries': 0})
-def bulk_import_parallel_inline(self, to_import, username, update_if_exists, threads=5):
+def bulk_import_parallel_inline(self, to_import, username, update_if_exists, threads=5, stream=False):  # pylint: disable=too-many-arguments
     from core.importers.models import BulkImportParallelRunner
     try:
         importer = BulkImportParallelRunner(
             content=to_import, username=username, update_if_exists=update_if_exists,
-            parallel=threads, self_task_id=self.request.id
+            parallel=threads, self_task_id=self.request.id, stream=stream
         )
     except JSONDecodeError as ex:
         return {'error': f"Invalid JSON ({ex.msg})"}
     except ValidationError as ex:
         return {'error': f"Invalid Input ({ex.message})"}
-    return importer.run()
+    result = importer.run()
+    bump_response_cache_generation()
+    return result
 
 
 @app.task(base=QueueOnceCustomTask, retry_kwargs={'max_retries': 0})
 def bulk_import_inline(to_import, username, update_if_exists):
     from core.importers.models import BulkImportInline
-    return BulkImportInline(content=to_import, username=username, update_if_exists=update_if_exists).run()
+    result = BulkImportInline(content=to_import, username=username, update_if_exists=update_if_exists).run()
+    bump_response_cache_generation()
+    return result
 
 
 # pylint: disable=too-many-arguments
@@ -303,6 +368,7 @@ def import_finisher(task_id):
     """Persist final import results so that they can be retrieved instantly"""
     from core.importers.importer import ImportTask
     from core.tasks.models import Task
+    bump_response_cache_generation()
     task = Task.objects.filter(id=task_id).first()
     if task:
         if task.result_all:
@@ -416,6 +482,10 @@ def seed_children_to_new_version(self, resource, obj_id, export=True, sync=False
 
             if export:
                 from core.tasks.models import Task
+                if is_source and instance.released and get(settings, 'EXPORT_SOURCE_DELTAS'):
+                    base_version = instance.get_export_delta_base_version()
+                    if base_version and (base_version.has_export() or base_version.export_delta_base_version):
+                        export_task = export_source_delta
                 task = Task.new(queue='default', username=instance.updated_by, name=export_task.__name__)
                 export_task.apply_async((obj_id,), queue=task.queue, task_id=task.id, persist_args=True)
         finally:
@@ -598,25 +668,26 @@ def index_expansion_mappings(expansion_id, count=None, mapping_ids=None):  # pyl
 
 @app.task
 def make_hierarchy(concept_map):  # pragma: no cover
+    """
+      Links the children to the latest version of their parents, concept_map is {parent_uri: [child_uris]}.
+      Rows are written in bulk (see Concept.add_parent_concepts_in_bulk), parents/children not found are skipped.
+      The hierarchy closure of the children is refreshed along.
+    """
     from core.concepts.models import Concept
 
-    for parent_concept_uri, child_concept_urls in concept_map.items():
-        parent_concept = Concept.objects.filter(uri=parent_concept_uri).first()
-        if parent_concept:
-            parent_latest = parent_concept.get_latest_version()
-            if parent_latest:
-                for child_concept in Concept.objects.filter(uri__in=child_concept_urls):
-                    child_concept.parent_concepts.add(parent_latest)
-                    child_latest = child_concept.get_latest_version()
-                    if child_latest:
-                        child_latest.parent_concepts.add(parent_latest)
-                        logger.info('Added child %s to parent %s', child_concept.uri, parent_concept_uri)
-                    else:
-                        logger.info('Could not find child %s latest_version', child_concept.uri)
-            else:
-                logger.info('Could not find parent %s latest_version', parent_concept_uri)
-        else:
-            logger.info('Could not find parent %s', parent_concept_uri)
+    created = Concept.add_parent_concepts_in_bulk(concept_map)
+    logger.info('Added %s parent/child links for %s parents', created, len(concept_map))
+    return created
+
+
+@app.task(ignore_result=True, base=QueueOnceCustomTask)
+def build_hierarchy_closure(source_id):
+    """
+      (Re)builds the materialized hierarchy (ConceptHierarchyClosure) of a source, e.g. after hierarchy rows were
+      written without going through the parent concepts relation
+    """
+    from core.concepts.models import ConceptHierarchyClosure
+    ConceptHierarchyClosure.build(source_id)
 
 
 @app.task(ignore_result=True, base=QueueOnceCustomTask)
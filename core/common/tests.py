@@ -1,9 +1,12 @@
 import datetime
+import io
 import json
 import os
 import time
 import uuid
 from collections import OrderedDict
+from contextlib import closing
+from itertools import islice
 from unittest.mock import patch, Mock, MagicMock, ANY
 
 import django
@@ -13,6 +16,7 @@ from colour_runner.django_runner import ColourRunnerMixin
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, Group
 from django.core.files.base import File
+from django.db.models import F
 from django.core.management import call_command
 from django.test import TestCase, override_settings
 from django.test.runner import DiscoverRunner
@@ -56,7 +60,10 @@ from core.common.utils import (
     split_list_by_condition, is_zip_file, get_date_range_label, get_prev_month, from_string_to_date, get_end_of_month,
     get_start_of_month, es_id_in, web_url, get_queue_task_names, get_resource_class_from_resource_uri, encode_string,
     to_parent_kwargs_from_uri, reverse_resource, reverse_resource_version, write_export_file, queue_bulk_import,
-    get_bulk_import_celery_once_lock_key, generic_sort, get_embeddings)
+    get_bulk_import_celery_once_lock_key, generic_sort, get_embeddings, write_export_rows,
+    keyset_batches, batch_qs, write_export_fragments, get_export_fragments,
+    merge_export_rows, es_to_pks, get_response_cache_generations, bump_response_cache_generation, generate_etag,
+    rebuild_export_file)
 from core.concepts.models import Concept
 from core.orgs.models import Organization
 from core.sources.models import Source
@@ -64,7 +71,9 @@ from core.users.constants import CORE_USER_GROUP, GUEST_GROUP
 from core.users.models import UserProfile
 from core.users.tests.factories import UserProfileFactory
 from .backends import OCLOIDCAuthenticationBackend
-from .checksums import Checksum
+from .checksums import Checksum, ChecksumDiff
+from .m2m import M2MWriter
+from .mixins import ListWithHeadersMixin
 from .fhir_helpers import translate_fhir_query
 from .serializers import IdentifierSerializer
 from .validators import URIValidator
@@ -440,6 +449,15 @@ class UtilsTest(OCLTestCase):
         set_request_url(lambda self: 'https://foobar.org/foo')
         self.assertEqual(get_request_url(), 'https://foobar.org/foo')
 
+    def test_generate_etag(self):
+        etag = generate_etag('/concepts/', {'standard': 'foo'}, from_string_to_date('2024-01-01'))
+
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        self.assertEqual(etag, generate_etag('/concepts/', {'standard': 'foo'}, from_string_to_date('2024-01-01')))
+        self.assertNotEqual(etag, generate_etag('/concepts/', {'standard': 'bar'}, from_string_to_date('2024-01-01')))
+        self.assertNotEqual(etag, generate_etag('/concepts/', {'standard': 'foo'}, from_string_to_date('2024-01-02')))
+        self.assertNotEqual(etag, generate_etag('/mappings/', {'standard': 'foo'}, from_string_to_date('2024-01-01')))
+
     def test_compact_dict_by_values(self):
         self.assertEqual(compact_dict_by_values({}), {})
         self.assertEqual(compact_dict_by_values({'foo': None}), {})
@@ -1001,6 +1019,67 @@ class UtilsTest(OCLTestCase):
         self.assertEqual(es_id_in(search, [1, 2, 3]), 'search')
         search.query.assert_called_once_with("terms", _id=[1, 2, 3])
 
+    @patch('elasticsearch_dsl.connections.connections.get_connection')
+    @patch('elasticsearch_dsl.Search.execute', autospec=True)
+    def test_es_to_pks(self, execute_mock, get_connection_mock):
+        from core.concepts.documents import ConceptDocument
+        get_connection_mock.return_value.open_point_in_time.return_value = {'id': 'pit-id'}
+
+        def get_response(*ids):
+            return Mock(
+                hits=[Mock(meta=Mock(id=_id, sort=[_id])) for _id in ids],
+                to_dict=Mock(return_value={'pit_id': 'pit-id-2'})
+            )
+        execute_mock.side_effect = [get_response('1', '2'), get_response('3')]
+
+        pks = es_to_pks(ConceptDocument.search().query('match', name='foo'), batch_size=2)
+
+        get_connection_mock.return_value.open_point_in_time.assert_not_called()
+        self.assertEqual(list(pks), ['1', '2', '3'])
+        get_connection_mock.return_value.open_point_in_time.assert_called_once_with(index='concepts', keep_alive='1m')
+        get_connection_mock.return_value.close_point_in_time.assert_called_once_with(id='pit-id-2')
+        self.assertEqual(execute_mock.call_count, 2)
+        first_search, last_search = [call[0][0].to_dict() for call in execute_mock.call_args_list]
+        self.assertEqual(first_search['_source'], False)
+        self.assertEqual(first_search['sort'], ['_shard_doc'])
+        self.assertEqual(first_search['size'], 2)
+        self.assertEqual(first_search['pit'], {'id': 'pit-id', 'keep_alive': '1m'})
+        self.assertNotIn('search_after', first_search)
+        self.assertEqual(last_search['pit'], {'id': 'pit-id-2', 'keep_alive': '1m'})
+        self.assertEqual(last_search['search_after'], ['2'])
+
+    @patch('elasticsearch_dsl.connections.connections.get_connection')
+    @patch('elasticsearch_dsl.Search.execute', autospec=True)
+    def test_es_to_pks_ordered(self, execute_mock, get_connection_mock):
+        from core.concepts.documents import ConceptDocument
+        get_connection_mock.return_value.open_point_in_time.return_value = {'id': 'pit-id'}
+        execute_mock.return_value = Mock(
+            hits=[Mock(meta=Mock(id=_id, sort=[1.5, _id])) for _id in ['2', '1']], to_dict=Mock(return_value={}))
+
+        pks = es_to_pks(
+            ConceptDocument.search().query('match', name='foo').sort({'_score': {'order': 'desc'}}), batch_size=3,
+            ordered=True)
+
+        self.assertEqual(list(pks), ['2', '1'])
+        self.assertEqual(execute_mock.call_count, 1)
+        # the point in time adds its _shard_doc tiebreaker itself
+        self.assertEqual(execute_mock.call_args[0][0].to_dict()['sort'], [{'_score': {'order': 'desc'}}])
+        get_connection_mock.return_value.close_point_in_time.assert_called_once_with(id='pit-id')
+
+    @patch('elasticsearch_dsl.connections.connections.get_connection')
+    @patch('elasticsearch_dsl.Search.execute', autospec=True)
+    def test_es_to_pks_closed_early(self, execute_mock, get_connection_mock):
+        from core.concepts.documents import ConceptDocument
+        get_connection_mock.return_value.open_point_in_time.return_value = {'id': 'pit-id'}
+        execute_mock.return_value = Mock(
+            hits=[Mock(meta=Mock(id=_id, sort=[_id])) for _id in ['1', '2']], to_dict=Mock(return_value={}))
+
+        with closing(es_to_pks(ConceptDocument.search(), batch_size=2)) as pks:
+            self.assertEqual(list(islice(pks, 1)), ['1'])
+
+        self.assertEqual(execute_mock.call_count, 1)
+        get_connection_mock.return_value.close_point_in_time.assert_called_once_with(id='pit-id')
+
     @patch('core.common.utils.settings')
     def test_web_url(self, settings_mock):
         settings_mock.WEB_URL = 'https://ocl.org'
@@ -1180,6 +1259,74 @@ class UtilsTest(OCLTestCase):
 
         export_service_mock.upload_file.assert_called_once()
 
+    def test_keyset_batches(self):
+        source = OrganizationSourceFactory()
+        concepts = [ConceptFactory(parent=source) for _ in range(5)]
+        ids = sorted([concept.id for concept in concepts], reverse=True)
+        queryset = Concept.objects.filter(id__in=ids)
+
+        self.assertEqual(list(keyset_batches(queryset, 2, flat=True)), [ids[:2], ids[2:4], ids[4:]])
+        self.assertEqual(
+            list(keyset_batches(queryset, 2, flat=True, descending=False)),
+            [ids[::-1][:2], ids[::-1][2:4], ids[::-1][4:]]
+        )
+        self.assertEqual(
+            [[concept.id for concept in batch] for batch in keyset_batches(queryset, 3)], [ids[:3], ids[3:]])
+        self.assertEqual(
+            list(keyset_batches(queryset, 2, flat=True, server_side_cursor=True)), [ids[:2], ids[2:4], ids[4:]])
+        self.assertEqual(list(keyset_batches(queryset, 5, flat=True)), [ids])
+        self.assertEqual(list(keyset_batches(Concept.objects.none(), 2)), [])
+        self.assertEqual(
+            [sorted(_qs.values_list('id', flat=True), reverse=True) for _qs in batch_qs(queryset, 4)],
+            [ids[:4], ids[4:]]
+        )
+
+    def test_write_export_fragments(self):
+        out = io.StringIO()
+        self.assertFalse(write_export_fragments(out, ['', '']))
+        self.assertTrue(write_export_fragments(out, ['{"id": 1}, {"id": 2}', '', '{"id": 3}']))
+        self.assertEqual(out.getvalue(), '{"id": 1}, {"id": 2}, {"id": 3}')
+
+    @patch('core.common.utils.serialize_export_batch')
+    def test_get_export_fragments(self, serialize_export_batch_mock):
+        serialize_export_batch_mock.side_effect = lambda resource, ids, filters, prev: f'{resource}:{ids}'
+        batches = [[5, 4], [3, 2], [1]]
+
+        self.assertEqual(
+            list(get_export_fragments('concepts', iter(batches), {'is_active': True}, Mock())),
+            ['concepts:[5, 4]', 'concepts:[3, 2]', 'concepts:[1]']
+        )
+        serialize_export_batch_mock.assert_called_with('concepts', [1], {'is_active': True}, False)
+
+        pool_mock = MagicMock()
+        pool_mock.__enter__.return_value.apply_async.side_effect = lambda func, args: Mock(
+            get=Mock(return_value=func(*args)))
+        with patch('billiard.pool.Pool', return_value=pool_mock) as pool_class_mock:
+            self.assertEqual(
+                list(get_export_fragments('mappings', iter(batches), {}, Mock(), parallel=2)),
+                ['mappings:[5, 4]', 'mappings:[3, 2]', 'mappings:[1]']
+            )
+            pool_class_mock.assert_called_once_with(processes=2, initializer=ANY)
+
+    def test_merge_export_rows(self):
+        base_rows = [{'uuid': '9', 'v': 1}, {'uuid': '7', 'v': 1}, {'uuid': '5', 'v': 1}, {'uuid': '2', 'v': 1}]
+        delta_rows = {'8': {'uuid': '8', 'v': 2}, '3': {'uuid': '3', 'v': 2}, '5': {'uuid': '5', 'v': 2}}
+
+        self.assertEqual(
+            list(merge_export_rows(iter(base_rows), delta_rows, {'7'})),
+            [{'uuid': '9', 'v': 1}, {'uuid': '8', 'v': 2}, {'uuid': '5', 'v': 2}, {'uuid': '3', 'v': 2},
+             {'uuid': '2', 'v': 1}]
+        )
+
+    def test_write_export_rows(self):
+        out = io.StringIO()
+        self.assertFalse(write_export_rows(out, []))
+        self.assertEqual(out.getvalue(), '')
+
+        self.assertTrue(write_export_rows(out, [{'id': 1}, {'id': 2}]))
+        self.assertTrue(write_export_rows(out, [{'id': 3}], True))
+        self.assertEqual(out.getvalue(), json.dumps([{'id': 1}, {'id': 2}, {'id': 3}])[1:-1])
+
     @patch('core.common.utils.settings')
     @patch('core.common.utils.requests.get')
     def test_es_get_connect_timeout_on_all_hosts_returns_none(self, http_get_mock, settings_mock):
@@ -1198,6 +1345,13 @@ class UtilsTest(OCLTestCase):
         self.assertIsNotNone(task)
         apply_async_mock.assert_called_once()
 
+    @patch('core.common.tasks.bulk_import_parallel_inline.apply_async')
+    def test_queue_bulk_import_stream(self, apply_async_mock):
+        task = queue_bulk_import('/tmp/file.json', 'default', 'ocladmin', False, inline=True, stream=True)
+        self.assertIsNotNone(task)
+        apply_async_mock.assert_called_once()
+        self.assertEqual(apply_async_mock.call_args[0][0], ('/tmp/file.json', 'ocladmin', False, 5, True))
+
     @patch('core.common.tasks.bulk_import.apply_async')
     def test_queue_bulk_import_already_queued_deletes_task_and_raises(self, apply_async_mock):
         apply_async_mock.side_effect = AlreadyQueued(10)
@@ -1233,6 +1387,21 @@ class UtilsTest(OCLTestCase):
         model_instance_mock.encode.assert_called_once_with('some text')
         self.assertEqual(result, [0.1, 0.2])
 
+    @patch('core.common.utils.download_export_file')
+    def test_rebuild_export_file_stops_on_delta_chain_cycle(self, download_export_file_mock):
+        version1 = Mock(id=1, uri='/users/foo/sources/bar/v1/')
+        version2 = Mock(id=2, uri='/users/foo/sources/bar/v2/')
+        for version, base_version in [(version1, version2), (version2, version1)]:
+            version.has_export.return_value = False
+            version.export_delta_base_version = base_version
+        logger = Mock()
+
+        self.assertFalse(
+            rebuild_export_file(version2, 'core.sources.serializers.SourceVersionExportSerializer', logger, 0))
+        download_export_file_mock.assert_not_called()
+        logger.info.assert_called_once_with(
+            'Delta export chain of /users/foo/sources/bar/v2/ loops back to /users/foo/sources/bar/v2/.')
+
 
 class BaseModelTest(OCLTestCase):
     def test_model_name(self):
@@ -1961,6 +2130,42 @@ class ChecksumTest(OCLTestCase):
         )
 
 
+class ChecksumDiffTest(OCLTestCase):
+    def test_get_delta(self):
+        diff = ChecksumDiff(resources1=None, resources2=None)
+        diff._resources1_map = {  # pylint: disable=protected-access
+            'same': {'id': 1, 'checksums': {'standard': 's1', 'smart': 'm1'}},
+            'changed': {'id': 2, 'checksums': {'standard': 's2', 'smart': 'm2'}},
+            'new-version': {'id': 3, 'checksums': {'standard': 's3', 'smart': 'm3'}},
+            'to-retire': {'id': 4, 'checksums': {'standard': 's4', 'smart': 'm4'}},
+            'removed': {'id': 5, 'checksums': {'standard': 's5', 'smart': 'm5'}},
+        }
+        diff._resources1_map_retired = {  # pylint: disable=protected-access
+            'unretired': {'id': 6, 'checksums': {'standard': 's6', 'smart': 'm6'}},
+        }
+        diff._resources2_map = {  # pylint: disable=protected-access
+            'same': {'id': 1, 'checksums': {'standard': 's1', 'smart': 'm1'}},
+            'changed': {'id': 12, 'checksums': {'standard': 's12', 'smart': 'm2'}},
+            'new-version': {'id': 13, 'checksums': {'standard': 's3', 'smart': 'm3'}},
+            'unretired': {'id': 16, 'checksums': {'standard': 's16', 'smart': 'm16'}},
+            'new': {'id': 17, 'checksums': {'standard': 's17', 'smart': 'm17'}},
+        }
+        diff._resources2_map_retired = {  # pylint: disable=protected-access
+            'to-retire': {'id': 14, 'checksums': {'standard': 's14', 'smart': 'm14'}},
+        }
+
+        self.assertEqual(
+            diff.get_delta(),
+            {
+                'new': [17],
+                'changed': [12, 13, 16],
+                'retired': [14],
+                'removed': ['removed'],
+                'base_ids': [2, 3, 4, 5, 6],
+            }
+        )
+
+
 class ChecksumViewTest(OCLAPITestCase):
     def setUp(self):
         self.token = UserProfile.objects.get(username='ocladmin').get_token()
@@ -2220,3 +2425,419 @@ class LexicalVariantsTest(OCLTestCase):
 
         terms = LexicalVariantDictionary.get_variant_terms('childhood leukaemia colour')
         self.assertEqual(set(terms), {'leukemia', 'color'})
+
+
+class CustomESSearchTest(OCLTestCase):
+    @staticmethod
+    def get_response(*ids):
+        response = MagicMock(hits=Mock(max_score=2, hits=[], total={'value': 30, 'relation': 'eq'}))
+        response.__iter__.return_value = iter([Mock(meta=Mock(id=_id)) for _id in ids])
+        return response
+
+    @patch('elasticsearch_dsl.Search.execute', autospec=True)
+    def test_to_queryset_gets_total_with_hits(self, execute_mock):
+        from core.common.search import CustomESSearch
+        from core.concepts.documents import ConceptDocument
+        concept = ConceptFactory()
+        execute_mock.return_value = self.get_response(concept.id)
+
+        search = CustomESSearch(ConceptDocument.search()[0:1], ConceptDocument)
+        search.to_queryset()
+
+        self.assertEqual(search.total, 30)
+        self.assertEqual(list(search.queryset), [concept])
+        execute_mock.assert_called_once()
+        self.assertTrue(execute_mock.call_args[0][0].to_dict()['track_total_hits'])
+
+    @override_settings(ES_TRACK_TOTAL_HITS=10000)
+    def test_get_track_total_hits(self):
+        from core.common.search import CustomESSearch
+        self.assertEqual(CustomESSearch.get_track_total_hits(), 10000)
+
+    @patch('core.common.search.MultiSearch.execute')
+    def test_to_queryset_with_bundled_search(self, execute_mock):
+        from core.common.search import CustomESSearch
+        from core.concepts.documents import ConceptDocument
+        concept = ConceptFactory()
+        facets_response = Mock()
+        execute_mock.return_value = [self.get_response(concept.id), facets_response]
+
+        search = CustomESSearch(ConceptDocument.search()[0:1], ConceptDocument)
+        search.bundle(ConceptDocument.search().params(request_timeout=10))
+        search.to_queryset()
+
+        self.assertEqual(search.total, 30)
+        self.assertEqual(list(search.queryset), [concept])
+        self.assertEqual(search.bundled_responses, [facets_response])
+        execute_mock.assert_called_once_with(raise_on_error=False)
+
+    def test_to_multi_search_request(self):
+        from core.common.search import CustomESSearch
+        from core.concepts.documents import ConceptDocument
+        search = ConceptDocument.search().params(request_timeout=10, request_cache=True)
+
+        self.assertEqual(
+            CustomESSearch.to_multi_search_request(search)._params, {'request_cache': True})  # pylint: disable=protected-access
+        self.assertEqual(search._params, {'request_timeout': 10, 'request_cache': True})  # pylint: disable=protected-access
+
+    @override_settings(ES_MULTI_SEARCH_CHUNK_SIZE=2)
+    @patch('elasticsearch_dsl.Search.execute')
+    @patch('core.common.search.MultiSearch.execute')
+    def test_execute_many_and_hydrate_many(self, multi_search_execute_mock, search_execute_mock):
+        from core.common.search import CustomESSearch
+        from core.concepts.documents import ConceptDocument
+        concept1 = ConceptFactory()
+        concept2 = ConceptFactory()
+        multi_search_execute_mock.side_effect = [
+            [self.get_response(concept1.id, concept2.id), self.get_response(concept2.id)],
+            [self.get_response()]
+        ]
+        searches = [CustomESSearch(ConceptDocument.search()[0:2], ConceptDocument) for _ in range(3)]
+
+        CustomESSearch.execute_many(searches, exact_count=False)
+
+        self.assertEqual(multi_search_execute_mock.call_count, 2)
+        multi_search_execute_mock.assert_called_with(raise_on_error=False)
+
+        for search in searches:
+            search.to_queryset(False, True, False, hydrate_hits=False)
+
+        search_execute_mock.assert_not_called()
+        self.assertEqual([search.pks for search in searches], [[concept1.id, concept2.id], [concept2.id], []])
+        self.assertEqual([search.queryset for search in searches], [None, None, None])
+
+        with self.assertNumQueries(1):
+            CustomESSearch.hydrate_many(searches, Concept.objects)
+
+        self.assertEqual([search.queryset for search in searches], [[concept1, concept2], [concept2], []])
+        self.assertIsNot(searches[0].queryset[1], searches[1].queryset[0])
+
+    def test_hydrate(self):
+        from core.common.search import CustomESSearch
+        concept1 = ConceptFactory()
+        concept2 = ConceptFactory()
+
+        self.assertEqual(CustomESSearch.hydrate(Concept.objects, []), [])
+        self.assertEqual(
+            CustomESSearch.hydrate(Concept.objects, [str(concept2.id), '0', str(concept1.id)]), [concept2, concept1])
+        self.assertEqual(
+            CustomESSearch.hydrate(Concept.objects, [concept1.id, concept2.id]), [concept1, concept2])
+        self.assertCountEqual(
+            CustomESSearch.hydrate(Concept.objects, [concept2.id, concept1.id], False), [concept1, concept2])
+
+    def test_hydrate_from_source(self):
+        from core.common.search import CustomESSearch, DocumentResult
+        from core.concepts.documents import ConceptDocument
+        from core.concepts.serializers import ConceptMinimalSerializer
+        concept1 = ConceptFactory()
+        concept2 = ConceptFactory()
+        brief = {'id': concept1.mnemonic, 'url': concept1.uri, 'checksums': {'standard': 'foo'}}
+
+        def hit(_id, **kwargs):
+            return Mock(meta=Mock(id=str(_id)), **kwargs)
+
+        search = CustomESSearch(ConceptDocument.search(), ConceptDocument)
+        search.serve_from_source()
+        results = search.hydrate_from_source([
+            hit(concept1.id, brief=Mock(to_dict=Mock(return_value=brief)), brief_fields_version=1),
+            hit(concept2.id, brief=Mock(to_dict=Mock(return_value={})), brief_fields_version=0),
+        ])
+
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(results[0], DocumentResult)
+        self.assertEqual(results[0].id, concept1.id)
+        self.assertEqual(results[0].checksums, {'standard': 'foo'})
+        self.assertEqual(results[1], concept2)
+        data = ConceptMinimalSerializer(results, many=True).data
+        self.assertEqual(data[0], brief)
+        self.assertEqual(data[1]['id'], concept2.mnemonic)
+
+    def test_array_position(self):
+        from core.common.fields import ArrayPosition
+        concept1 = ConceptFactory()
+        concept2 = ConceptFactory()
+        ids = [concept2.id, concept1.id]
+
+        self.assertEqual(
+            list(Concept.objects.filter(id__in=ids).order_by(ArrayPosition(ids, F('id')))), [concept2, concept1])
+
+    def test_put_brief_mappings(self):
+        from core.concepts.documents import ConceptDocument
+        from core.mappings.documents import MappingDocument
+        # pylint: disable=protected-access
+        with patch.object(ConceptDocument._index, 'put_mapping') as concepts_mock, \
+                patch.object(MappingDocument._index, 'put_mapping') as mappings_mock:
+            call_command('put_brief_mappings', stdout=io.StringIO())
+
+        for mock in [concepts_mock, mappings_mock]:
+            mock.assert_called_once_with(
+                properties={'brief': {'type': 'object', 'enabled': False}, 'brief_fields_version': {'type': 'integer'}})
+
+    def test_hydrate_repos(self):
+        from core.common.search import CustomESSearch
+        source = OrganizationSourceFactory()
+        collection = OrganizationCollectionFactory()
+
+        def hit(index, _id):
+            return Mock(meta=Mock(index=index, id=str(_id)))
+
+        self.assertEqual(
+            CustomESSearch.hydrate_repos([
+                hit('collections', collection.id), hit('sources', 0), hit('sources', source.id)
+            ]),
+            [collection, source]
+        )
+
+    def test_cursor(self):
+        from core.common.search import CustomESSearch
+        cursor = CustomESSearch.encode_cursor('pit-id', [1.5, 10])
+
+        self.assertEqual(CustomESSearch.decode_cursor(cursor), {'pit': 'pit-id', 'after': [1.5, 10]})
+        for invalid_cursor in ['foobar', CustomESSearch.encode_cursor(None, [1]), 'e30=']:
+            with self.assertRaisesMessage(ValueError, 'Invalid cursor.'):
+                CustomESSearch.decode_cursor(invalid_cursor)
+
+    @patch('core.common.search.connections.get_connection')
+    def test_paginate_with_cursor(self, get_connection_mock):
+        from core.common.search import CustomESSearch
+        from core.concepts.documents import ConceptDocument
+        get_connection_mock.return_value.open_point_in_time.return_value = {'id': 'pit-id'}
+
+        search = CustomESSearch(ConceptDocument.search()[0:2], ConceptDocument)
+        search.paginate_with_cursor()
+
+        get_connection_mock.return_value.open_point_in_time.assert_called_once_with(index='concepts', keep_alive='5m')
+        self.assertIsNone(search._dsl_search._index)  # pylint: disable=protected-access
+        self.assertEqual(search._dsl_search.to_dict()['pit'], {'id': 'pit-id', 'keep_alive': '5m'})  # pylint: disable=protected-access
+        self.assertNotIn('search_after', search._dsl_search.to_dict())  # pylint: disable=protected-access
+
+        search.set_next_cursor(Mock(to_dict=Mock(return_value={
+            'pit_id': 'pit-id-2', 'hits': {'hits': [{'sort': [2.0, 1]}, {'sort': [1.0, 2]}]}})))
+        self.assertEqual(search.decode_cursor(search.next_cursor), {'pit': 'pit-id-2', 'after': [1.0, 2]})
+
+        search = CustomESSearch(ConceptDocument.search()[0:2], ConceptDocument)
+        search.paginate_with_cursor(CustomESSearch.encode_cursor('pit-id-2', [1.0, 2]))
+
+        get_connection_mock.return_value.open_point_in_time.assert_called_once()
+        self.assertEqual(search._dsl_search.to_dict()['search_after'], [1.0, 2])  # pylint: disable=protected-access
+
+        search.set_next_cursor(Mock(to_dict=Mock(return_value={
+            'pit_id': 'pit-id-2', 'hits': {'hits': [{'sort': [0.5, 3]}]}})))
+        self.assertIsNone(search.next_cursor)
+        get_connection_mock.return_value.close_point_in_time.assert_called_once_with(id='pit-id-2')
+
+
+class CustomPaginatorTest(OCLTestCase):
+    def test_headers_with_next_cursor(self):
+        from django.test import RequestFactory
+        from core.common.mixins import CustomPaginator
+        request = RequestFactory().get('/concepts/', {'q': 'foo', 'cursor': 'true'})
+
+        headers = CustomPaginator(
+            request=request, total_count=100, queryset=[1, 2], page_size=2, is_sliced=True, next_cursor='next-token'
+        ).headers
+
+        self.assertEqual(headers['next_cursor'], 'next-token')
+        self.assertEqual(headers['next'], 'http://testserver/concepts/?q=foo&cursor=next-token')
+
+        headers = CustomPaginator(
+            request=request, total_count=100, queryset=[1, 2], page_size=2, is_sliced=True).headers
+
+        self.assertNotIn('next_cursor', headers)
+        self.assertNotIn('next', headers)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResponseCacheGenerationTest(OCLTestCase):
+    def test_bump_response_cache_generation(self):
+        source = OrganizationSourceFactory()
+        scopes = ['all', 'any', source.response_cache_scope, 'Source:0']
+        generations = get_response_cache_generations(*scopes)
+
+        self.assertEqual(get_response_cache_generations(*scopes), generations)
+
+        bump_response_cache_generation(source.response_cache_scope)
+
+        all_gen, any_gen, source_gen, other_source_gen = get_response_cache_generations(*scopes)
+        self.assertEqual(all_gen, generations[0])
+        self.assertEqual(any_gen, generations[1] + 1)
+        self.assertEqual(source_gen, generations[2] + 1)
+        self.assertEqual(other_source_gen, generations[3])
+
+        bump_response_cache_generation()
+
+        self.assertEqual(
+            get_response_cache_generations(*scopes), [all_gen + 1, any_gen, source_gen, other_source_gen])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class EmbeddingsTest(OCLTestCase):
+    def setUp(self):
+        super().setUp()
+        from core.common.embeddings import Embeddings
+        Embeddings.LOCAL_CACHE.clear()
+        self.model = Mock()
+        self.model.encode.side_effect = lambda texts: [[float(len(txt))] for txt in texts]
+
+    @override_settings(ENV='ci')
+    def test_get_many_ci_env_returns_none(self):
+        from core.common.embeddings import Embeddings
+        self.assertEqual(Embeddings().get_many(['foo', 'bar']), {'foo': None, 'bar': None})
+
+    def test_get_many(self):
+        from core.common.embeddings import Embeddings
+        with override_settings(ENV='production', LM=self.model, LM_MODEL_NAME='some-model'):
+            embeddings = Embeddings()
+
+            self.assertEqual(embeddings.get_many(['a', 'bb', 'a']), {'a': [1.0], 'bb': [2.0]})
+            self.model.encode.assert_called_once_with(['a', 'bb'])
+
+            self.assertEqual(embeddings.get('bb'), [2.0])
+            self.assertEqual(embeddings.get_many(['bb', 'ccc']), {'bb': [2.0], 'ccc': [3.0]})
+            self.assertEqual(self.model.encode.call_count, 2)
+            self.model.encode.assert_called_with(['ccc'])
+
+            Embeddings.LOCAL_CACHE.clear()
+            self.assertEqual(Embeddings().get_many(['a', 'ccc']), {'a': [1.0], 'ccc': [3.0]})  # from redis
+            self.assertEqual(self.model.encode.call_count, 2)
+
+        with override_settings(ENV='production', LM=self.model, LM_MODEL_NAME='other-model'):
+            self.assertEqual(Embeddings().get_many(['a']), {'a': [1.0]})
+            self.assertEqual(self.model.encode.call_count, 3)
+
+    @patch('core.common.embeddings.Embeddings.LOCAL_CACHE_SIZE', 2)
+    def test_local_cache_is_lru(self):
+        from core.common.embeddings import Embeddings
+        with override_settings(ENV='production', LM=self.model, LM_MODEL_NAME='some-model'):
+            embeddings = Embeddings()
+            embeddings.set_in_local_cache({'a': [1.0], 'b': [2.0]})
+            embeddings.get_from_local_cache(['a'])
+            embeddings.set_in_local_cache({'c': [3.0]})
+
+            self.assertEqual(embeddings.get_from_local_cache(['a', 'b', 'c']), {'a': [1.0], 'c': [3.0]})
+
+
+class IndexingPipelineTest(OCLTestCase):
+    def setUp(self):
+        super().setUp()
+        self.document = Mock(
+            return_value=Mock(
+                django=Mock(auto_refresh=False),
+                _get_actions=lambda batch, action: [{'_id': _id, '_op_type': action} for _id in batch]
+            )
+        )
+
+    @staticmethod
+    def bulk_response(statuses):
+        def streaming_bulk(_client, actions, **_kwargs):
+            for action in actions:
+                status_code = statuses.pop(0) if statuses else 200
+                yield status_code == 200, {action['_op_type']: {'_id': action['_id'], 'status': status_code}}
+        return streaming_bulk
+
+    @patch('core.common.indexing.keyset_batches')
+    @patch('core.common.indexing.streaming_bulk')
+    def test_run(self, streaming_bulk_mock, keyset_batches_mock):
+        from core.common.indexing import IndexingPipeline
+        keyset_batches_mock.return_value = [[1, 2], [3, 4], [5]]
+        streaming_bulk_mock.side_effect = self.bulk_response([])
+
+        pipeline = IndexingPipeline(self.document, batch_size=2, prepare_workers=2, max_in_flight=1)
+
+        self.assertEqual(pipeline.run('queryset'), 5)
+        keyset_batches_mock.assert_called_once_with('queryset', 2)
+        self.assertEqual(streaming_bulk_mock.call_count, 3)
+        self.assertCountEqual(
+            [_id for call in streaming_bulk_mock.call_args_list for _id in [a['_id'] for a in call[0][1]]],
+            [1, 2, 3, 4, 5]
+        )
+
+    @patch('core.common.indexing.IndexingPipeline.MIN_BULK_SIZE', 1)
+    @patch('core.common.indexing.time.sleep')
+    @patch('core.common.indexing.keyset_batches')
+    @patch('core.common.indexing.streaming_bulk')
+    def test_run_retries_rejected_with_smaller_bulks(self, streaming_bulk_mock, keyset_batches_mock, sleep_mock):
+        from core.common.indexing import IndexingPipeline
+        keyset_batches_mock.return_value = [[1, 2, 3, 4]]
+        streaming_bulk_mock.side_effect = self.bulk_response([200, 429, 200, 429])
+
+        pipeline = IndexingPipeline(self.document, batch_size=4, prepare_workers=1)
+
+        self.assertEqual(pipeline.run('queryset'), 4)
+        self.assertEqual(streaming_bulk_mock.call_count, 2)
+        self.assertEqual([a['_id'] for a in streaming_bulk_mock.call_args_list[1][0][1]], [2, 4])
+        self.assertEqual(streaming_bulk_mock.call_args_list[1][1]['chunk_size'], 2)
+        sleep_mock.assert_called_once_with(1)
+        self.assertEqual(pipeline.bulk_size, 3)  # grows back while bulks go through
+        pipeline.bulk([{'_id': 5, '_op_type': 'index'}])
+        self.assertEqual(pipeline.bulk_size, 4)
+        pipeline.bulk([{'_id': 6, '_op_type': 'index'}])
+        self.assertEqual(pipeline.bulk_size, 4)
+
+    @patch('core.common.indexing.keyset_batches')
+    @patch('core.common.indexing.streaming_bulk')
+    def test_run_raises_errors(self, streaming_bulk_mock, keyset_batches_mock):
+        from elasticsearch.helpers import BulkIndexError
+        from core.common.indexing import IndexingPipeline
+        keyset_batches_mock.return_value = [[1, 2], [3, 4], [5, 6]]
+        streaming_bulk_mock.side_effect = self.bulk_response([200, 400])
+
+        with self.assertRaises(BulkIndexError):
+            IndexingPipeline(self.document, batch_size=2, prepare_workers=2).run('queryset')
+
+        keyset_batches_mock.side_effect = ValueError('db is down')
+        with self.assertRaisesRegex(ValueError, 'db is down'):
+            IndexingPipeline(self.document, batch_size=2, prepare_workers=2).run('queryset')
+
+
+class M2MWriterTest(OCLTestCase):
+    def test_add_remove_set_clear(self):
+        concept1 = ConceptFactory()
+        concept2 = ConceptFactory()
+        concept3 = ConceptFactory()
+        expansion = ExpansionFactory()
+        expansion.concepts.add(concept1)
+        writer = M2MWriter(expansion.concepts)
+
+        self.assertEqual(writer.add(Concept.objects.filter(id__in=[concept1.id, concept2.id])), 1)
+        self.assertEqual(writer.add(Concept.objects.filter(id__in=[concept1.id, concept2.id])), 0)
+        self.assertEqual(writer.add(Concept.objects.none()), 0)
+        self.assertEqual(set(expansion.concepts.values_list('id', flat=True)), {concept1.id, concept2.id})
+
+        self.assertEqual(writer.remove(Concept.objects.filter(id__in=[concept1.id, concept3.id])), 1)
+        self.assertEqual(list(expansion.concepts.values_list('id', flat=True)), [concept2.id])
+
+        self.assertEqual(writer.set(Concept.objects.filter(id__in=[concept1.id, concept3.id])), (2, 1))
+        self.assertEqual(set(expansion.concepts.values_list('id', flat=True)), {concept1.id, concept3.id})
+
+        self.assertEqual(writer.clear(), 2)
+        self.assertFalse(expansion.concepts.exists())
+
+    def test_add_without_unique_through(self):
+        concept = ConceptFactory()
+        reference = CollectionReference(expression=concept.uri, collection=OrganizationCollectionFactory())
+        reference.save()
+        writer = M2MWriter(reference.concepts)
+
+        writer.add(Concept.objects.filter(id=concept.id))
+        writer.add(Concept.objects.filter(id=concept.id))
+
+        self.assertEqual(reference.concepts.count(), 1)
+
+
+class ListWithHeadersMixinTest(OCLTestCase):
+    def test_head(self):
+        view = ListWithHeadersMixin()
+        view.total_count = 0
+
+        view.filter_queryset = Mock(return_value=[])  # search with no hits, hydrated to a list
+        self.assertEqual(view.head(Mock())['num_found'], '0')
+
+        view.filter_queryset = Mock(return_value=Concept.objects.none())
+        self.assertEqual(view.head(Mock())['num_found'], '0')
+
+        view.filter_queryset = Mock(return_value=[Mock(), Mock()])
+        self.assertEqual(view.head(Mock())['num_found'], '2')
+
+        view.total_count = 10
+        self.assertEqual(view.head(Mock())['num_found'], '10')
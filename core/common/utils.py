@@ -1,5 +1,7 @@
 # pylint: disable=cyclic-import # only occurring in dev env
 import hashlib
+import heapq
+import io
 import json
 import mimetypes
 import os
@@ -9,19 +11,22 @@ import tempfile
 import time
 import uuid
 import zipfile
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from collections.abc import MutableMapping  # pylint: disable=no-name-in-module,deprecated-class
 from datetime import timedelta
 from threading import local
 from urllib import parse
 
+import ijson
 import requests
 from celery_once import AlreadyQueued
 from celery_once.helpers import queue_once_key
 from dateutil import parser
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import NoReverseMatch, reverse, get_resolver
 from django.utils import timezone
+from django.utils.http import quote_etag
 from djqscsv import csv_file_for
 from pydash import flatten, compact, get
 from requests import ConnectTimeout
@@ -197,9 +202,132 @@ def get_class(kls):
     return _module
 
 
+def write_export_rows(out, rows, needs_separator=False):
+    """Writes serialized rows one by one into a JSON array stream, returns True if anything was written"""
+    written = False
+    for row in rows:
+        if needs_separator or written:
+            out.write(', ')
+        out.write(json.dumps(row, cls=encoders.JSONEncoder))
+        written = True
+    return written
+
+
+def get_export_prev_version_uris(versioned_object_ids):
+    from core.concepts.models import Concept
+    return dict(
+        Concept.objects.filter(
+            versioned_object_id__in=versioned_object_ids,
+            is_active=True, is_latest_version=False,
+        ).order_by('versioned_object_id', '-created_at').distinct(
+            'versioned_object_id'
+        ).values_list('versioned_object_id', 'uri')
+    )
+
+
+def serialize_export_batch(resource, batch_ids, filters, with_prev_version_uris=False):
+    """Returns the serialized concepts/mappings of batch_ids as JSON rows to be placed inside a JSON array"""
+    from core.concepts.models import Concept
+    from core.mappings.models import Mapping
+    if resource == 'concepts':
+        queryset = Concept.objects.filter(
+            id__in=batch_ids).filter(**filters).select_related(
+            'parent', 'parent__organization', 'parent__user', 'created_by', 'updated_by', 'versioned_object'
+        ).prefetch_related(
+            'names', 'descriptions', 'parent_concepts', 'child_concepts',
+            'versioned_object__parent_concepts', 'versioned_object__child_concepts'
+        ).order_by('-id')
+        concept_versions = list(queryset)
+        if not concept_versions:
+            return ''
+        prev_version_uris = get_export_prev_version_uris(
+            [concept.versioned_object_id for concept in concept_versions]
+        ) if with_prev_version_uris else None
+        data = get_class('core.concepts.serializers.ConceptVersionExportSerializer')(
+            concept_versions, many=True, context={'prev_version_uris': prev_version_uris}
+        ).data
+    else:
+        queryset = Mapping.objects.filter(
+            id__in=batch_ids).filter(**filters).select_related(
+            'parent', 'parent__organization', 'parent__user',
+            'from_source', 'from_source__organization', 'from_source__user',
+            'to_source', 'to_source__organization', 'to_source__user',
+            'from_concept', 'from_concept__parent',
+            'to_concept', 'to_concept__parent',
+            'created_by', 'updated_by',
+        ).prefetch_related('from_concept__names', 'to_concept__names').order_by('-id')
+        mapping_versions = list(queryset)
+        if not mapping_versions:
+            return ''
+        data = get_class('core.mappings.serializers.MappingVersionExportSerializer')(
+            mapping_versions, many=True).data
+
+    return ', '.join(json.dumps(row, cls=encoders.JSONEncoder) for row in data)
+
+
+def get_export_fragments(  # pylint: disable=too-many-arguments
+        resource, id_batches, filters, logger, with_prev_version_uris=False, parallel=1
+):
+    """
+    Yields serialize_export_batch results for id_batches in order.
+    With parallel > 1 batches are serialized in a pool of processes, each one holding its own DB connection,
+    with at most 2 * parallel batches in flight so that memory stays bounded.
+    """
+    def log(start, batch_ids):
+        logger.info(f'Serializing {resource} {start + 1:d} - {start + len(batch_ids):d}...')
+        return start + len(batch_ids)
+
+    start = 0
+    if parallel <= 1:
+        for batch_ids in id_batches:
+            start = log(start, batch_ids)
+            yield serialize_export_batch(resource, batch_ids, filters, with_prev_version_uris)
+        return
+
+    from billiard.pool import Pool
+    in_flight = deque()
+    with Pool(processes=parallel, initializer=reset_db_connections) as pool:
+        for batch_ids in id_batches:
+            start = log(start, batch_ids)
+            in_flight.append(
+                pool.apply_async(serialize_export_batch, (resource, batch_ids, filters, with_prev_version_uris)))
+            if len(in_flight) >= parallel * 2:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
+
+
+def reset_db_connections():
+    """
+    Drops DB connections inherited from the parent process (without closing them, which would end the parent's
+    session), so that a forked process opens its own connection.
+    """
+    from django.db import connections
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+
+
+def write_export_fragments(out, fragments):
+    """Writes JSON row fragments into a JSON array stream, returns True if anything was written"""
+    written = False
+    for fragment in fragments:
+        if fragment:
+            if written:
+                out.write(', ')
+            out.write(fragment)
+            written = True
+    return written
+
+
 def write_export_file(
-        version, resource_type, resource_serializer_type, logger, start_time
-):  # pylint: disable=too-many-statements,too-many-locals,too-many-branches
+        version, resource_type, resource_serializer_type, logger, start_time, parallel=None
+):  # pylint: disable=too-many-statements,too-many-locals,too-many-branches,too-many-arguments
+    """
+    Streams the export of a repo version into a zip member opened for writing, so that neither the serialized
+    repo nor an uncompressed export.json is ever held in memory or written to disk.
+    Concepts/mappings are serialized by `parallel` processes (defaults to settings.EXPORT_PARALLEL_PROCESSES),
+    the output is the same regardless.
+    """
     from core.concepts.models import Concept
     from core.mappings.models import Mapping
     cwd = cd_temp()
@@ -215,6 +343,8 @@ def write_export_file(
 
     batch_size = 1000
     is_collection = resource_type == 'collection'
+    if parallel is None:
+        parallel = get(settings, 'EXPORT_PARALLEL_PROCESSES', 1)
 
     concepts_qs = Concept.objects.none()
     mappings_qs = Mapping.objects.none()
@@ -240,56 +370,16 @@ def write_export_file(
             filters['is_latest_version'] = True
 
     resource_name = resource_type.title()
+    with_prev_version_uris = version.is_head and not is_collection
 
-    with open('export.json', 'w') as out:
+    with zipfile.ZipFile('export.zip', 'w', zipfile.ZIP_DEFLATED) as _zip, \
+            io.TextIOWrapper(_zip.open('export.json', 'w', force_zip64=True), encoding='utf-8') as out:
         out.write(f'{resource_string[:-1]}, "concepts": [')
 
-        concept_serializer_class = get_class('core.concepts.serializers.ConceptVersionExportSerializer')
-        if version.is_head and not is_collection:
-            all_versioned_object_ids = list(
-                Concept.objects.filter(
-                    id__in=concepts_qs.values(concept_id_field)).filter(**filters
-                ).values_list('versioned_object_id', flat=True)
-            )
-            all_prev_version_uris = dict(
-                Concept.objects.filter(
-                    versioned_object_id__in=all_versioned_object_ids,
-                    is_active=True, is_latest_version=False,
-                ).order_by('versioned_object_id', '-created_at').distinct(
-                    'versioned_object_id'
-                ).values_list('versioned_object_id', 'uri')
-            )
-        else:
-            all_prev_version_uris = None
-        written_concepts = False
-        start = 0
-        while True:
-            batch_ids = list(
-                concepts_qs.order_by(f'-{concept_id_field}')[start:start + batch_size].values_list(
-                    concept_id_field, flat=True
-                )
-            )
-            if not batch_ids:
-                break
-            logger.info(f'Serializing concepts {start + 1:d} - {start + len(batch_ids):d}...')
-            queryset = Concept.objects.filter(
-                id__in=batch_ids).filter(**filters).select_related(
-                'parent', 'parent__organization', 'parent__user', 'created_by', 'updated_by', 'versioned_object'
-            ).prefetch_related(
-                'names', 'descriptions', 'parent_concepts', 'child_concepts',
-                'versioned_object__parent_concepts', 'versioned_object__child_concepts'
-            ).order_by('-id')
-            concept_versions = list(queryset)
-            if concept_versions:
-                if written_concepts:
-                    out.write(', ')
-                data = concept_serializer_class(
-                    concept_versions, many=True, context={'prev_version_uris': all_prev_version_uris}
-                ).data
-                concept_string = json.dumps(data, cls=encoders.JSONEncoder)
-                out.write(concept_string[1:-1])
-                written_concepts = True
-            start += batch_size
+        written_concepts = write_export_fragments(out, get_export_fragments(
+            'concepts', keyset_batches(concepts_qs, batch_size, concept_id_field, flat=True), filters, logger,
+            with_prev_version_uris, parallel
+        ))
 
         if written_concepts:
             logger.info('Done serializing concepts.')
@@ -306,49 +396,23 @@ def write_export_file(
                 )
                 reference_serializer_class = get_class(
                     'core.collections.serializers.CollectionReferenceDetailSerializer')
-                for ref_start in range(0, total_references, batch_size):
-                    ref_end = min(ref_start + batch_size, total_references)
+                written_references = False
+                ref_start = 0
+                for references in keyset_batches(references_qs.filter(), batch_size):
+                    ref_end = ref_start + len(references)
                     logger.info(f'Serializing references {ref_start + 1:d} - {ref_end:d}...')
-                    references = references_qs.order_by('-id').filter()[ref_start:ref_end]
+                    ref_start = ref_end
                     reference_serializer = reference_serializer_class(references, many=True)
-                    reference_string = json.dumps(reference_serializer.data, cls=encoders.JSONEncoder)
-                    out.write(reference_string[1:-1])
-                    if ref_end != total_references:
-                        out.write(', ')
+                    written_references = write_export_rows(
+                        out, reference_serializer.data, written_references) or written_references
                 logger.info('Done serializing references.')
 
         out.write('], "mappings": [')
 
-        mapping_serializer_class = get_class('core.mappings.serializers.MappingVersionExportSerializer')
-        written_mappings = False
-        start = 0
-        while True:
-            batch_ids = list(
-                mappings_qs.order_by(f'-{mapping_id_field}')[start:start + batch_size].values_list(
-                    mapping_id_field, flat=True
-                )
-            )
-            if not batch_ids:
-                break
-            logger.info(f'Serializing mappings {start + 1:d} - {start + len(batch_ids):d}...')
-            queryset = Mapping.objects.filter(
-                id__in=batch_ids).filter(**filters).select_related(
-                'parent', 'parent__organization', 'parent__user',
-                'from_source', 'from_source__organization', 'from_source__user',
-                'to_source', 'to_source__organization', 'to_source__user',
-                'from_concept', 'from_concept__parent',
-                'to_concept', 'to_concept__parent',
-                'created_by', 'updated_by',
-            ).prefetch_related('from_concept__names', 'to_concept__names').order_by('-id')
-            mapping_versions = list(queryset)
-            if mapping_versions:
-                if written_mappings:
-                    out.write(', ')
-                data = mapping_serializer_class(mapping_versions, many=True).data
-                mapping_string = json.dumps(data, cls=encoders.JSONEncoder)
-                out.write(mapping_string[1:-1])
-                written_mappings = True
-            start += batch_size
+        written_mappings = write_export_fragments(out, get_export_fragments(
+            'mappings', keyset_batches(mappings_qs, batch_size, mapping_id_field, flat=True), filters, logger,
+            parallel=parallel
+        ))
 
         if written_mappings:
             logger.info('Done serializing mappings.')
@@ -358,24 +422,27 @@ def write_export_file(
 
     version.update_extras('__export_time', end_time)
 
-    with zipfile.ZipFile('export.zip', 'w', zipfile.ZIP_DEFLATED) as _zip:
-        _zip.write('export.json')
+    upload_export_file(
+        version.version_export_path, logger, cwd,
+        delete_path=version.get_version_export_path(suffix=None) if version.is_head else None
+    )
+
 
+def upload_export_file(key, logger, cwd, delete_path=None):
     file_path = os.path.abspath('export.zip')
     logger.info(file_path)
     logger.info('Done compressing.  Uploading...')
 
-    s3_key = version.version_export_path
     export_service = get_export_service()
-    if version.is_head:
-        export_service.delete_objects(version.get_version_export_path(suffix=None))
+    if delete_path:
+        export_service.delete_objects(delete_path)
 
     upload_status_code = export_service.upload_file(
-        key=s3_key, file_path=file_path, binary=True, metadata={'ContentType': 'application/zip'},
+        key=key, file_path=file_path, binary=True, metadata={'ContentType': 'application/zip'},
         headers={'content-type': 'application/zip'}
     )
     logger.info(f'Upload response status: {str(upload_status_code)}')
-    uploaded_path = export_service.url_for(s3_key)
+    uploaded_path = export_service.url_for(key)
     logger.info(f'Uploaded to {uploaded_path}.')
 
     if not get(settings, 'TEST_MODE', False):
@@ -386,6 +453,139 @@ def write_export_file(
     os.chdir(cwd)
 
 
+def download_export_file(key, file_name):
+    export_service = get_export_service()
+    with open(file_name, 'wb') as file:
+        for chunk in export_service.file_iterator(export_service.get_object(key)):
+            file.write(chunk)
+
+
+def write_export_delta_file(version, base_version, logger, start_time, parallel=None):  # pylint: disable=too-many-arguments
+    """
+    Exports only the concepts/mappings that are new, changed, retired or removed in version compared to
+    base_version (see ChecksumDiff.get_delta). rebuild_export_file turns base_version's export plus its deltas
+    back into a full export.
+    """
+    cwd = cd_temp()
+    logger.info(f'Writing delta export of {version.uri} from {base_version.uri} to tmp directory: {cwd}')
+    if parallel is None:
+        parallel = get(settings, 'EXPORT_PARALLEL_PROCESSES', 1)
+    batch_size = 1000
+
+    delta = version.delta(base_version, version)
+    logger.info('Done computing delta.')
+
+    with zipfile.ZipFile('export.zip', 'w', zipfile.ZIP_DEFLATED) as _zip, \
+            io.TextIOWrapper(_zip.open('delta.json', 'w', force_zip64=True), encoding='utf-8') as out:
+        out.write(json.dumps({
+            'type': f'{version.resource_type} Delta', 'url': version.uri, 'base_url': base_version.uri
+        })[:-1])
+        for resource in ['concepts', 'mappings']:
+            resource_delta = delta[resource]
+            out.write(f', "{resource}": {{')
+            for key in ['new', 'changed', 'retired']:
+                out.write(f'"{key}": [')
+                write_export_fragments(out, get_export_fragments(
+                    resource, chunks(sorted(resource_delta[key], reverse=True), batch_size), {'is_active': True},
+                    logger, parallel=parallel
+                ))
+                out.write('], ')
+            out.write(f'"removed": {json.dumps(resource_delta["removed"])}, ')
+            out.write(f'"base_uuids": {json.dumps([str(_id) for _id in resource_delta["base_ids"]])}}}')
+
+        end_time = str(round((time.time() - start_time) + 2, 2))
+        out.write(', "export_time": ' + json.dumps(f"{end_time}secs", cls=encoders.JSONEncoder) + '}')
+
+    version.update_extras('__export_delta_base', base_version.version)
+
+    upload_export_file(version.get_version_export_delta_path(base_version.version), logger, cwd)
+
+
+def iter_export_rows(file_name, resource):
+    with zipfile.ZipFile(file_name) as _zip, _zip.open('export.json') as file:
+        yield from ijson.items(file, f'{resource}.item', use_float=True)
+
+
+def merge_export_rows(base_rows, delta_rows, dropped_uuids):
+    """
+    Merges the rows of a base export (ordered by -id) with delta rows (mapped by uuid), leaving out base rows
+    that were dropped or replaced, keeping the ordering of a full export.
+    """
+    def sort_key(row):
+        return -int(row['uuid'])
+
+    return heapq.merge(
+        (row for row in base_rows if row['uuid'] not in dropped_uuids and row['uuid'] not in delta_rows),
+        sorted(delta_rows.values(), key=sort_key),
+        key=sort_key
+    )
+
+
+def rebuild_export_file(
+        version, resource_serializer_type, logger, start_time
+):  # pylint: disable=too-many-locals
+    """
+    Rebuilds the full export of version from the nearest older version that has a full export plus the chain of
+    deltas (see write_export_delta_file) leading up to version. The base export is streamed, never loaded.
+    Returns False if there is no such chain.
+    """
+    chain = []
+    base_version = version
+    visited = {version.id}
+    while not base_version.has_export():
+        delta_base_version = base_version.export_delta_base_version
+        if not delta_base_version:
+            logger.info(f'No full export or delta export found for {base_version.uri}.')
+            return False
+        if delta_base_version.id in visited:
+            logger.info(f'Delta export chain of {version.uri} loops back to {delta_base_version.uri}.')
+            return False
+        visited.add(delta_base_version.id)
+        chain.insert(0, (base_version, delta_base_version))
+        base_version = delta_base_version
+
+    if not chain:
+        logger.info(f'{version.uri} already has a full export.')
+        return False
+
+    cwd = cd_temp()
+    logger.info(f'Rebuilding export of {version.uri} from {base_version.uri} and {len(chain)} delta(s) in {cwd}')
+    download_export_file(base_version.get_export_path(), 'base.zip')
+
+    rows = {'concepts': {}, 'mappings': {}}
+    dropped_uuids = {'concepts': set(), 'mappings': set()}
+    for index, (delta_version, delta_base_version) in enumerate(chain):
+        file_name = f'delta_{index}.zip'
+        download_export_file(delta_version.get_version_export_delta_path(delta_base_version.version), file_name)
+        with zipfile.ZipFile(file_name) as _zip, _zip.open('delta.json') as file:
+            delta = json.load(file)
+        for resource, resource_rows in rows.items():
+            base_uuids = set(delta[resource]['base_uuids'])
+            dropped_uuids[resource] |= base_uuids
+            for uuid_ in base_uuids:
+                resource_rows.pop(uuid_, None)
+            for key in ['new', 'changed', 'retired']:
+                resource_rows.update({row['uuid']: row for row in delta[resource][key]})
+        logger.info(f'Applied delta of {delta_version.uri}.')
+
+    resource_string = json.dumps(get_class(resource_serializer_type)(version).data, cls=encoders.JSONEncoder)
+    with zipfile.ZipFile('export.zip', 'w', zipfile.ZIP_DEFLATED) as _zip, \
+            io.TextIOWrapper(_zip.open('export.json', 'w', force_zip64=True), encoding='utf-8') as out:
+        out.write(f'{resource_string[:-1]}, "concepts": [')
+        write_export_rows(out, merge_export_rows(
+            iter_export_rows('base.zip', 'concepts'), rows['concepts'], dropped_uuids['concepts']))
+        out.write('], "mappings": [')
+        write_export_rows(out, merge_export_rows(
+            iter_export_rows('base.zip', 'mappings'), rows['mappings'], dropped_uuids['mappings']))
+        end_time = str(round((time.time() - start_time) + 2, 2))
+        out.write('], "export_time": ' + json.dumps(f"{end_time}secs", cls=encoders.JSONEncoder) + '}')
+
+    version.update_extras('__export_time', end_time)
+
+    upload_export_file(version.version_export_path, logger, cwd)
+    return True
+
+
 def get_api_base_url():
     return settings.API_BASE_URL
 
@@ -442,8 +642,9 @@ def es_get(url, **kwargs):
     return None
 
 
-def queue_bulk_import(  # pylint: disable=too-many-arguments
-        to_import, import_queue, username, update_if_exists, threads=None, inline=False, sub_task=False
+def queue_bulk_import(  # pylint: disable=too-many-arguments,too-many-locals
+        to_import, import_queue, username, update_if_exists, threads=None, inline=False, sub_task=False,
+        stream=False
 ):
     """
     Used to queue bulk imports. It assigns a bulk import task to a specified import queue or a random one.
@@ -456,6 +657,7 @@ def queue_bulk_import(  # pylint: disable=too-many-arguments
     :param threads:
     :param inline:
     :param sub_task:
+    :param stream: to_import is the path/URL of a JSON lines file, read lazily by the parallel inline import
     :return: task
     """
 
@@ -464,9 +666,11 @@ def queue_bulk_import(  # pylint: disable=too-many-arguments
     if inline:
         if sub_task:
             task_func = bulk_import_parts_inline
-        elif threads:
+        elif threads or stream:
             task_func = bulk_import_parallel_inline
-            args = (to_import, username, update_if_exists, threads)
+            args = (to_import, username, update_if_exists, threads or 5)
+            if stream:
+                args += (True, )
         else:
             # TODO: bulk_import_inline is unreachable from the current view layer —
             # import_response always passes `parallel_threads = request.data.get('parallel') or 5`
@@ -858,38 +1062,90 @@ def es_id_in(search, ids):
     return search
 
 
-def es_to_pks(search):
-    # doesn't care about the order
-    default_limit = 25
-    limit = default_limit
-    offset = 0
-    result_count = 25
-    pks = []
-    while result_count > 0:
-        hits = search[offset:limit].execute().hits
-        result_count = len(hits)
-        if result_count:
-            pks += [hit.meta.id for hit in hits]
-        offset += default_limit
-        limit += default_limit
-    return pks
+def es_to_pks(search, batch_size=5000, keep_alive='1m', ordered=False):
+    """
+    Yields the ids of all the hits of search, in no particular order, or in the order of its sort with ordered.
+
+    Walks a point in time with search_after, batch_size ids at a time and without any _source, so that the
+    whole result costs one request per batch instead of a from/size window that grows with every request.
+    """
+    from elasticsearch_dsl.connections import connections
+    connection = connections.get_connection(search._using)  # pylint: disable=protected-access
+    point_in_time = connection.open_point_in_time(
+        index=','.join(search._index or ['*']), keep_alive=keep_alive)['id']  # pylint: disable=protected-access
+    # a point in time already knows its indexes
+    search = search.index().source(False).extra(track_total_hits=False)[0:batch_size]
+    if not ordered:
+        # _shard_doc is the cheapest sort of a point in time, otherwise it adds it after the search's own sort as a
+        # tiebreaker
+        search = search.sort('_shard_doc')
+    try:
+        while True:
+            response = search.extra(pit={'id': point_in_time, 'keep_alive': keep_alive}).execute()
+            point_in_time = response.to_dict().get('pit_id') or point_in_time
+            hits = response.hits
+            for hit in hits:
+                yield hit.meta.id
+            if len(hits) < batch_size:
+                break
+            search = search.extra(search_after=list(hits[-1].meta.sort))
+    finally:
+        connection.close_point_in_time(id=point_in_time)
+
+
+def keyset_batches(qs, batch_size=1000, field='id', flat=False, descending=True, server_side_cursor=False):  # pylint: disable=too-many-arguments
+    """
+    Yields lists of at most batch_size rows of qs ordered by `field`.
+
+    Each batch seeks past the last seen value (WHERE field < last ORDER BY field DESC LIMIT n) instead of
+    OFFSET slicing, so later batches cost the same as the first one. With flat=True rows are the `field`
+    values themselves. With server_side_cursor=True the rows are streamed from a single ordered query
+    through a server side cursor instead.
+
+    Usage:
+        for batch in keyset_batches(Concept.objects.filter(parent_id=1), 500):
+            for concept in batch:
+                print(concept.id)
+    """
+    qs = qs.order_by(f'-{field}' if descending else field)
+    if flat:
+        qs = qs.values_list(field, flat=True)
+
+    if server_side_cursor:
+        batch = []
+        for row in qs.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+
+    lookup = f'{field}__lt' if descending else f'{field}__gt'
+    last = None
+    while True:
+        batch = list((qs if last is None else qs.filter(**{lookup: last}))[:batch_size])
+        if not batch:
+            break
+        yield batch
+        if len(batch) < batch_size:
+            break
+        last = batch[-1] if flat else getattr(batch[-1], field)
 
 
 def batch_qs(qs, batch_size=1000):
     """
-    Returns a sub-queryset for each batch in the given queryset.
+    Returns a sub-queryset for each batch in the given queryset, batched by id with keyset_batches.
 
     Usage:
-        # Make sure to order your querset
-        article_qs = Article.objects.order_by('id')
+        article_qs = Article.objects.filter(published=True)
         for qs in batch_qs(article_qs):
             for article in qs:
                 print article.body
     """
-    total = qs.count()
-    for start in range(0, total, batch_size):
-        end = min(start + batch_size, total)
-        yield qs[start:end]
+    for ids in keyset_batches(qs, batch_size, flat=True):
+        yield qs.filter(id__in=ids)
 
 
 def split_list_by_condition(items, predicate):
@@ -981,3 +1237,43 @@ def get_embeddings(txt):
         from sentence_transformers import SentenceTransformer
         model = SentenceTransformer(settings.LM_MODEL_NAME)
     return model.encode(str(txt))
+
+
+def get_response_cache_generation_key(scope):
+    return f'response_cache:generation:{scope}'
+
+
+def get_response_cache_generations(*scopes):
+    """
+    Current generations of the content of scopes (a repo's response_cache_scope, 'any' or 'all'), part of the keys
+    of cached responses, so that a response is never served once anything it was made of has changed.
+    """
+    keys = [get_response_cache_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # a lost generation (e.g. evicted) restarts from now, past any of its old values
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_response_cache_generation(*scopes):
+    """
+    Invalidates the cached responses of the repos of scopes and those across repos ('any').
+    Without scopes, when what changed is not known, every cached response ('all').
+    """
+    for scope in [*scopes, 'any'] if scopes else ['all']:
+        key = get_response_cache_generation_key(scope)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:  # not there (yet or anymore)
+                cache.add(key, int(time.time() * 1000), timeout=None)
+        except Exception:  # pylint: disable=broad-except
+            pass  # cache unavailable, nothing is served from it either
+
+
+def generate_etag(*parts):
+    """Quoted ETag of the parts a representation is made of, e.g. checksums, timestamps and the request path."""
+    return quote_etag(hashlib.md5(json.dumps(parts, default=str).encode()).hexdigest())
@@ -1,4 +1,6 @@
 import base64
+from contextlib import closing
+from itertools import islice
 from email.mime.image import MIMEImage
 
 import markdown
@@ -10,7 +12,7 @@ from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from elasticsearch import RequestError, TransportError
+from elasticsearch import RequestError, TransportError, NotFoundError
 from elasticsearch_dsl import Q
 from pydash import get, compact
 from rest_framework import response, generics, status
@@ -25,7 +27,7 @@ from core.common.constants import SEARCH_PARAM, LIST_DEFAULT_LIMIT, CSV_DEFAULT_
     LIMIT_PARAM, NOT_FOUND, MUST_SPECIFY_EXTRA_PARAM_IN_BODY, INCLUDE_RETIRED_PARAM, VERBOSE_PARAM, HEAD, LATEST, \
     BRIEF_PARAM, ES_REQUEST_TIMEOUT, INCLUDE_INACTIVE, FHIR_LIMIT_PARAM, RAW_PARAM, SEARCH_MAP_CODES_PARAM, \
     INCLUDE_SEARCH_META_PARAM, EXCLUDE_FUZZY_SEARCH_PARAM, EXCLUDE_WILDCARD_SEARCH_PARAM, UPDATED_BY_USERNAME_PARAM, \
-    CANONICAL_URL_REQUEST_PARAM, CHECKSUMS_PARAM, ACCESS_TYPE_NONE
+    CANONICAL_URL_REQUEST_PARAM, CHECKSUMS_PARAM, ACCESS_TYPE_NONE, CURSOR_PARAM
 from core.common.exceptions import Http400
 from core.common.mixins import PathWalkerMixin
 from core.common.search import CustomESSearch
@@ -33,7 +35,7 @@ from core.common.serializers import RootSerializer
 from core.common.swagger_parameters import all_resource_query_param
 from core.common.throttling import ThrottleUtil
 from core.common.utils import compact_dict_by_values, to_snake_case, parse_updated_since_param, \
-    to_int, get_falsy_values, get_truthy_values, format_url_for_search
+    to_int, get_falsy_values, get_truthy_values, format_url_for_search, es_to_pks
 from core.concepts.permissions import CanViewParentDictionary, CanEditParentDictionary
 from core.orgs.constants import ORG_OBJECT_TYPE
 from core.users.constants import USER_OBJECT_TYPE
@@ -60,6 +62,8 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
     default_qs_sort_attr = '-updated_at'
     facet_class = None
     total_count = 0
+    _facets = None
+    _next_cursor = None
 
     def get_throttles(self):
         return ThrottleUtil.get_throttles_by_user_plan(self.request.user)
@@ -521,29 +525,45 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
             return 'is_latest_version'
         return None
 
-    def get_facets(self):  # pylint: disable=too-many-branches
-        facets = {}
-        parent_repo = None
-
-        if self.facet_class:
-            if self.is_user_document():
-                return facets
-
-            params = {
-                'query': self.get_search_string(lower=False),
-                '_search': self.__get_search_results(
-                    ignore_retired_filter=True, sort=False, highlight=False, force=True)
-            }
-            if 'source' in self.kwargs and self.is_concept_document():
-                parent_repo = params['parent'] = get(self, 'parent_resource')
+    def get_faceted_search(self):
+        if not self.facet_class or self.is_user_document():
+            return None
+        params = {
+            'query': self.get_search_string(lower=False),
+            '_search': self.__get_search_results(
+                ignore_retired_filter=True, sort=False, highlight=False, force=True)
+        }
+        if 'source' in self.kwargs and self.is_concept_document():
+            params['parent'] = get(self, 'parent_resource')
+        return self.facet_class(**params)  # pylint: disable=not-callable
 
-            faceted_search = self.facet_class(**params) # pylint: disable=not-callable
+    def get_facets(self):
+        if self._facets is not None:  # already fetched along with the results (see bundle_facets)
+            return self._facets
+        facets = {}
+        faceted_search = self.get_faceted_search()
+        if faceted_search:
             faceted_search.params(request_timeout=ES_REQUEST_TIMEOUT)
             try:
                 s = faceted_search.execute()
                 facets = s.facets.to_dict()
             except TransportError as ex:  # pragma: no cover
                 raise Http400(detail=get(ex, 'info') or get(ex, 'error') or str(ex)) from ex
+        elif self.facet_class and self.is_user_document():
+            return facets
+        return self.format_facets(facets)
+
+    def bundle_facets(self, es_search):
+        """Sends the facets request in the same multi search request as the results (see CustomESSearch.bundle)"""
+        faceted_search = self.get_faceted_search() if self.should_include_facets() else None
+        if not faceted_search:
+            return None
+        es_search.bundle(faceted_search.build_search())
+        return faceted_search
+
+    def format_facets(self, facets):  # pylint: disable=too-many-branches
+        parent_repo = get(self, 'parent_resource') if self.facet_class and 'source' in self.kwargs and (
+            self.is_concept_document()) else None
         if not get(self.request.user, 'is_authenticated'):
             facets.pop('updatedBy', None)
         if self.should_search_latest_repo() and self.is_source_child_document_model() and 'source_version' in facets:
@@ -956,22 +976,39 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
         page = max(to_int(self.request.GET.get('page'), 1), 1)
         start = offset or (page - 1) * self.limit
         end = start + self.limit
+        cursor = self.get_cursor()
+        if cursor is not None:
+            offset, start, end = 0, 0, self.limit
         try:
-            search_results = search_results.params(request_timeout=ES_REQUEST_TIMEOUT)
             es_search = CustomESSearch(search_results[start:end], self.document_model)
+            if self.can_serve_from_source():
+                es_search.serve_from_source()
+            if cursor is not None:
+                try:
+                    es_search.paginate_with_cursor(cursor)
+                except ValueError as ex:
+                    raise Http400(detail=str(ex)) from ex
+            faceted_search = self.bundle_facets(es_search)
             es_search.to_queryset(
                 address_duplicates=self.is_source_child_document_model() and (
                         'source' in self.kwargs or 'collection' in self.kwargs)
             )
+            if faceted_search and get(es_search.bundled_responses, '0') is not None:
+                self._facets = self.format_facets(faceted_search.to_facets(es_search.bundled_responses[0]))
             self.total_count = es_search.total - offset
+            self._next_cursor = es_search.next_cursor
             return es_search.queryset, es_search.scores, es_search.max_score, es_search.highlights
+        except NotFoundError as ex:  # pragma: no cover
+            if cursor:
+                raise Http400(detail='Cursor has expired. Please start again without a cursor.') from ex
+            raise Http400(detail=get(ex, 'info') or get(ex, 'error') or str(ex)) from ex
         except RequestError as ex:  # pragma: no cover
             reason = get(
                 ex, 'info.error.caused_by.reason', ''
             ) or get(ex, 'info.error.root_cause.0.reason', '')
             if reason.startswith('Result window is too large'):
                 reason = 'Only 10000 results are available. Please apply additional filters or fine tune your query '\
-                         ' to get more accurate results.'
+                         ' to get more accurate results, or page through all of them with cursor=true.'
             elif 'input automaton is too large' in reason:
                 reason = 'Input value is too large.'
 
@@ -979,6 +1016,40 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
         except TransportError as ex:  # pragma: no cover
             raise Http400(detail=get(ex, 'info') or get(ex, 'error') or str(ex)) from ex
 
+    def can_serve_from_source(self):
+        """
+        Brief lists are served from the brief representation stored in the documents, unless the request asks for a
+        field that it does not have (e.g. includeMappings or includeSearchMeta)
+        """
+        if not get(settings, 'ES_BRIEF_FROM_SOURCE') or not hasattr(self.document_model, 'get_brief_serializer'):
+            return False
+        serializer_class = self.document_model.get_brief_serializer()
+        if self.get_serializer_class() is not serializer_class:
+            return False
+        return set(self.get_serializer().fields).issubset(serializer_class().fields)
+
+    def get_cursor(self):
+        """
+        Cursor of the requested page when paginating with search_after instead of page/offset, '' for the first page
+        (cursor=true), None when not paginating with a cursor.
+        """
+        if CURSOR_PARAM not in self.request.query_params:
+            return None
+        cursor = self.request.query_params.get(CURSOR_PARAM) or ''
+        return '' if cursor in TRUTHY else cursor
+
+    def get_object_ids(self):
+        if self.is_searchable and self.should_perform_es_search() and not self.is_fuzzy_search:
+            search = self.__get_search_results(highlight=False)
+            if search is not None:
+                # top hits in the request's sort (relevance by default), closed once sliced, so that the point in time
+                # is closed right away
+                with closing(es_to_pks(
+                        search.params(request_timeout=ES_REQUEST_TIMEOUT), batch_size=CSV_DEFAULT_LIMIT,
+                        ordered=True)) as pks:
+                    return list(islice(pks, CSV_DEFAULT_LIMIT))
+        return super().get_object_ids()
+
     def get_search_results_qs(self):
         return self.__get_queryset_from_search_results(self.__get_search_results())
 
@@ -1001,19 +1072,6 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
                 return True
         return False
 
-    def is_repo_version_children_request_without_any_search(self):
-        # used for caching repo versions concepts/mappings first page
-        if self.is_repo_version_children_request() and not self.get_search_string() and not self.is_verbose():
-            page = self.request.query_params.dict().get('page', '').strip()
-            sort = self.request.query_params.dict().get('sortDesc', '').strip()
-            limit = self.request.query_params.dict().get('limit', '').strip()
-            if limit:
-                limit = to_int(limit, 25)
-            return bool(
-                (not limit or limit == 25) and (not page or page in [1, '1']) and (not sort or sort == '_score')
-            )
-        return False
-
     def should_perform_es_search(self):
         if self.is_repo_version_children_request() and self.request.query_params.get('onlyHierarchyRoot') not in TRUTHY:
             return True
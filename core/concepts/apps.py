@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ConceptConfig(AppConfig):
+    name = 'core.concepts'
+    verbose_name = "Concept"
+
+    def ready(self):
+        from core.concepts import signals  # pylint: disable=unused-variable, unused-import
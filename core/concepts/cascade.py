@@ -0,0 +1,233 @@
+"""
+$cascade of concepts in a repo version, computed by the database in one recursive query instead of level by level.
+"""
+from collections import Counter
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import F, Q
+
+from core.common.constants import ALL
+
+
+class ConceptCascade:  # pylint: disable=too-many-instance-attributes
+    """
+    Concepts and mappings reachable from root concepts in a repo version (source or collection version), same as
+    cascading them level by level with Concept.get_cascaded_resources:
+      mappings  -- of the repo version, from the concept (to it, if reverse), of the concept's versioned object too
+      concepts  -- of the repo version, targets (sources, if reverse) of the mappings of cascade map types, from the
+                   concept's source only in a source version, and children (parents, if reverse) of the concept
+    Concepts and mappings of omit_if_exists_in are left out, those concepts are not cascaded any further.
+
+    The closure is a WITH RECURSIVE query over the concepts of the repo version, its mappings and the hierarchy
+    through-table, each cascade level being an iteration of the query, so that its depth bounds cascade_levels.
+    """
+    # levels first computed when max_results may cut an unbounded cascade, doubled until the cut is found
+    INITIAL_LEVELS = 8
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, repo_version, is_collection=False, source_mappings=True, source_to_concepts=True,
+            mappings_criteria=None, return_map_types_criteria=None, cascade_mappings=True, cascade_hierarchy=True,
+            include_retired=False, reverse=False, omit_concepts_criteria=None, omit_mappings_criteria=None
+    ):
+        self.repo_version = repo_version
+        self.is_collection = is_collection
+        self.expansion = repo_version.expansion if is_collection else None
+        self.is_head = repo_version.is_head
+        self.include_retired = include_retired
+        self.reverse = reverse
+        self.mappings_criteria = mappings_criteria
+        self.return_map_types_criteria = return_map_types_criteria
+        self.omit_concepts_criteria = omit_concepts_criteria
+        self.omit_mappings_criteria = omit_mappings_criteria
+        has_mappings = cascade_mappings and (source_mappings or source_to_concepts)
+        self.cascade_mappings = bool(has_mappings and source_to_concepts)
+        self.cascade_hierarchy = bool(source_to_concepts and cascade_hierarchy)
+        self.return_mappings = bool(has_mappings and return_map_types_criteria is not False)
+
+    @property
+    def is_cascadable(self):
+        return not self.is_collection or bool(self.expansion)
+
+    def closure(self, root_ids, cascade_levels=ALL, max_results=None):
+        """
+        (concept ids, mapping ids) of the cascade of root_ids, roots included.
+        Like the level by level cascade, no more levels are cascaded once concepts and mappings reach max_results.
+        """
+        root_ids = list(root_ids)
+        if not root_ids or not self.is_cascadable:
+            return set(root_ids), set()
+
+        if cascade_levels == ALL:
+            concepts, mappings = self.execute(root_ids)
+            if max_results is None or len(concepts) + len(mappings) < max_results:
+                return set(concepts), set(mappings)
+            levels = self.INITIAL_LEVELS
+            while True:
+                concepts, mappings = self.execute(root_ids, levels)
+                depth = self.get_cut_depth(concepts, mappings, levels + 1, max_results)
+                if depth is not None:
+                    break
+                levels *= 2
+        else:
+            concepts, mappings = self.execute(root_ids, cascade_levels)
+            depth = self.get_cut_depth(concepts, mappings, cascade_levels, max_results) or cascade_levels
+
+        return (
+            {_id for _id, _depth in concepts.items() if _depth <= depth},
+            {_id for _id, _depth in mappings.items() if _depth < depth}
+        )
+
+    @staticmethod
+    def get_cut_depth(concepts, mappings, levels, max_results):
+        """
+        Depth of the first level, below levels, not cascaded because concepts (up to that depth) and mappings (of
+        the concepts above it) reached max_results, if any.
+        """
+        if max_results is None:
+            return None
+        concepts_at = Counter(concepts.values())
+        mappings_at = Counter(mappings.values())
+        total = concepts_at[0]
+        for depth in range(1, levels):
+            total += concepts_at[depth] + mappings_at[depth - 1]
+            if total >= max_results:
+                return depth
+        return None
+
+    def execute(self, root_ids, levels=None):
+        """
+        ({concept id: depth}, {mapping id: depth of the concept it is cascaded from}) up to levels.
+        Without levels, the whole closure with depths 0, each concept being cascaded only once.
+        """
+        sql, params = self.get_sql(root_ids, levels)
+        concepts, mappings = {}, {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for resource_type, _id, depth in cursor.fetchall():
+                (concepts if resource_type == 'concept' else mappings)[_id] = depth
+        return concepts, mappings
+
+    def get_sql(self, root_ids, levels=None):  # pylint: disable=too-many-locals
+        from core.concepts.models import Concept, HierarchicalConcepts
+        concepts_table = Concept._meta.db_table  # pylint: disable=protected-access
+        ctes = []
+        params = []
+
+        def add_cte(name, columns, queryset):
+            sql, _params = self.get_queryset_sql(queryset, columns)
+            ctes.append(f'{name}({", ".join(columns)}) AS ({sql})')
+            params.extend(_params)
+
+        steps = []
+        if self.cascade_mappings:
+            add_cte('nodes', ['id', 'versioned_object_id'], self.get_concepts())
+            add_cte(
+                'edge_mappings', ['from_concept_id', 'to_concept_id'],
+                self.get_mappings().filter(self.mappings_criteria or Q())
+            )
+            mapped_column, node_column = ('from_concept_id', 'to_concept_id') if self.reverse else (
+                'to_concept_id', 'from_concept_id')
+            same_parent = '' if self.is_collection else ' AND mapped.parent_id = concept.parent_id'
+            # in a reverse cascade the versioned objects of the concepts are matched to the mapped concept ids
+            mapped_id = 'id' if self.reverse else 'versioned_object_id'
+            steps.append(
+                f'SELECT target.id FROM edge_mappings mapping '
+                f'JOIN {concepts_table} mapped ON mapped.id = mapping.{mapped_column}{same_parent} '
+                f'JOIN nodes target ON target.versioned_object_id = mapped.{mapped_id} '
+                f'WHERE mapping.{node_column} IN (concept.id, concept.versioned_object_id)'
+            )
+        if self.cascade_hierarchy:
+            add_cte('hierarchy_nodes', ['id'], self.get_hierarchy_concepts())
+            related_column, node_column = ('parent_id', 'child_id') if self.reverse else ('child_id', 'parent_id')
+            # HEAD cascades to the versioned objects of the related concepts, other versions to versioned concepts
+            target = 'target.id = related.versioned_object_id' if self.is_head else \
+                'target.id = related.id AND related.id <> related.versioned_object_id'
+            steps.append(
+                f'SELECT target.id FROM {HierarchicalConcepts._meta.db_table} hierarchy '  # pylint: disable=protected-access
+                f'JOIN {concepts_table} related ON related.id = hierarchy.{related_column} '
+                f'JOIN hierarchy_nodes target ON {target} '
+                f'WHERE hierarchy.{node_column} IN ('
+                f'SELECT concept.id UNION ALL '
+                f'SELECT concept.versioned_object_id WHERE concept.is_latest_version UNION ALL '
+                f'SELECT latest.id FROM {concepts_table} latest WHERE concept.id = concept.versioned_object_id '
+                f'AND latest.versioned_object_id = concept.id AND latest.is_active AND latest.is_latest_version)'
+            )
+        if self.return_mappings:
+            mappings = self.get_mappings().filter(self.return_map_types_criteria or Q())
+            if self.omit_mappings_criteria:
+                mappings = mappings.exclude(self.omit_mappings_criteria)
+            add_cte('returned_mappings', ['id', 'from_concept_id', 'to_concept_id'], mappings)
+
+        cascade = 'SELECT root.id, 0 FROM unnest(%s::bigint[]) AS root(id)'
+        params.append(root_ids)
+        if steps:
+            cascade += (
+                f' UNION SELECT step.id, {"cascade.depth + 1" if levels else "0"} FROM cascade '
+                f'JOIN {concepts_table} concept ON concept.id = cascade.id '
+                f'CROSS JOIN LATERAL ({" UNION ".join(steps)}) AS step(id)'
+            )
+            if levels:
+                cascade += ' WHERE cascade.depth < %s'
+                params.append(levels)
+        ctes.append(f'cascade(id, depth) AS ({cascade})')
+        ctes.append('reached(id, depth) AS (SELECT id, MIN(depth) FROM cascade GROUP BY id)')
+
+        sql = f'WITH RECURSIVE {", ".join(ctes)} SELECT \'concept\', id, depth FROM reached'
+        if self.return_mappings:
+            node_column = 'to_concept_id' if self.reverse else 'from_concept_id'
+            sql += (
+                f' UNION ALL SELECT \'mapping\', mapping.id, MIN(reached.depth) FROM reached '
+                f'JOIN {concepts_table} concept ON concept.id = reached.id '
+                f'JOIN returned_mappings mapping ON mapping.{node_column} IN (concept.id, concept.versioned_object_id)'
+            )
+            if levels:  # concepts of the last level are not cascaded
+                sql += ' WHERE reached.depth < %s'
+                params.append(levels)
+            sql += ' GROUP BY mapping.id'
+
+        return sql, params
+
+    @staticmethod
+    def get_queryset_sql(queryset, columns):
+        try:
+            return queryset.order_by().values(*columns).query.sql_with_params()
+        except EmptyResultSet:  # e.g. map types criteria of no map type
+            return f'SELECT {", ".join(["NULL::bigint"] * len(columns))} WHERE FALSE', ()
+
+    def get_concepts(self):
+        """Concepts cascaded to via mappings"""
+        if self.is_collection:
+            queryset = self.expansion.concepts.all()
+        else:
+            queryset = self.repo_version.concepts.all()
+            if self.is_head:
+                queryset = queryset.filter(id=F('versioned_object_id'))
+        return self.__filter_concepts(queryset)
+
+    def get_hierarchy_concepts(self):
+        """Concepts cascaded to via the hierarchy"""
+        from core.concepts.models import Concept
+        if self.is_collection:
+            queryset = Concept.objects.filter(expansion_set__collection_version=self.repo_version)
+        else:
+            queryset = Concept.objects.filter(sources=self.repo_version)
+        return self.__filter_concepts(queryset)
+
+    def __filter_concepts(self, queryset):
+        if not self.include_retired:
+            queryset = queryset.filter(retired=False)
+        if self.omit_concepts_criteria:
+            queryset = queryset.exclude(self.omit_concepts_criteria)
+        return queryset
+
+    def get_mappings(self):
+        if self.is_collection:
+            queryset = self.expansion.mappings.all()
+        else:
+            queryset = self.repo_version.mappings.all()
+            if self.is_head:
+                queryset = queryset.filter(id=F('versioned_object_id'))
+        if not self.include_retired:
+            queryset = queryset.filter(retired=False)
+        return queryset
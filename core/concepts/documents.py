@@ -8,6 +8,10 @@ from core.concepts.models import Concept
 
 @registry.register_document
 class ConceptDocument(Document):
+    # brief is the ConceptMinimalSerializer representation, brief lists are served from it without the db.
+    # Bump the version whenever that representation changes, older documents are served from the db until reindexed.
+    BRIEF_FIELDS_VERSION = 1
+
     class Index:
         name = 'concepts'
         settings = {'number_of_shards': 1, 'number_of_replicas': 0}
@@ -51,6 +55,8 @@ class ConceptDocument(Document):
     description = fields.TextField()
     same_as_map_codes = fields.ListField(fields.KeywordField())
     other_map_codes = fields.ListField(fields.KeywordField())
+    brief = fields.ObjectField(enabled=False)
+    brief_fields_version = fields.IntegerField()
     mapped_codes = fields.NestedField(
         properties={
             'source': fields.KeywordField(),
@@ -86,6 +92,19 @@ class ConceptDocument(Document):
             'external_id',
         ]
 
+    @staticmethod
+    def get_brief_serializer():
+        from core.concepts.serializers import ConceptMinimalSerializer
+        return ConceptMinimalSerializer
+
+    def prepare_brief(self, instance):
+        if not instance.checksums or not instance.has_all_checksums():
+            instance.checksums = instance.get_all_checksums()  # only for the document, indexing must not write
+        return dict(self.get_brief_serializer()(instance).data)
+
+    def prepare_brief_fields_version(self, _):
+        return self.BRIEF_FIELDS_VERSION
+
     @staticmethod
     def get_match_phrase_attrs():
         return ['_name', '_synonyms', 'name', 'synonyms']
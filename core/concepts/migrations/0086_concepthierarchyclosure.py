@@ -0,0 +1,61 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0045_auto_20250821_1050'),
+        ('concepts', '0085_concept_head_parent_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConceptHierarchyClosure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='+', to='concepts.concept')),
+                ('descendant', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='+', to='concepts.concept')),
+                ('source', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sources.source')),
+            ],
+            options={
+                'db_table': 'concept_hierarchy_closure',
+                'unique_together': {('ancestor', 'descendant')},
+                'indexes': [
+                    models.Index(fields=['ancestor', 'depth'], name='hierarchy_closure_ancestor'),
+                    models.Index(fields=['descendant', 'depth'], name='hierarchy_closure_descendant'),
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+                WITH RECURSIVE ancestors(descendant_id, ancestor_id, depth) AS (
+                    SELECT concept.id, parent.versioned_object_id, 1
+                    FROM concepts concept
+                    JOIN concepts version ON version.versioned_object_id = concept.id
+                    JOIN concepts_hierarchicalconcepts hierarchy ON hierarchy.child_id = version.id
+                    JOIN concepts parent ON parent.id = hierarchy.parent_id
+                    AND (parent.id = parent.versioned_object_id OR parent.is_latest_version)
+                    WHERE concept.id = concept.versioned_object_id
+                    UNION
+                    SELECT ancestors.descendant_id, parent.versioned_object_id, ancestors.depth + 1
+                    FROM ancestors
+                    JOIN concepts version ON version.versioned_object_id = ancestors.ancestor_id
+                    JOIN concepts_hierarchicalconcepts hierarchy ON hierarchy.child_id = version.id
+                    JOIN concepts parent ON parent.id = hierarchy.parent_id
+                    AND (parent.id = parent.versioned_object_id OR parent.is_latest_version)
+                    WHERE ancestors.depth < 100
+                )
+                INSERT INTO concept_hierarchy_closure (source_id, ancestor_id, descendant_id, depth)
+                SELECT concept.parent_id, ancestors.ancestor_id, ancestors.descendant_id, MIN(ancestors.depth)
+                FROM ancestors JOIN concepts concept ON concept.id = ancestors.descendant_id
+                WHERE ancestors.ancestor_id <> ancestors.descendant_id
+                GROUP BY concept.parent_id, ancestors.ancestor_id, ancestors.descendant_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -2,8 +2,8 @@ from django.conf import settings
 from django.contrib.postgres.indexes import HashIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import models, IntegrityError
-from django.db.models import F, Q
+from django.db import models, IntegrityError, connection, transaction
+from django.db.models import F, Q, OuterRef, Subquery
 from pydash import get, compact, has
 
 from core.common.checksums import ChecksumModel
@@ -13,11 +13,12 @@ from core.common.models import VersionedModel, ConceptContainerModel
 from core.common.tasks import process_hierarchy_for_new_concept, process_hierarchy_for_concept_version, \
     process_hierarchy_for_new_parent_concept_version, update_mappings_concept
 from core.common.utils import generate_temp_version, drop_version, \
-    startswith_temp_version, is_versioned_uri, decode_string
+    startswith_temp_version, is_versioned_uri, decode_string, chunks
 from core.concepts.constants import CONCEPT_TYPE, LOCALES_FULLY_SPECIFIED, LOCALES_SHORT, LOCALES_SEARCH_INDEX_TERM, \
     CONCEPT_WAS_RETIRED, CONCEPT_IS_ALREADY_RETIRED, CONCEPT_IS_ALREADY_NOT_RETIRED, CONCEPT_WAS_UNRETIRED, \
     ALREADY_EXISTS, CONCEPT_REGEX, MAX_LOCALES_LIMIT, \
     MAX_NAMES_LIMIT, MAX_DESCRIPTIONS_LIMIT
+from core.concepts.cascade import ConceptCascade
 from core.concepts.mixins import ConceptValidationMixin
 from core.services.storages.postgres import PostgresQL
 
@@ -194,6 +195,118 @@ class HierarchicalConcepts(models.Model):
     parent = models.ForeignKey('concepts.Concept', related_name='parent_child', on_delete=models.CASCADE)
 
 
+class ConceptHierarchyClosure(models.Model):
+    """
+    Materialized hierarchy of the versioned concepts of each source (HEAD), a row per concept and each of its
+    ancestors, with the depth of the shortest path between them (1 for parents). It is derived from
+    HierarchicalConcepts, where a concept's child is any version of it (as in child_concept_urls) linked to its
+    versioned object or latest version, and refreshed whenever parent concepts change (see refresh).
+    Ancestor paths, descendants up to a depth, children and their counts are then single indexed lookups.
+    """
+    class Meta:
+        db_table = 'concept_hierarchy_closure'
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(name='hierarchy_closure_ancestor', fields=['ancestor', 'depth']),
+            models.Index(name='hierarchy_closure_descendant', fields=['descendant', 'depth']),
+        ]
+
+    source = models.ForeignKey('sources.Source', related_name='+', on_delete=models.CASCADE)  # of the descendant
+    ancestor = models.ForeignKey('concepts.Concept', related_name='+', on_delete=models.CASCADE)
+    descendant = models.ForeignKey('concepts.Concept', related_name='+', on_delete=models.CASCADE)
+    depth = models.PositiveIntegerField()
+
+    MAX_DEPTH = 100  # guards the recursion against cycles in the hierarchy
+
+    @classmethod
+    def refresh(cls, concept_ids):
+        """
+        Recomputes the ancestors of the concepts (any of their versions) and of their descendants, i.e. what may have
+        changed after the parent concepts of concept_ids changed.
+        """
+        versioned_object_ids = set(
+            Concept.objects.filter(id__in=concept_ids).values_list('versioned_object_id', flat=True))
+        if not versioned_object_ids:
+            return
+        descendant_ids = versioned_object_ids | set(
+            cls.objects.filter(ancestor_id__in=versioned_object_ids).values_list('descendant_id', flat=True))
+        with transaction.atomic():
+            cls.objects.filter(descendant_id__in=descendant_ids).delete()
+            cls.__insert('concept.id = ANY(%s)', [list(descendant_ids)])
+
+    @classmethod
+    def build(cls, source_id):
+        """(Re)builds the closure of all the versioned concepts of a source (HEAD)"""
+        with transaction.atomic():
+            cls.objects.filter(source_id=source_id).delete()
+            cls.__insert('concept.parent_id = %s AND concept.id = concept.versioned_object_id', [source_id])
+
+    @classmethod
+    def __insert(cls, concepts_criteria, params):
+        concepts_table = Concept._meta.db_table  # pylint: disable=protected-access
+        hierarchy_table = HierarchicalConcepts._meta.db_table  # pylint: disable=protected-access
+        parents = (
+            f'JOIN {concepts_table} version ON version.versioned_object_id = {{child_id}} '
+            f'JOIN {hierarchy_table} hierarchy ON hierarchy.child_id = version.id '
+            f'JOIN {concepts_table} parent ON parent.id = hierarchy.parent_id '
+            f'AND (parent.id = parent.versioned_object_id OR parent.is_latest_version)'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH RECURSIVE ancestors(descendant_id, ancestor_id, depth) AS ('
+                f'SELECT concept.id, parent.versioned_object_id, 1 '
+                f'FROM {concepts_table} concept {parents.format(child_id="concept.id")} '
+                f'WHERE {concepts_criteria} '
+                f'UNION '
+                f'SELECT ancestors.descendant_id, parent.versioned_object_id, ancestors.depth + 1 '
+                f'FROM ancestors {parents.format(child_id="ancestors.ancestor_id")} '
+                f'WHERE ancestors.depth < %s) '
+                f'INSERT INTO {cls._meta.db_table} (source_id, ancestor_id, descendant_id, depth) '
+                f'SELECT concept.parent_id, ancestors.ancestor_id, ancestors.descendant_id, MIN(ancestors.depth) '
+                f'FROM ancestors JOIN {concepts_table} concept ON concept.id = ancestors.descendant_id '
+                f'WHERE ancestors.ancestor_id <> ancestors.descendant_id '
+                f'GROUP BY concept.parent_id, ancestors.ancestor_id, ancestors.descendant_id',
+                [*params, cls.MAX_DEPTH]
+            )
+
+    @classmethod
+    def get_ancestor_path(cls, versioned_object_id):
+        """
+        Ids of the ancestors of the concept from its root down to its parent, following the first parent (by id) of
+        each concept up
+        """
+        ancestor_ids = list(cls.objects.filter(descendant_id=versioned_object_id).values_list('ancestor_id', flat=True))
+        if not ancestor_ids:
+            return []
+        parents = {}
+        for descendant_id, ancestor_id in cls.objects.filter(
+                descendant_id__in=[versioned_object_id, *ancestor_ids], depth=1
+        ).order_by('-ancestor_id').values_list('descendant_id', 'ancestor_id'):
+            parents[descendant_id] = ancestor_id
+        path = []
+        parent_id = parents.get(versioned_object_id)
+        while parent_id is not None and parent_id not in path:
+            path.append(parent_id)
+            parent_id = parents.get(parent_id)
+        path.reverse()
+        return path
+
+    @classmethod
+    def get_descendants(cls, versioned_object_id, depth=1):
+        """Versioned concepts under the concept, down to depth levels"""
+        return Concept.objects.filter(
+            id__in=cls.objects.filter(ancestor_id=versioned_object_id, depth__lte=depth).values('descendant_id'))
+
+    @classmethod
+    def get_children_urls(cls, versioned_object_ids):
+        """{versioned object id: [urls of its children]}"""
+        urls = {_id: [] for _id in versioned_object_ids}
+        for ancestor_id, uri in cls.objects.filter(
+                ancestor_id__in=versioned_object_ids, depth=1).values_list('ancestor_id', 'descendant__uri'):
+            urls[ancestor_id].append(uri)
+        return urls
+
+
 class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pylint: disable=too-many-public-methods
     class Meta:
         db_table = 'concepts'
@@ -662,6 +775,54 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
             self.parent_concepts.set([parent.get_latest_version() for parent in parent_concepts])
             self._parent_concepts = None
 
+    @classmethod
+    def add_parent_concepts_in_bulk(cls, concept_map, batch_size=5000):
+        """
+        Set based version of set_parent_concepts_from_uris(create_parent_version=False) for many concepts at once.
+        concept_map is {parent_uri: [child_uris]}, each child (and its latest version) gets the latest version of
+        its parents as parent concept. Parent/child rows are written with bulk_create, existing ones are skipped, and
+        the hierarchy closure of the children is refreshed. Returns the number of rows created.
+        """
+        pairs = [(parent_uri, child_uri) for parent_uri, child_uris in concept_map.items() for child_uri in child_uris]
+        created = 0
+        for batch in chunks(pairs, batch_size):
+            concepts = {
+                uri: (_id, versioned_object_id) for uri, _id, versioned_object_id in cls.objects.filter(
+                    uri__in={uri for pair in batch for uri in pair}).values_list('uri', 'id', 'versioned_object_id')
+            }
+            latest_versions = cls.get_latest_version_ids({concept[1] for concept in concepts.values()})
+
+            rows = set()
+            for parent_uri, child_uri in batch:
+                parent_latest_id = latest_versions.get(get(concepts, [parent_uri, 1]))
+                if not parent_latest_id or child_uri not in concepts:
+                    continue
+                child_id, child_versioned_object_id = concepts[child_uri]
+                rows.add((child_id, parent_latest_id))
+                if child_versioned_object_id in latest_versions:
+                    rows.add((latest_versions[child_versioned_object_id], parent_latest_id))
+            if rows:
+                rows -= set(HierarchicalConcepts.objects.filter(
+                    child_id__in={row[0] for row in rows}, parent_id__in={row[1] for row in rows}
+                ).values_list('child_id', 'parent_id'))
+                HierarchicalConcepts.objects.bulk_create(
+                    [HierarchicalConcepts(child_id=child_id, parent_id=parent_id) for child_id, parent_id in rows],
+                    batch_size=1000
+                )
+                ConceptHierarchyClosure.refresh({row[0] for row in rows})  # bulk_create sends no m2m_changed
+                created += len(rows)
+        return created
+
+    @classmethod
+    def get_latest_version_ids(cls, versioned_object_ids):
+        """{versioned_object_id: latest_version_id}, same as get_latest_version for each of them"""
+        latest_versions = {}
+        for versioned_object_id, _id in cls.objects.filter(
+                versioned_object_id__in=versioned_object_ids, is_active=True, is_latest_version=True
+        ).order_by('-created_at').values_list('versioned_object_id', 'id'):
+            latest_versions.setdefault(versioned_object_id, _id)
+        return latest_versions
+
     def create_new_versions_for_removed_parents(self, uris):
         if uris:
             concepts = Concept.objects.filter(uri__in=uris)
@@ -891,6 +1052,18 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
             new_locale.save()
             new_locale.set_checksums()
 
+    def get_checksums_for_locales(self, names, descriptions):
+        # checksums of a concept whose locales are not saved yet, e.g. while bulk importing
+        data = {
+            field: getattr(self, field) for field in ['concept_class', 'datatype', 'retired', 'external_id', 'extras']
+        }
+        data['names'] = names
+        data['descriptions'] = descriptions
+        return {
+            self.STANDARD_CHECKSUM_KEY: self.generate_checksum_from_many('concept', data, 'standard'),
+            self.SMART_CHECKSUM_KEY: self.generate_checksum_from_many('concept', data, 'smart'),
+        }
+
     def remove_locales(self):
         self.names.all().delete()
         self.descriptions.all().delete()
@@ -1271,6 +1444,23 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
             from_concept_code=self.mnemonic, from_source_url__in=parent_uris, from_concept__isnull=True
         ).update(from_concept=self)
 
+    @staticmethod
+    def update_mappings_for(parent, mnemonics):
+        # Same as update_mappings, for many new concepts of a parent in two statements instead of two per concept
+        from core.mappings.models import Mapping
+        parent_uris = parent.identity_uris
+        versioned_objects = Concept.objects.filter(parent_id=parent.id, id=F('versioned_object_id'))
+
+        Mapping.objects.filter(
+            to_concept_code__in=mnemonics, to_source_url__in=parent_uris, to_concept__isnull=True
+        ).update(
+            to_concept_id=Subquery(versioned_objects.filter(mnemonic=OuterRef('to_concept_code')).values('id')[:1]))
+
+        Mapping.objects.filter(
+            from_concept_code__in=mnemonics, from_source_url__in=parent_uris, from_concept__isnull=True
+        ).update(
+            from_concept_id=Subquery(versioned_objects.filter(mnemonic=OuterRef('from_concept_code')).values('id')[:1]))
+
     @property
     def parent_concept_urls(self):
         return self.get_hierarchy_concept_urls('parent_concepts')
@@ -1297,7 +1487,14 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
         queryset = Concept.objects.filter(uri__in=self.get_hierarchy_concept_urls(relation, not repo_version.is_head))
         return queryset.filter(**filters)
 
+    @property
+    def has_hierarchy_closure(self):
+        """The versioned object and latest version of a concept are in ConceptHierarchyClosure, older versions not"""
+        return bool(self.id) and (self.is_versioned_object or self.is_latest_version)
+
     def child_concept_queryset(self):
+        if self.has_hierarchy_closure:
+            return ConceptHierarchyClosure.get_descendants(self.versioned_object_id)
         urls = self.child_concept_urls
         if urls:
             return Concept.objects.filter(uri__in=urls)
@@ -1305,10 +1502,15 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
 
     @property
     def children_concepts_count(self):
+        if self.has_hierarchy_closure:
+            return ConceptHierarchyClosure.objects.filter(ancestor_id=self.versioned_object_id, depth=1).count()
         return len(self.child_concept_urls)
 
     @property
     def has_children(self):
+        if self.has_hierarchy_closure:
+            return ConceptHierarchyClosure.objects.filter(ancestor_id=self.versioned_object_id, depth=1).exists()
+
         result = self.child_concepts.exists()
 
         if not result and self.is_latest_version:
@@ -1337,6 +1539,11 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
         return list({uri for uri in uris if is_versioned_uri(uri)})
 
     def get_hierarchy_path(self):
+        if self.has_hierarchy_closure:
+            path = ConceptHierarchyClosure.get_ancestor_path(self.versioned_object_id)
+            uris = dict(Concept.objects.filter(id__in=path).values_list('id', 'uri'))
+            return [drop_version(uris[_id]) for _id in path if _id in uris]
+
         result = []
         parent_concept = self.parent_concepts.first()
         while parent_concept is not None:
@@ -1355,8 +1562,9 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
 
         return None
 
-    def __get_omit_from_version_criteria(self, omit_if_exists_in, equivalency_map_types_criteria=None):
-        repo_version = self.__get_omit_from_version(omit_if_exists_in)
+    @classmethod
+    def __get_omit_from_version_criteria(cls, omit_if_exists_in, equivalency_map_types_criteria=None):
+        repo_version = cls.__get_omit_from_version(omit_if_exists_in)
         concepts_criteria = Q()
         mappings_criteria = Q()
         if repo_version:
@@ -1440,40 +1648,97 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
             from core.collections.models import Collection
             is_collection = repo_version.__class__ == Collection
 
-        cascaded = []
+        concept_ids, mapping_ids = ConceptCascade(
+            repo_version=repo_version, is_collection=is_collection,
+            source_mappings=source_mappings, source_to_concepts=source_to_concepts,
+            mappings_criteria=mappings_criteria, return_map_types_criteria=return_map_types_criteria,
+            cascade_mappings=cascade_mappings, cascade_hierarchy=cascade_hierarchy,
+            include_retired=include_retired, reverse=reverse,
+            omit_concepts_criteria=omit_concepts_criteria, omit_mappings_criteria=omit_mappings_criteria
+        ).closure([self.id], cascade_levels, max_results)
+
+        result['concepts'] = Concept.objects.filter(id__in=list(concept_ids))
+        result['mappings'] = Mapping.objects.filter(id__in=list(mapping_ids)).order_by('map_type', 'sort_weight')
+        return result
 
-        def iterate(level):
-            if level == ALL or level > 0:
-                if not cascaded or max_results is None or (
-                        result['concepts'].count() + result['mappings'].count()) < max_results:
-                    not_cascaded = result['concepts'].exclude(
-                        versioned_object_id__in=cascaded) if cascaded else result['concepts']
-                    if not_cascaded.exists():
-                        for concept in not_cascaded:
-                            res = concept.get_cascaded_resources(
-                                repo_version=repo_version,
-                                source_mappings=source_mappings, source_to_concepts=source_to_concepts,
-                                mappings_criteria=mappings_criteria, cascade_mappings=cascade_mappings,
-                                cascade_hierarchy=cascade_hierarchy,
-                                include_retired=include_retired, reverse=reverse, is_collection=is_collection,
-                                return_map_types_criteria=return_map_types_criteria
-                            )
-                            cascaded.append(concept.versioned_object_id)
-
-                            concepts_qs = res['concepts'].union(res['hierarchy_concepts']).union(result['concepts'])
-                            result['concepts'] = Concept.objects.filter(
-                                id__in=list(concepts_qs.values_list('id', flat=True))
-                            ).exclude(omit_concepts_criteria)
-
-                            mappings_qs = res['mappings'].union(result['mappings'])
-                            result['mappings'] = Mapping.objects.filter(
-                                id__in=list(mappings_qs.values_list('id', flat=True))
-                            ).exclude(omit_mappings_criteria).order_by('map_type', 'sort_weight')
-
-                        iterate(level if level == ALL else level - 1)
+    @classmethod
+    def cascade_many(  # pylint: disable=too-many-arguments,too-many-locals
+            cls, concepts, repo_version=None, source_mappings=True, source_to_concepts=True,
+            map_types=None, exclude_map_types=None, return_map_types=ALL, equivalency_map_types=None,
+            cascade_mappings=True, cascade_hierarchy=True, cascade_levels=ALL,
+            include_retired=False, reverse=False, omit_if_exists_in=None, max_results=1000,
+    ):
+        """
+        (concept ids, mapping ids) of the cascade of each of concepts (as cascade, with include_self), united.
+        All the concepts cascaded under the same repo version are the roots of one cascade, so that parts of the
+        closure they share are cascaded once, instead of once per concept.
+        """
+        concepts = list(concepts)
+        concept_ids = {concept.id for concept in concepts}
+        mapping_ids = set()
+        if cascade_levels == 0 or not repo_version or not concepts:
+            return concept_ids, mapping_ids
+
+        mappings_criteria = cls._get_cascade_mappings_criteria(map_types, exclude_map_types)
+        return_map_types_criteria = cls._get_return_map_types_criteria(return_map_types, mappings_criteria)
+        equivalency_map_types_criteria = cls._get_equivalency_map_types_criteria(equivalency_map_types)
+        omit_concepts_criteria, omit_mappings_criteria = cls.__get_omit_from_version_criteria(
+            omit_if_exists_in, equivalency_map_types_criteria)
 
-        iterate(cascade_levels)
-        return result
+        if omit_concepts_criteria:
+            omitted = set(Concept.objects.filter(omit_concepts_criteria).filter(
+                versioned_object_id__in={concept.versioned_object_id for concept in concepts}
+            ).values_list('versioned_object_id', flat=True))
+            concepts = [concept for concept in concepts if concept.versioned_object_id not in omitted]
+
+        if isinstance(repo_version, str):  # assumes its cascaded under source version, usage via collection-reference
+            roots = cls.__get_roots_by_source_version(concepts, decode_string(repo_version))
+            is_collection = False
+        else:
+            from core.collections.models import Collection
+            roots = {repo_version: [concept.id for concept in concepts]} if concepts else {}
+            is_collection = repo_version.__class__ == Collection
+
+        for _repo_version, root_ids in roots.items():
+            cascade = ConceptCascade(
+                repo_version=_repo_version, is_collection=is_collection,
+                source_mappings=source_mappings, source_to_concepts=source_to_concepts,
+                mappings_criteria=mappings_criteria, return_map_types_criteria=return_map_types_criteria,
+                cascade_mappings=cascade_mappings, cascade_hierarchy=cascade_hierarchy,
+                include_retired=include_retired, reverse=reverse,
+                omit_concepts_criteria=omit_concepts_criteria, omit_mappings_criteria=omit_mappings_criteria
+            )
+            if len(root_ids) == 1:
+                _concept_ids, _mapping_ids = cascade.closure(root_ids, cascade_levels, max_results)
+            else:
+                _concept_ids, _mapping_ids = cascade.closure(root_ids, cascade_levels)
+                if max_results is not None and len(_concept_ids) + len(_mapping_ids) >= max_results:
+                    # the cascade of some concept may stop at max_results, as it would on its own
+                    _concept_ids, _mapping_ids = set(), set()
+                    for root_id in root_ids:
+                        __concept_ids, __mapping_ids = cascade.closure([root_id], cascade_levels, max_results)
+                        _concept_ids |= __concept_ids
+                        _mapping_ids |= __mapping_ids
+            concept_ids |= _concept_ids
+            mapping_ids |= _mapping_ids
+
+        return concept_ids, mapping_ids
+
+    @staticmethod
+    def __get_roots_by_source_version(concepts, version):
+        """{source version: ids of concepts}, for the concepts in exactly one source version of that version"""
+        from core.sources.models import Source
+        source_ids = {}
+        for concept_id, source_id in Concept.sources.through.objects.filter(
+                concept_id__in=[concept.id for concept in concepts], source__version=version
+        ).values_list('concept_id', 'source_id'):
+            source_ids.setdefault(concept_id, []).append(source_id)
+        roots = {}
+        for concept_id, _source_ids in source_ids.items():
+            if len(_source_ids) == 1:
+                roots.setdefault(_source_ids[0], []).append(concept_id)
+        sources = Source.objects.in_bulk(list(roots))
+        return {sources[source_id]: root_ids for source_id, root_ids in roots.items()}
 
     def cascade_as_hierarchy(  # pylint: disable=too-many-arguments,too-many-locals,unused-argument
             self, repo_version=None, source_mappings=True, source_to_concepts=True,
@@ -2,9 +2,10 @@ from elasticsearch_dsl import TermsFacet, Q, NestedFacet
 from pydash import flatten, is_number, compact, get
 
 from core.common.constants import FACET_SIZE, HEAD
+from core.common.embeddings import Embeddings
 from core.common.lexical_variants import LexicalVariantDictionary
 from core.common.search import CustomESFacetedSearch, CustomESSearch
-from core.common.utils import get_embeddings, is_canonical_uri
+from core.common.utils import is_canonical_uri
 from core.concepts.models import Concept
 
 
@@ -120,10 +121,11 @@ class ConceptFuzzySearch:  # pragma: no cover
     def search(  # pylint: disable=too-many-locals,too-many-arguments,too-many-branches,too-many-statements
             cls, data, repo_url, repo_params=None, include_retired=False,
             is_semantic=False, num_candidates=2000, k_nearest=50, map_config=None, additional_filter_criterion=None,
-            locale_filter=None, variants_repo=None
+            locale_filter=None, variants_repo=None, embeddings=None
     ):
         from core.concepts.documents import ConceptDocument
         map_config = map_config or []
+        embeddings = embeddings or Embeddings()
         filter_query = cls.get_filter_criteria(
             data, include_retired, repo_params, repo_url, additional_filter_criterion)
         or_clauses = []
@@ -183,7 +185,7 @@ class ConceptFuzzySearch:  # pragma: no cover
             def get_knn_query(_field, _value, _boost):
                 return {
                         "field": _field,
-                        "query_vector": get_embeddings(_value).tolist(),
+                        "query_vector": embeddings.get(_value).tolist(),
                         "k": k_nearest,
                         "num_candidates": num_candidates,
                         "filter": filter_query,
@@ -325,6 +327,19 @@ class ConceptFuzzySearch:  # pragma: no cover
         search = search.sort({'_score': {'order': 'desc'}})
         return search
 
+    @staticmethod
+    def get_texts_to_embed(data, variants_repo=None):
+        """Name, synonyms and their lexical variants of a row, the texts its semantic search needs the vectors of"""
+        synonyms = data.get('synonyms')
+        if synonyms and not isinstance(synonyms, list):
+            synonyms = [synonyms]
+        texts = []
+        for term in compact([data.get('name', None), *(synonyms or [])]):
+            texts.append(term)
+            if variants_repo:
+                texts += list(LexicalVariantDictionary.get_variant_terms(term, source_uri=variants_repo))
+        return texts
+
     @classmethod
     def get_mapped_code_queries(cls, data, map_config):
         mapped_codes = cls.get_mapped_codes(data, map_config)
@@ -667,13 +667,19 @@ class ConceptHierarchySerializer(ModelSerializer):
     uuid = CharField(source='id')
     id = EncodedDecodedCharField(source='mnemonic')
     url = CharField(source='uri')
-    children = ListField(source='child_concept_urls')
+    children = SerializerMethodField()
     name = CharField(source='display_name')
 
     class Meta:
         model = Concept
         fields = ('uuid', 'id', 'url', 'children', 'name')
 
+    def get_children(self, obj):
+        children_urls = self.context.get('children_urls') or {}  # by versioned object id, see Source.hierarchy
+        if obj.has_hierarchy_closure and obj.versioned_object_id in children_urls:
+            return children_urls[obj.versioned_object_id]
+        return obj.child_concept_urls
+
 
 class ConceptChildrenSerializer(ConceptListSerializer):
     children = SerializerMethodField()
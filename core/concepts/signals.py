@@ -0,0 +1,36 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, pre_delete, post_delete
+from django.dispatch import receiver
+
+from core.concepts.models import Concept, ConceptHierarchyClosure
+
+
+@receiver(m2m_changed, sender=Concept.parent_concepts.through)
+def refresh_hierarchy_closure(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    if not reverse:  # parents of instance changed
+        ConceptHierarchyClosure.refresh([instance.id])
+    elif pk_set:  # instance added to or removed from the parents of pk_set
+        ConceptHierarchyClosure.refresh(pk_set)
+    else:  # children of instance cleared, those are still its descendants in the closure
+        ConceptHierarchyClosure.refresh([instance.id])
+
+
+@receiver(pre_delete, sender=Concept)
+def collect_hierarchy_closure_descendants(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Deleting a concept (any version) cascades its hierarchy rows, without m2m_changed, and the closure rows it is
+    the ancestor of, so its descendants are kept to be refreshed once it is gone
+    """
+    versioned_object_id = instance.versioned_object_id or instance.id
+    instance.hierarchy_closure_descendant_ids = set(ConceptHierarchyClosure.objects.filter(
+        Q(ancestor_id=versioned_object_id) | Q(descendant_id=versioned_object_id)
+    ).values_list('descendant_id', flat=True))
+
+
+@receiver(post_delete, sender=Concept)
+def refresh_hierarchy_closure_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    descendant_ids = getattr(instance, 'hierarchy_closure_descendant_ids', None)
+    if descendant_ids:
+        ConceptHierarchyClosure.refresh(descendant_ids)
@@ -21,7 +21,8 @@ from core.concepts.constants import (
     OPENMRS_NO_MORE_THAN_ONE_SHORT_NAME_PER_LOCALE, CONCEPT_IS_ALREADY_RETIRED, CONCEPT_IS_ALREADY_NOT_RETIRED,
     OPENMRS_CONCEPT_CLASS, OPENMRS_DATATYPE, OPENMRS_DESCRIPTION_TYPE, OPENMRS_NAME_LOCALE)
 from core.concepts.documents import ConceptDocument
-from core.concepts.models import AbstractLocalizedText, Concept
+from core.concepts.cascade import ConceptCascade
+from core.concepts.models import AbstractLocalizedText, Concept, ConceptHierarchyClosure
 from core.concepts.serializers import ConceptListSerializer, ConceptVersionListSerializer, ConceptDetailSerializer, \
     ConceptVersionDetailSerializer, ConceptMinimalSerializer, ConceptCascadeMinimalSerializer, \
     ConceptLocaleSerializer, ConceptDescriptionSerializer, ConceptLookupListSerializer, \
@@ -387,6 +388,18 @@ class ConceptTest(OCLTestCase):
     def test_get_search_document(self):
         self.assertEqual(Concept.get_search_document(), ConceptDocument)
 
+    def test_document_prepare_brief_does_not_write_checksums(self):
+        concept = ConceptFactory()
+        Concept.objects.filter(id=concept.id).update(checksums={})
+        concept.refresh_from_db()
+
+        brief = ConceptDocument().prepare_brief(concept)
+
+        self.assertEqual(brief['checksums'], concept.get_all_checksums())
+        self.assertEqual(brief['display_name'], concept.display_name)
+        concept.refresh_from_db()
+        self.assertEqual(concept.checksums, {})
+
     def test_is_versioned(self):
         self.assertTrue(Concept().is_versioned)
 
@@ -626,6 +639,31 @@ class ConceptTest(OCLTestCase):
         self.assertIsNotNone(concept.id)
         process_hierarchy_mock.assert_not_called()
 
+    def test_add_parent_concepts_in_bulk(self):
+        source = OrganizationSourceFactory(version=HEAD)
+        parent_concept = ConceptFactory(parent=source)
+        child1 = ConceptFactory(parent=source)
+        child2 = ConceptFactory(parent=source)
+        parent_latest_version = parent_concept.get_latest_version()
+
+        self.assertEqual(
+            Concept.add_parent_concepts_in_bulk({
+                parent_concept.uri: [child1.uri, child2.uri, '/orgs/foo/sources/bar/concepts/unknown/'],
+                '/orgs/foo/sources/bar/concepts/unknown-parent/': [child1.uri]
+            }),
+            4
+        )
+
+        for child in [child1, child2]:
+            self.assertEqual(list(child.parent_concepts.all()), [parent_latest_version])
+            self.assertEqual(list(child.get_latest_version().parent_concepts.all()), [parent_latest_version])
+        self.assertEqual(Concept.add_parent_concepts_in_bulk({parent_concept.uri: [child1.uri]}), 0)
+        self.assertEqual(child1.parent_concepts.count(), 1)
+        self.assertEqual(
+            sorted(ConceptHierarchyClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')),
+            sorted([(parent_concept.id, child1.id, 1), (parent_concept.id, child2.id, 1)])
+        )
+
     def test_persist_new_with_autoid_sequential(self):
         source = OrganizationSourceFactory(
             version=HEAD, autoid_concept_mnemonic='sequential', autoid_concept_external_id='sequential')
@@ -2409,6 +2447,74 @@ class ConceptTest(OCLTestCase):
 
         self.assertTrue(latest_parent.versioned_object.has_children)
 
+    def test_hierarchy_closure(self):
+        source = OrganizationSourceFactory()
+        root = ConceptFactory(parent=source)
+        child = ConceptFactory(parent=source)
+        grand_child = ConceptFactory(parent=source)
+        child.get_latest_version().parent_concepts.add(root.get_latest_version())
+        grand_child.parent_concepts.add(child)
+
+        self.assertEqual(
+            sorted(ConceptHierarchyClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth', 'source_id')),
+            sorted([(root.id, child.id, 1, source.id), (root.id, grand_child.id, 2, source.id),
+                    (child.id, grand_child.id, 1, source.id)])
+        )
+        self.assertEqual(
+            list(ConceptHierarchyClosure.get_descendants(root.id).values_list('id', flat=True)), [child.id])
+        self.assertEqual(
+            sorted(ConceptHierarchyClosure.get_descendants(root.id, 2).values_list('id', flat=True)),
+            sorted([child.id, grand_child.id])
+        )
+        self.assertEqual(ConceptHierarchyClosure.get_ancestor_path(grand_child.id), [root.id, child.id])
+        self.assertEqual(ConceptHierarchyClosure.get_children_urls([root.id, grand_child.id]), {
+            root.id: [child.uri], grand_child.id: []})
+        self.assertEqual(root.get_latest_version().children_concepts_count, 1)
+        self.assertTrue(child.has_children)
+        self.assertFalse(grand_child.get_latest_version().has_children)
+
+        child.get_latest_version().parent_concepts.clear()
+
+        self.assertEqual(
+            list(ConceptHierarchyClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')),
+            [(child.id, grand_child.id, 1)]
+        )
+        self.assertFalse(root.has_children)
+        self.assertEqual(grand_child.get_hierarchy_path(), [child.uri])
+
+    def test_hierarchy_closure_on_delete(self):
+        source = OrganizationSourceFactory()
+        root = ConceptFactory(parent=source)
+        child = ConceptFactory(parent=source)
+        grand_child = ConceptFactory(parent=source)
+        great_grand_child = ConceptFactory(parent=source)
+        child.parent_concepts.add(root)
+        grand_child.parent_concepts.add(child)
+        great_grand_child.parent_concepts.add(grand_child)
+
+        Concept.objects.filter(versioned_object_id=child.id).delete()
+
+        self.assertEqual(
+            list(ConceptHierarchyClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')),
+            [(grand_child.id, great_grand_child.id, 1)]
+        )
+        self.assertFalse(root.has_children)
+        self.assertEqual(great_grand_child.get_hierarchy_path(), [grand_child.uri])
+
+    def test_hierarchy_closure_build(self):
+        source = OrganizationSourceFactory()
+        root = ConceptFactory(parent=source)
+        child = ConceptFactory(parent=source)
+        child.parent_concepts.add(root)
+        ConceptHierarchyClosure.objects.all().delete()
+
+        ConceptHierarchyClosure.build(source.id)
+
+        self.assertEqual(
+            list(ConceptHierarchyClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')),
+            [(root.id, child.id, 1)]
+        )
+
     def test_cascade_returns_self_without_repo_version(self):
         concept = ConceptFactory()
         result = concept.cascade(repo_version=None)
@@ -2432,6 +2538,68 @@ class ConceptTest(OCLTestCase):
 
         self.assertEqual(list(result['concepts'].values_list('id', flat=True)), [concept.id])
 
+    def test_cascade_levels_and_max_results(self):
+        source = OrganizationSourceFactory()
+        root = ConceptFactory(parent=source, mnemonic='root')
+        child = ConceptFactory(parent=source, mnemonic='child')
+        child.parent_concepts.add(root)
+        grand_child = ConceptFactory(parent=source, mnemonic='grand-child')
+        grand_child.parent_concepts.add(child)
+        mapping = MappingFactory(parent=source, from_concept=child, to_concept=grand_child, map_type='Q-AND-A')
+        mapping.sources.add(source)
+
+        result = root.cascade(repo_version=source)
+        self.assertEqual(
+            sorted(result['concepts'].values_list('id', flat=True)), sorted([root.id, child.id, grand_child.id]))
+        self.assertEqual(list(result['mappings'].values_list('id', flat=True)), [mapping.id])
+
+        result = root.cascade(repo_version=source, cascade_levels=1)
+        self.assertEqual(sorted(result['concepts'].values_list('id', flat=True)), sorted([root.id, child.id]))
+        self.assertEqual(result['mappings'].count(), 0)
+
+        result = root.cascade(repo_version=source, max_results=2)
+        self.assertEqual(sorted(result['concepts'].values_list('id', flat=True)), sorted([root.id, child.id]))
+        self.assertEqual(result['mappings'].count(), 0)
+
+        result = grand_child.cascade(repo_version=source, reverse=True, cascade_levels=1)
+        self.assertEqual(sorted(result['concepts'].values_list('id', flat=True)), sorted([child.id, grand_child.id]))
+        self.assertEqual(list(result['mappings'].values_list('id', flat=True)), [mapping.id])
+
+    def test_cascade_many(self):
+        source = OrganizationSourceFactory()
+        root1 = ConceptFactory(parent=source, mnemonic='root1')
+        root2 = ConceptFactory(parent=source, mnemonic='root2')
+        shared_child = ConceptFactory(parent=source, mnemonic='shared-child')
+        shared_child.parent_concepts.add(root1, root2)
+        grand_child = ConceptFactory(parent=source, mnemonic='grand-child')
+        grand_child.parent_concepts.add(shared_child)
+        other = ConceptFactory(parent=source, mnemonic='other')
+
+        concept_ids, mapping_ids = Concept.cascade_many([root1, root2, other], repo_version=source)
+
+        self.assertEqual(concept_ids, {root1.id, root2.id, shared_child.id, grand_child.id, other.id})
+        self.assertEqual(mapping_ids, set())
+
+        for max_results in [None, 2]:
+            expected = set()
+            for root in [root1, root2]:
+                expected |= set(root.cascade(repo_version=source, max_results=max_results)['concepts'].values_list(
+                    'id', flat=True))
+            self.assertEqual(
+                Concept.cascade_many([root1, root2], repo_version=source, max_results=max_results)[0], expected)
+
+        self.assertEqual(
+            Concept.cascade_many([root1, root2], repo_version=source, cascade_levels=0), ({root1.id, root2.id}, set()))
+        self.assertEqual(Concept.cascade_many([root1], repo_version=None), ({root1.id}, set()))
+
+    def test_cascade_cut_depth(self):
+        self.assertIsNone(ConceptCascade.get_cut_depth({1: 0, 2: 1, 3: 2}, {4: 1}, 5, None))
+        self.assertIsNone(ConceptCascade.get_cut_depth({1: 0, 2: 1, 3: 2}, {4: 1}, 5, 10))
+        self.assertEqual(ConceptCascade.get_cut_depth({1: 0, 2: 1, 3: 2}, {4: 1}, 5, 2), 1)
+        self.assertEqual(ConceptCascade.get_cut_depth({1: 0, 2: 1, 3: 2}, {4: 1}, 5, 3), 2)
+        self.assertEqual(ConceptCascade.get_cut_depth({1: 0, 2: 1, 3: 2}, {4: 1}, 5, 4), 2)
+        self.assertIsNone(ConceptCascade.get_cut_depth({1: 0, 2: 1, 3: 2}, {4: 1}, 2, 3))
+
     @patch('core.common.models.ConceptContainerModel.update_concepts_count')
     @patch('core.common.models.handle_m2m_changed')
     @patch('core.common.models.handle_save')
@@ -1,4 +1,5 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from cid.locals import get_cid
 from django.conf import settings
@@ -23,8 +24,9 @@ from core.collections.documents import CollectionDocument
 from core.common import ERRBIT_LOGGER
 from core.common.constants import (
     HEAD, INCLUDE_INVERSE_MAPPINGS_PARAM, INCLUDE_RETIRED_PARAM, ACCESS_TYPE_NONE, LIMIT_PARAM, LIST_DEFAULT_LIMIT)
+from core.common.embeddings import Embeddings
 from core.common.exceptions import Http400, Http403, Http409
-from core.common.mixins import ListWithHeadersMixin, ConceptDictionaryMixin
+from core.common.mixins import ListWithHeadersMixin, ConceptDictionaryMixin, ConditionalRetrieveMixin
 from core.common.search import CustomESSearch, Reranker
 from core.common.swagger_parameters import (
     q_param, limit_param, sort_desc_param, page_param, sort_asc_param, verbose_param,
@@ -320,7 +322,9 @@ class ConceptCollectionMembershipView(ConceptBaseView, ListWithHeadersMixin):
         return self.list(request, *args, **kwargs)
 
 
-class ConceptRetrieveUpdateDestroyView(ConceptBaseView, RetrieveAPIView, UpdateAPIView, DestroyAPIView):
+class ConceptRetrieveUpdateDestroyView(
+    ConceptBaseView, ConditionalRetrieveMixin, RetrieveAPIView, UpdateAPIView, DestroyAPIView
+):
     serializer_class = ConceptDetailSerializer
 
     def is_container_version_specified(self):
@@ -667,7 +671,7 @@ class ConceptMappingsView(ConceptBaseView, ListWithHeadersMixin):
         return self.list(request, *args, **kwargs)
 
 
-class ConceptVersionRetrieveView(ConceptBaseView, RetrieveAPIView, DestroyAPIView):
+class ConceptVersionRetrieveView(ConceptBaseView, ConditionalRetrieveMixin, RetrieveAPIView, DestroyAPIView):
     serializer_class = ConceptVersionDetailSerializer
 
     def get_permissions(self):
@@ -965,46 +969,82 @@ class MetadataToConceptsListView(BaseAPIView):  # pragma: no cover
         is_bridge = (is_semantic and target_repo_filter and
                      drop_version(target_repo_filter) != search_repo_url)
         algorithm = ('ocl-bridge' if is_bridge else 'ocl-semantic') if is_semantic else 'ocl-search'
-        results = []
-        for row in rows:
+        start_time = time.time()
+        embeddings = Embeddings()
+        if is_semantic:
+            # vectors of all the rows, in one batch for those not cached
+            embeddings.get_many(
+                [text for row in rows for text in ConceptFuzzySearch.get_texts_to_embed(row, variants_repo)])
+            print(f"[{cid}] Embeddings computed in {time.time() - start_time} seconds")
             start_time = time.time()
+        es_searches = []
+        for row in rows:
             search = ConceptFuzzySearch.search(
                 row, target_repo_url, repo_params, include_retired,
                 is_semantic, num_candidates, k_nearest, map_config, faceted_criterion, locale_filter,
-                variants_repo=variants_repo,
+                variants_repo=variants_repo, embeddings=embeddings
             )
-            print(f"[{cid}] ES Search built in {time.time() - start_time} seconds")
-            start_time = time.time()
             search = search.params(track_total_hits=False, request_cache=True)
-            es_search = CustomESSearch(search[start:end], ConceptDocument)
+            es_searches.append(CustomESSearch(search[start:end], ConceptDocument))
+        print(f"[{cid}] {len(rows)} ES Searches built in {time.time() - start_time} seconds")
+        start_time = time.time()
+        CustomESSearch.execute_many(es_searches, exact_count=False, load_fields=reranker)
+        print(f"[{cid}] {len(rows)} ES Searches executed in {time.time() - start_time} seconds")
+        start_time = time.time()
+
+        def to_hits(row_search):
+            row, es_search = row_search
             name = row.get('name') or row.get('Name') if reranker else None
-            es_search.to_queryset(False, True, False, name, encoder_model)
-            print(f"[{cid}] ES Search (including reranker={reranker}) executed in {time.time() - start_time} seconds")
-            start_time = time.time()
-            result = {'row': row, 'results': [], 'map_config': map_config, 'filter': original_filters}
+            es_search.to_queryset(False, True, False, name, encoder_model, hydrate_hits=False)
+
+        self.map_rows(to_hits, zip(rows, es_searches))
+        print(f"[{cid}] ES Hits scored (including reranker={reranker}) in {time.time() - start_time} seconds")
+        start_time = time.time()
+        CustomESSearch.hydrate_many(es_searches, Concept.objects)
+        print(f"[{cid}] Concepts hydrated in {time.time() - start_time} seconds")
+        start_time = time.time()
+
+        results = []
+        matched_concepts = []
+        for row, es_search in zip(rows, es_searches):
+            concepts = []
             for concept in es_search.queryset:
                 concept._highlight = es_search.highlights.get(concept.id, {})  # pylint:disable=protected-access
-                score_info = es_search.scores.get(concept.id, {})
-                normalized_score = get(score_info, 'normalized') or 0
-                self.apply_score(concept, is_semantic, score_info, score_threshold, reranker, limit)
+                self.apply_score(
+                    concept, is_semantic, es_search.scores.get(concept.id, {}), score_threshold, reranker, limit)
                 if not best_match or concept._match_type in ['medium', 'high', 'very_high']:  # pylint:disable=protected-access
                     if apply_for_name_locale:
                         concept._requested_locale = locale_filter  # pylint:disable=protected-access
-                    serializer = ConceptDetailSerializer if self.is_verbose() else ConceptMinimalSerializer
-                    data = serializer(concept, context={'request': self.request}).data
-                    data['search_meta']['search_normalized_score'] = normalized_score * 100
-                    data['search_meta']['algorithm'] = algorithm
-                    result['results'].append(data)
-            print(f"[{cid}] Concepts serialized in {time.time() - start_time} seconds")
-            start_time = time.time()
-            if 'results' in result:
-                result['results'] = sorted(
-                    result['results'], key=lambda res: get(res, f'search_meta.{score_to_sort}'), reverse=True)
-            print(f"[{cid}] Concepts sorted in {time.time() - start_time} seconds")
-            results.append(result)
+                    concepts.append(concept)
+            results.append({'row': row, 'results': [], 'map_config': map_config, 'filter': original_filters})
+            matched_concepts.append(concepts)
+
+        serializer = ConceptDetailSerializer if self.is_verbose() else ConceptMinimalSerializer
+        data = iter(serializer(
+            [concept for concepts in matched_concepts for concept in concepts], many=True,
+            context={'request': self.request}
+        ).data)
+        for result, concepts in zip(results, matched_concepts):
+            for concept in concepts:
+                concept_data = next(data)
+                concept_data['search_meta']['search_normalized_score'] = concept._normalized_score * 100  # pylint:disable=protected-access
+                concept_data['search_meta']['algorithm'] = algorithm
+                result['results'].append(concept_data)
+            result['results'] = sorted(
+                result['results'], key=lambda res: get(res, f'search_meta.{score_to_sort}'), reverse=True)
+        print(f"[{cid}] Concepts serialized and sorted in {time.time() - start_time} seconds")
 
         return results
 
+    @staticmethod
+    def map_rows(func, items):
+        """Applies func to the items of the rows, MATCH_CONCURRENCY of them at a time"""
+        concurrency = get(settings, 'MATCH_CONCURRENCY') or 1
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                return list(executor.map(func, items))
+        return [func(item) for item in items]
+
     @staticmethod
     def apply_score(concept, is_semantic, scores, score_threshold, reranker, limit):  # pylint: disable=too-many-arguments,too-many-branches
         score = get(scores, 'raw') or 0
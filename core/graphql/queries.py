@@ -14,6 +14,7 @@ from pydash import get
 from strawberry.exceptions import GraphQLError
 
 from core.common.constants import HEAD
+from core.common.search import CustomESSearch
 from core.concepts.documents import ConceptDocument
 from core.concepts.models import Concept
 from core.mappings.models import Mapping
@@ -446,13 +447,8 @@ async def concepts_for_query(
             else:
                 return [], total
         else:
-            ordering = Case(
-                *[When(id=pk, then=pos) for pos, pk in enumerate(concept_ids)],
-                output_field=IntegerField()
-            )
-            qs = base_qs.filter(id__in=concept_ids).order_by(ordering)
-            qs = with_concept_related(qs, mapping_prefetch)
-            return await sync_to_async(list)(qs), total
+            qs = with_concept_related(base_qs, mapping_prefetch)
+            return await sync_to_async(CustomESSearch.hydrate)(qs, concept_ids), total
 
     qs = fallback_db_search(base_qs, query).order_by('mnemonic')
     total = await sync_to_async(qs.count)()
@@ -29,10 +29,14 @@ from core.common.tasks import bulk_import_subtask, bulk_import_subtask_empty, bu
 from core.common.tasks import import_finisher
 from core.code_systems.converter import CodeSystemConverter
 from core.common.utils import get_export_service
+from core.concepts.models import Concept
+from core.importers.input_parsers import csv_file_to_input_lists, JSONLinesStream
 from core.importers.models import SourceImporter, SourceVersionImporter, ConceptImporter, OrganizationImporter, \
     CollectionImporter, CollectionVersionImporter, MappingImporter, ReferenceImporter, CREATED, UPDATED, FAILED, \
-    DELETED, NOT_FOUND, PERMISSION_DENIED, UNCHANGED
+    DELETED, NOT_FOUND, PERMISSION_DENIED, UNCHANGED, CopyConceptCreator, CopyMappingCreator, \
+    BulkImportParallelRunner
 from core.orgs.models import Organization
+from core.services.storages.postgres import PostgresQL
 from core.sources.models import Source
 from core.users.models import UserProfile
 from core.collections.models import Collection
@@ -214,7 +218,7 @@ class Importer:
     owner: str
     import_type: str = 'default'
     MIN_BATCH_SIZE: int = 50
-    IMPORT_CACHE: str = "import_cache/"
+    IMPORT_CACHE: str = JSONLinesStream.IMPORT_CACHE
 
     # pylint: disable=too-many-arguments
     def __init__(self, task_id, path, username, owner_type, owner, import_type='default'):
@@ -229,6 +233,9 @@ class Importer:
     def is_npm_import(self) -> bool:
         return self.import_type == 'npm'
 
+    def is_initial_load_import(self) -> bool:
+        return self.import_type == 'initial_load'
+
     def run(self):  # pylint: disable=too-many-locals
         time_started = timezone.now()
         resource_types = ['CodeSystem', 'ValueSet', 'ConceptMap']
@@ -265,6 +272,10 @@ class Importer:
                                               headers={'content-type': 'application/octet-stream'})
                     self.path = key
 
+        if self.is_initial_load_import():
+            return InitialLoadImporter(
+                self.path, self.username, self.owner_type, self.owner).run(time_started).model_dump()
+
         resources = {}
         dependencies = []
 
@@ -810,3 +821,194 @@ class ImporterSubtask:
             return parse_events
 
         return json_file
+
+
+class InitialLoadImporter:
+    """
+    Fast initial load (import_type 'initial_load') of JSON lines or CSV content, plain or in a zip/tar.
+    Concepts and mappings of sources that have none yet are validated and built in memory in chunks of BATCH_SIZE
+    lines and written with COPY FROM STDIN (see CopyConceptCreator/CopyMappingCreator), ids, versions, uris and
+    checksums are all set before the rows are written. Everything else, and lines that can't be loaded that way,
+    are imported one by one with the ResourceImporter, in this order:
+      1. Organizations and Sources
+      2. Concepts
+      3. Mappings
+      4. all other resources (Source Versions, Collections, References...) in the order of the file
+    The hierarchy of the loaded concepts is linked in bulk at the end (see Concept.add_parent_concepts_in_bulk), then
+    mnemonic sequences, counts and search indexes of the loaded sources are updated.
+    """
+    BATCH_SIZE: int = 10000
+    REPO_TYPES: tuple = ('organization', 'source')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, path, username, owner_type, owner, batch_size=None):
+        self.path = path
+        self.username = username
+        self.owner_type = owner_type
+        self.owner = owner
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.user = UserProfile.objects.get(username=username)
+        self.summary = ImportTaskSummary()
+        self.empty_sources = {}
+        self.hierarchy = {}  # parent_uri -> [child_uris] of the loaded concepts
+
+    def run(self, time_started=None):
+        time_started = time_started or timezone.now()
+        with self.open_file() as file, tempfile.TemporaryFile() as lines_file:
+            self.to_json_lines(file, lines_file)
+            self.import_resources(lines_file, lambda resource_type: resource_type in self.REPO_TYPES)
+            self.load(lines_file, 'concept', CopyConceptCreator)
+            self.load(lines_file, 'mapping', CopyMappingCreator)
+            self.import_resources(
+                lines_file, lambda resource_type: resource_type not in (*self.REPO_TYPES, 'concept', 'mapping'))
+        self.post_load()
+
+        import_task = ImportTask(time_started=time_started, initial_summary=self.summary)
+        import_task.time_finished = timezone.now()
+        return import_task
+
+    def open_file(self):
+        if self.path.startswith('/'):
+            return open(self.path, 'rb')
+        temp = tempfile.NamedTemporaryFile()  # pylint: disable=consider-using-with
+        request_path = self.path
+        if self.path.startswith(Importer.IMPORT_CACHE):
+            request_path = get_export_service().url_for(self.path)
+        remote_file = requests.get(request_path, stream=True)
+        if not remote_file.ok:
+            raise ImportError(f"Failed to GET {request_path}, responded with {remote_file.status_code}")
+        ImporterUtils.fetch_to_file(remote_file, temp)
+        return temp
+
+    @staticmethod
+    def is_csv(file):
+        position = file.tell()
+        start = file.read(1024).lstrip()
+        file.seek(position)
+        return bool(start) and start[:1] not in (b'{', b'[', b'/')
+
+    def to_json_lines(self, file, lines_file):
+        """Writes every importable file of the input to lines_file, as JSON lines"""
+        is_zipped, is_tarred = ImporterUtils.is_zipped_or_tarred(file)
+        if is_zipped:
+            with ZipFile(file) as package:
+                for file_path in package.namelist():
+                    if file_path.endswith(('.json', '.csv')):
+                        with package.open(file_path) as member:
+                            self.write_json_lines(member, lines_file, file_path.endswith('.csv'))
+        elif is_tarred:
+            with tarfile.open(fileobj=file, mode='r') as package:
+                for file_path in package.getnames():
+                    if file_path.endswith(('.json', '.csv')):
+                        with package.extractfile(file_path) as member:
+                            self.write_json_lines(member, lines_file, file_path.endswith('.csv'))
+        else:
+            self.write_json_lines(file, lines_file, self.is_csv(file))
+        lines_file.flush()
+
+    def write_json_lines(self, file, lines_file, is_csv):
+        if is_csv:
+            for resources in csv_file_to_input_lists(file, self.batch_size):
+                for resource in resources:
+                    lines_file.write(json.dumps(resource).encode('utf-8') + b'\n')
+        else:
+            shutil.copyfileobj(file, lines_file)
+            lines_file.write(b'\n')
+
+    @staticmethod
+    def get_resource_type(resource):
+        return (resource.get('type', None) or resource.get('resourceType', None) or '').lower()
+
+    def get_resources(self, lines_file, matches):
+        lines_file.seek(0)
+        for resource in ijson.items(lines_file, '', multiple_values=True, allow_comments=True, use_float=True):
+            if isinstance(resource, dict) and resource.get('__action', None) != 'DELETE' and matches(
+                    self.get_resource_type(resource)):
+                yield resource
+
+    def add_result(self, resource, result):
+        summary = self.summary
+        summary.total += 1
+        summary.processed += 1
+        if result == CREATED:
+            summary.created += 1
+        elif result == UPDATED:
+            summary.updated += 1
+        elif result == DELETED:
+            summary.deleted += 1
+        elif result == PERMISSION_DENIED:
+            summary.permission_denied += 1
+        elif result == UNCHANGED:
+            summary.unchanged += 1
+        else:
+            summary.failed += 1
+            summary.failures.append(
+                f'Failed to import resource with id {resource.get("id", None)} from {self.path} to '
+                f'{self.owner_type}/{self.owner} by {self.username} due to: {result}'
+            )
+
+    def import_resource(self, resource):
+        if self.get_resource_type(resource) in ['source', 'collection']:
+            resource.setdefault('owner_type', self.owner_type)
+            resource.setdefault('owner', self.owner)
+        try:
+            result = ResourceImporter().import_resource(resource, self.username, self.owner_type, self.owner)
+        except Exception as ex:
+            logger.exception('Failed to import resource with id %s', resource.get('id', None))
+            result = str(ex)
+        self.add_result(resource, result)
+
+    def import_resources(self, lines_file, matches):
+        for resource in self.get_resources(lines_file, matches):
+            self.import_resource(resource)
+
+    def load(self, lines_file, resource_type, creator_class):
+        creator = None
+        cache = {}
+        for resource in self.get_resources(lines_file, lambda _resource_type: _resource_type == resource_type):
+            item = resource.copy()
+            item.pop('type', None)
+            item.pop('__action', None)
+            if not creator_class.can_handle(item, None, True):
+                self.import_resource(resource)
+                continue
+            creator = creator or creator_class(
+                self.user, True, cache=cache, skip_hierarchy_tasks=True, empty_sources=self.empty_sources)
+            creator.add(resource, item)
+            if len(creator) >= self.batch_size:
+                self.flush(creator)
+                creator = None
+        if creator:
+            self.flush(creator)
+
+    def flush(self, creator):
+        for resource, result in creator.run():
+            self.add_result(resource, result)
+            if result == CREATED and resource.get('parent_concept_urls'):
+                for parent_uri in resource['parent_concept_urls']:
+                    self.hierarchy.setdefault(parent_uri, []).append(
+                        BulkImportParallelRunner.get_resource_uri(resource, 'concepts'))
+        for resource in creator.fallback:
+            self.import_resource(resource)
+
+    def post_load(self):
+        if self.hierarchy:
+            Concept.add_parent_concepts_in_bulk(self.hierarchy)
+        loaded_source_ids = [source_id for source_id, is_empty in self.empty_sources.items() if is_empty]
+        for source in Source.objects.filter(id__in=loaded_source_ids):
+            self.update_sequences(source)
+            source.update_children_counts()
+            source.index_children_async(self.user)
+
+    @staticmethod
+    def update_sequences(source):
+        """Moves the mnemonic sequences past the numeric mnemonics that were loaded as they were"""
+        sequences = [
+            (source.is_sequential_concept_mnemonic, source.concepts_mnemonic_seq_name, source.get_max_concept_mnemonic),
+            (source.is_sequential_mapping_mnemonic, source.mappings_mnemonic_seq_name, source.get_max_mapping_mnemonic),
+        ]
+        for is_sequential, seq_name, get_max_mnemonic in sequences:
+            if is_sequential:
+                max_mnemonic = get_max_mnemonic()
+                if max_mnemonic and max_mnemonic > PostgresQL.last_value(seq_name):
+                    PostgresQL.update_seq(seq_name, max_mnemonic)
@@ -1,5 +1,9 @@
 import csv
 import io
+import itertools
+import json
+import tempfile
+from array import array
 from zipfile import ZipFile
 
 import requests
@@ -7,13 +11,107 @@ from ocldev.oclexporttoimportconverter import OCLExportToImportConverter
 from ocldev.oclcsvtojsonconverter import OclStandardCsvToJsonConverter
 from pydash import get, compact
 
-from core.common.utils import is_zip_file, is_csv_file
+from core.common.utils import is_zip_file, is_csv_file, get_export_service
 
 
 def csv_file_data_to_input_list(file_content):
     return [row for row in csv.DictReader(io.StringIO(file_content))]  # pylint: disable=unnecessary-comprehension
 
 
+def csv_file_to_input_lists(file, chunk_size=10000):
+    """Streams a CSV (binary) file through OclStandardCsvToJsonConverter, chunk_size rows at a time"""
+    text_file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text_file)
+    try:
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                break
+            yield OclStandardCsvToJsonConverter(input_list=rows, allow_special_characters=True).process()
+    finally:
+        text_file.detach()  # leaves file open for the caller
+
+
+class JSONLinesStream:
+    """
+    JSON lines of an import file (local path, import cache key or URL), parsed lazily one line at a time, so the
+    file never has to be held in memory, neither as text nor as a list of lines.
+    The file is read once, in chunks, and its lines are spilled to a temp file while they are read, so that
+    any later pass (e.g. BulkImportParallelRunner.collect_concept_hierarchy_map) reads them back from there, and
+    any single line by its number (stream[number], e.g. the lines of a unit when it is queued).
+    """
+    CHUNK_SIZE = 1024 * 1024
+    IMPORT_CACHE = 'import_cache/'
+
+    def __init__(self, path):
+        self.path = path
+        self.spill = None
+        self.offsets = array('Q')  # offset of each line in the spill
+        self.count = None
+
+    def __iter__(self):
+        if self.count is None:
+            return self.read_source()
+        return self.read_spill()
+
+    def __getitem__(self, number):
+        if self.count is None:
+            len(self)
+        self.spill.seek(self.offsets[number])
+        return json.loads(self.spill.readline())
+
+    def __len__(self):
+        if self.count is None:
+            for _ in self:
+                pass
+        return self.count
+
+    def open_source(self):
+        if self.path.startswith('/'):
+            return open(self.path, 'rb', buffering=self.CHUNK_SIZE)  # pylint: disable=consider-using-with
+        url = self.path
+        if url.startswith(self.IMPORT_CACHE):
+            url = get_export_service().url_for(url)
+        response = requests.get(url, headers={'User-Agent': 'OCL'}, stream=True, timeout=30)
+        if not response.ok:
+            raise ImportError(f"Failed to GET {url}, responded with {response.status_code}")
+        response.raw.decode_content = True
+        return io.BufferedReader(response.raw, self.CHUNK_SIZE)
+
+    @staticmethod
+    def parse(lines):
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+    def read_source(self):
+        self.close()
+        self.spill = tempfile.TemporaryFile()  # pylint: disable=consider-using-with
+        count = 0
+        with self.open_source() as source:
+            for line in source:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                self.offsets.append(self.spill.tell())
+                self.spill.write(line if line.endswith(b'\n') else line + b'\n')
+                count += 1
+                yield data
+        self.spill.flush()
+        self.count = count
+
+    def read_spill(self):
+        self.spill.seek(0)
+        return self.parse(self.spill)
+
+    def close(self):
+        if self.spill:
+            self.spill.close()
+            self.spill = None
+        self.offsets = array('Q')
+        self.count = None
+
+
 class ImportContentParser:
     """
     1. Processes json data from 'content' arg
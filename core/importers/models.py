@@ -1,12 +1,13 @@
 import json
+import math
 import time
 from collections import deque
 from datetime import datetime
 
-from celery import group
 from celery.utils.log import get_task_logger
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import transaction, DatabaseError
 from django.db.models import F
 from ocldev.oclfleximporter import OclFlexImporter
 from pydash import compact, get
@@ -17,10 +18,13 @@ from core.common import ERRBIT_LOGGER
 from core.common.constants import HEAD, ALL
 from core.common.tasks import bulk_import_parts_inline, delete_organization, batch_index_resources, \
     post_import_update_resource_counts, make_hierarchy
-from core.common.utils import drop_version, is_url_encoded_string, encode_string, to_parent_uri, chunks
-from core.concepts.models import Concept
+from core.common.utils import drop_version, is_url_encoded_string, encode_string, to_parent_uri, chunks, \
+    generate_temp_version
+from core.concepts.models import Concept, ConceptName, ConceptDescription
+from core.importers.input_parsers import JSONLinesStream
 from core.mappings.models import Mapping
 from core.orgs.models import Organization
+from core.services.storages.postgres import PostgresQL
 from core.sources.models import Source
 from core.tasks.models import Task
 from core.users.models import UserProfile
@@ -63,7 +67,7 @@ class BaseImporter:
             self.user = user
 
     def populate_input_list(self):
-        if isinstance(self.content, list):
+        if isinstance(self.content, (list, JSONLinesStream)):
             self.input_list = self.content
         else:
             for line in self.content.splitlines():
@@ -548,6 +552,7 @@ class MappingImporter(BaseResourceImporter):
         # Only versioned_object_id is ever read from the resolved concept here, so cache just that
         # (and fetch just that) instead of retaining full Concept instances for the chunk's lifetime.
         cache = self.cache.setdefault('concept_versioned_id_by_uri', {})
+        self.count_lookup(self.cache, uri in cache)
         if uri not in cache:
             cache[uri] = Concept.objects.filter(id=F('versioned_object_id'), uri=uri).values_list(
                 'versioned_object_id', flat=True).first()
@@ -555,10 +560,87 @@ class MappingImporter(BaseResourceImporter):
 
     def get_cached_source_exists_by_uri(self, uri):
         cache = self.cache.setdefault('source_exists_by_uri', {})
+        self.count_lookup(self.cache, uri in cache)
         if uri not in cache:
             cache[uri] = Source.objects.filter(uri=uri).exists()
         return cache[uri]
 
+    @staticmethod
+    def count_lookup(cache, hit):
+        stats = cache.setdefault('lookup_stats', {'hits': 0, 'misses': 0, 'prefetched': 0})
+        stats['hits' if hit else 'misses'] += 1
+
+    @classmethod
+    def prefetch_relations(cls, items, cache, seed_misses=False):
+        """
+        Resolves the from/to concepts (and their sources) of all the mapping lines in `items` with a few `uri__in`
+        queries and seeds `cache` with them, so that get_cached_versioned_concept_id_by_uri,
+        get_cached_source_exists_by_uri and Mapping.populate_fields_from_relations don't query them one by one.
+        Unresolved URIs are only cached when `seed_misses` is set, i.e. when nothing else in the run can create them.
+        """
+        concept_uris, concept_exprs, source_uris = cls.get_relation_uris(items)
+        stats = cache.setdefault('lookup_stats', {'hits': 0, 'misses': 0, 'prefetched': 0})
+        for key, uris, resolve, get_unresolved in [
+                ('concept_versioned_id_by_uri', concept_uris, cls.resolve_versioned_concept_ids, lambda _: None),
+                ('concept_by_expr', concept_exprs, cls.resolve_concepts, Mapping.get_unresolved_concept),
+                ('source_exists_by_uri', source_uris, cls.resolve_existing_sources, lambda _: False),
+        ]:
+            stats['prefetched'] += cls.seed_cache(
+                cache.setdefault(key, {}), uris, resolve, get_unresolved if seed_misses else None)
+
+    @staticmethod
+    def seed_cache(key_cache, uris, resolve, get_unresolved=None):
+        seeded = 0
+        for batch in chunks(list(uris - key_cache.keys()), 5000):
+            resolved = resolve(batch)
+            for uri in batch:
+                if uri in resolved:
+                    key_cache[uri] = resolved[uri]
+                elif get_unresolved:
+                    key_cache[uri] = get_unresolved(uri)
+                else:
+                    continue
+                seeded += 1
+        return seeded
+
+    @staticmethod
+    def get_relation_uris(items):
+        # keyed the same way as the lazy lookups of get_queryset and Mapping.populate_fields_from_relations
+        concept_uris = set()
+        concept_exprs = set()
+        source_uris = set()
+        for item in items:
+            for url in compact([item.get('from_concept_url'), item.get('to_concept_url')]):
+                versionless_url = drop_version(url)
+                concept_uris.add(versionless_url)
+                concept_exprs.add(url if url.endswith('/') else url + '/')
+                source_uris.add(drop_version(to_parent_uri(versionless_url)))
+        return concept_uris, concept_exprs, source_uris
+
+    @staticmethod
+    def resolve_versioned_concept_ids(uris):
+        return dict(
+            Concept.objects.filter(
+                id=F('versioned_object_id'), uri__in=uris).values_list('uri', 'versioned_object_id')
+        )
+
+    @staticmethod
+    def resolve_concepts(exprs):
+        # same lookup as Mapping.populate_fields_from_relations, by the expression or its encoded variant
+        encoded_exprs = {expr: encode_string(expr, safe='/') for expr in exprs}
+        concepts = {}
+        for concept in Concept.objects.filter(
+                uri__in={*exprs, *encoded_exprs.values()}).select_related('parent').order_by('id'):
+            concepts.setdefault(concept.uri, concept)
+        return {
+            expr: concepts.get(expr) or concepts.get(encoded_exprs[expr]) for expr in exprs
+            if expr in concepts or encoded_exprs[expr] in concepts
+        }
+
+    @staticmethod
+    def resolve_existing_sources(uris):
+        return dict.fromkeys(Source.objects.filter(uri__in=uris).values_list('uri', flat=True), True)
+
     def get_queryset(self):  # pylint: disable=too-many-branches
         if self.queryset:
             return self.queryset
@@ -785,16 +867,390 @@ class ReferenceImporter(BaseResourceImporter):
         return NOT_FOUND
 
 
+class BulkResourceCreator:
+    """
+    Creates the new concepts/mappings of a chunk of import lines with bulk_create, in one transaction per chunk,
+    instead of persist_new per line. Each line is still validated on its own and gets its own result.
+    Lines that are not plain creations (the resource already exists in the source, it is repeated within the chunk,
+    its source has a custom validation schema) or whose chunk fails to write are left in `fallback`, to be
+    imported line by line by the caller.
+    """
+    importer_class = None
+    model = None
+
+    def __init__(self, user, update_if_exists, cache=None, skip_hierarchy_tasks=False):
+        self.user = user
+        self.update_if_exists = update_if_exists
+        self.cache = cache if cache is not None else {}
+        self.skip_hierarchy_tasks = skip_hierarchy_tasks
+        self.items = []
+        self.results = []
+        self.fallback = []
+        self.new_ids = set()
+        self._edit_access = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    @classmethod
+    def can_handle(cls, item, action, skip_hierarchy_tasks=False):  # pylint: disable=unused-argument
+        return action != 'delete' and bool(item.get('id'))
+
+    def add(self, original_item, item):
+        self.items.append((original_item, item))
+
+    def get_importer(self, item):
+        return self.importer_class(item, self.user, self.update_if_exists, cache=self.cache)  # pylint: disable=not-callable
+
+    def has_edit_access(self, parent):
+        if parent.id not in self._edit_access:
+            self._edit_access[parent.id] = parent.has_edit_access(self.user)
+        return self._edit_access[parent.id]
+
+    def get_existing_keys(self, importers):
+        parent_ids = {importer.data['parent'].id for _, importer in importers}
+        mnemonics = {importer.data['mnemonic'] for _, importer in importers}
+        return set(
+            self.model.objects.filter(parent_id__in=parent_ids, mnemonic__in=mnemonics).values_list(
+                'parent_id', 'mnemonic').distinct()
+        )
+
+    def get_new_importers(self):
+        importers = []
+        for original_item, item in self.items:
+            importer = self.get_importer(item)
+            if not importer.is_valid():
+                self.results.append((original_item, False))
+                continue
+            try:
+                importer.parse()
+            except Exception as ex:
+                ERRBIT_LOGGER.log(ex)
+                self.results.append((original_item, {'__all__': str(ex)}))
+                continue
+            parent = importer.data.get('parent')
+            if not parent:
+                self.results.append((original_item, {'source': 'Not Found'}))
+            elif parent.custom_validation_schema:
+                self.fallback.append(original_item)
+            elif not self.has_edit_access(parent):
+                self.results.append((original_item, PERMISSION_DENIED))
+            else:
+                importers.append((original_item, importer))
+
+        new_importers = []
+        if importers:
+            keys = self.get_existing_keys(importers)
+            for original_item, importer in importers:
+                key = (importer.data['parent'].id, importer.data['mnemonic'])
+                if key in keys:
+                    self.fallback.append(original_item)
+                else:
+                    keys.add(key)
+                    new_importers.append((original_item, importer))
+        return new_importers
+
+    def build(self, importer):
+        raise NotImplementedError()
+
+    def write(self, instances):
+        raise NotImplementedError()
+
+    def post_write(self, instances):
+        pass
+
+    @staticmethod
+    def create(model, instances):
+        model.objects.bulk_create(instances, batch_size=1000)
+
+    def run(self):
+        instances = []
+        for original_item, importer in self.get_new_importers():
+            try:
+                instance = self.build(importer)
+            except ValidationError as ex:
+                self.results.append((original_item, get(ex, 'message_dict', {}) or get(ex, 'error_dict', {})))
+                continue
+            except Exception as ex:
+                ERRBIT_LOGGER.log(ex)
+                self.results.append((original_item, {'__all__': str(ex)}))
+                continue
+            if instance is None:
+                self.fallback.append(original_item)
+            else:
+                instances.append((original_item, instance))
+
+        if instances:
+            try:
+                with transaction.atomic():
+                    self.write([instance for _, instance in instances])
+            except (DatabaseError, ValueError) as ex:
+                logger.info('Bulk create failed, importing %s lines one by one: %s', len(instances), str(ex))
+                self.fallback += [original_item for original_item, _ in instances]
+                return self.results
+            self.post_write([instance for _, instance in instances])
+            self.new_ids.update(
+                _id for _, instance in instances for _id in [instance.versioned_object_id, instance.latest_version_id])
+            self.results += [(original_item, CREATED) for original_item, _ in instances]
+
+        return self.results
+
+    def get_versions_and_sources(self, instances):
+        ids = PostgresQL.next_values(self.model._meta.db_table, len(instances) * 2)  # pylint: disable=protected-access
+        versions = []
+        sources = []
+        for index, instance in enumerate(instances):
+            instance.id = instance.versioned_object_id = ids[index * 2]
+            instance.version = str(instance.id)
+            instance.is_latest_version = False
+            instance.uri = instance.calculate_uri()
+            version = self.build_initial_version(instance)
+            version.id = ids[index * 2 + 1]
+            version.version = str(version.id)
+            version.is_latest_version = True
+            version.uri = version.calculate_uri()
+            instance.latest_version_id = version.id
+            versions.append(version)
+            resource_field = f'{self.model.__name__.lower()}_id'
+            sources += [
+                self.model.sources.through(**{resource_field: _id, 'source_id': instance.parent_id})
+                for _id in [instance.id, version.id]
+            ]
+        return versions, sources
+
+    @staticmethod
+    def build_initial_version(instance):
+        raise NotImplementedError()
+
+
+class BulkConceptCreator(BulkResourceCreator):
+    importer_class = ConceptImporter
+    model = Concept
+
+    @classmethod
+    def can_handle(cls, item, action, skip_hierarchy_tasks=False):
+        # hierarchy and nested mappings need the saved concept, those lines go through persist_new
+        return super().can_handle(item, action) and not item.get('mappings') and (
+            skip_hierarchy_tasks or not item.get('parent_concept_urls'))
+
+    def get_importer(self, item):
+        return self.importer_class(
+            item, self.user, self.update_if_exists, skip_hierarchy_tasks=self.skip_hierarchy_tasks, cache=self.cache)
+
+    def build(self, importer):
+        data = importer.data
+        names = compact(ConceptName.build(data.pop('names', []) or []))
+        descriptions = compact(ConceptDescription.build(data.pop('descriptions', []) or []))
+        data.pop('parent_concept_urls', None)
+        data.pop('mappings_payload', None)
+        if 'update_comment' in data:
+            data['comment'] = data.pop('update_comment')
+        Concept.validate_locales_limit(names, descriptions)
+
+        concept = Concept(**data, _counted=None, _index=False)
+        concept.version = generate_temp_version()
+        concept.cloned_names = names
+        concept.cloned_descriptions = descriptions
+        parent = concept.parent
+        concept.public_access = parent.public_access
+        concept.full_clean(
+            exclude=['parent', 'versioned_object', 'created_by', 'updated_by'],
+            validate_unique=False, validate_constraints=False
+        )
+        if not concept.external_id:
+            concept.external_id = parent.concept_external_id_next
+        concept.checksums = concept.get_checksums_for_locales(names, descriptions)
+        return concept
+
+    @staticmethod
+    def build_initial_version(instance):
+        # not Concept.clone, that reads the locales and hierarchy of the (not yet saved) concept from the database
+        return Concept(
+            mnemonic=instance.mnemonic,
+            public_access=instance.public_access,
+            external_id=instance.external_id,
+            concept_class=instance.concept_class,
+            datatype=instance.datatype,
+            retired=instance.retired,
+            retire_reason=instance.retire_reason,
+            released=True,
+            extras=instance.extras or {},
+            parent=instance.parent,
+            versioned_object_id=instance.id,
+            comment=instance.comment,
+            created_by_id=instance.created_by_id,
+            updated_by_id=instance.updated_by_id,
+            _index=instance._index  # pylint: disable=protected-access
+        )
+
+    @staticmethod
+    def build_locales(concept, locales, locale_klass):
+        is_name = locale_klass == ConceptName
+        new_locales = []
+        for locale in locales:
+            new_locale = locale.clone()
+            new_locale.concept_id = concept.id
+            if not new_locale.external_id:
+                new_locale.external_id = concept.parent.concept_name_external_id_next if is_name \
+                    else concept.parent.concept_description_external_id_next
+            new_locale.checksums = new_locale.get_all_checksums()
+            new_locales.append(new_locale)
+        return new_locales
+
+    def write(self, instances):
+        versions, sources = self.get_versions_and_sources(instances)
+        names = []
+        descriptions = []
+        for concept, version in zip(instances, versions):
+            for _concept in [concept, version]:
+                names += self.build_locales(_concept, concept.cloned_names, ConceptName)
+                descriptions += self.build_locales(_concept, concept.cloned_descriptions, ConceptDescription)
+
+        self.create(Concept, [*instances, *versions])
+        self.create(ConceptName, names)
+        self.create(ConceptDescription, descriptions)
+        self.create(Concept.sources.through, sources)
+
+    def post_write(self, instances):
+        mnemonics_by_parent = {}
+        for concept in instances:
+            mnemonics_by_parent.setdefault(concept.parent, []).append(concept.mnemonic)
+        for parent, mnemonics in mnemonics_by_parent.items():
+            Concept.update_mappings_for(parent, mnemonics)
+
+
+class BulkMappingCreator(BulkResourceCreator):
+    importer_class = MappingImporter
+    model = Mapping
+
+    def __init__(self, user, update_if_exists, cache=None, skip_hierarchy_tasks=False):
+        super().__init__(user, update_if_exists, cache, skip_hierarchy_tasks)
+        self._unique_keys = set()
+        self._sort_weights = {}
+
+    def build(self, importer):
+        related_fields = ['from_concept_url', 'to_concept_url', 'to_source_url', 'from_source_url']
+        data = {k: v for k, v in importer.data.items() if k not in related_fields}
+        if 'update_comment' in data:
+            data['comment'] = data.pop('update_comment')
+
+        mapping = Mapping(**data, created_by=self.user, updated_by=self.user, _counted=None, _index=False)
+        mapping.version = generate_temp_version()
+        mapping.populate_fields_from_relations(
+            {k: v for k, v in importer.data.items() if k in related_fields}, cache=self.cache)
+        # mappings of the same chunk don't see each other in the database, so repeated ones (that would fail the
+        # uniqueness check of the first one) go through persist_new after this chunk is written
+        unique_key = (
+            mapping.parent_id, mapping.map_type, mapping.from_concept_code, mapping.to_concept_code,
+            mapping.to_source_url, mapping.from_source_url
+        )
+        if unique_key in self._unique_keys:
+            return None
+        self._unique_keys.add(unique_key)
+
+        sort_weight = mapping.sort_weight
+        mapping.full_clean(
+            exclude=['parent', 'versioned_object', 'created_by', 'updated_by', 'from_concept', 'to_concept',
+                     'from_source', 'to_source'],
+            validate_unique=False, validate_constraints=False
+        )
+        self.set_sort_weight(mapping, sort_weight)
+
+        parent = mapping.parent
+        if not mapping.external_id:
+            mapping.external_id = parent.mapping_external_id_next
+        mapping.public_access = parent.public_access
+        return mapping
+
+    def set_sort_weight(self, mapping, requested_sort_weight):
+        # same as Mapping.get_next_sort_weight, also counting the mappings created before in this chunk
+        if not mapping.from_concept_id or not mapping.map_type:
+            return
+        key = (mapping.from_concept_id, mapping.map_type)
+        chunk_max_sort_weight = self._sort_weights.get(key)
+        if not requested_sort_weight and chunk_max_sort_weight is not None:
+            mapping.sort_weight = max(chunk_max_sort_weight + 1, mapping.sort_weight or 0)
+        if not mapping.retired and mapping.sort_weight is not None:
+            self._sort_weights[key] = max(
+                mapping.sort_weight, mapping.sort_weight if chunk_max_sort_weight is None else chunk_max_sort_weight)
+
+    @staticmethod
+    def build_initial_version(instance):
+        version = instance.clone()
+        version.parent = instance.parent
+        version.created_by = version.updated_by = instance.created_by
+        version.comment = instance.comment
+        version.released = False
+        return version
+
+    def write(self, instances):
+        concepts = Concept.objects.only('id', 'uri').in_bulk(
+            compact({_id for mapping in instances for _id in [mapping.from_concept_id, mapping.to_concept_id]}))
+        for mapping in instances:
+            if mapping.from_concept_id in concepts:
+                mapping.from_concept = concepts[mapping.from_concept_id]
+            if mapping.to_concept_id in concepts:
+                mapping.to_concept = concepts[mapping.to_concept_id]
+        versions, sources = self.get_versions_and_sources(instances)
+        for mapping in instances:
+            mapping.checksums = mapping.get_all_checksums()
+
+        self.create(Mapping, [*instances, *versions])
+        self.create(Mapping.sources.through, sources)
+
+
+class CopyCreatorMixin:
+    """
+    Writes the rows of a BulkResourceCreator with COPY FROM STDIN instead of bulk_create, for the initial load of
+    sources (see core.importers.importer.InitialLoadImporter). Only sources that had no concepts and no mappings
+    when first seen are loaded this way, lines of any other source are left in `fallback`.
+    `empty_sources` ({source_id: is_empty}) is shared by the creators of one load.
+    """
+    def __init__(self, *args, empty_sources=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.empty_sources = {} if empty_sources is None else empty_sources
+
+    def is_empty_source(self, parent):
+        if parent.id not in self.empty_sources:
+            self.empty_sources[parent.id] = not parent.concepts_set.exists() and not parent.mappings_set.exists()
+        return self.empty_sources[parent.id]
+
+    def get_new_importers(self):
+        new_importers = []
+        for original_item, importer in super().get_new_importers():
+            if self.is_empty_source(importer.data['parent']):
+                new_importers.append((original_item, importer))
+            else:
+                self.fallback.append(original_item)
+        return new_importers
+
+    @staticmethod
+    def create(model, instances):
+        PostgresQL.copy_instances(model, instances)
+
+
+class CopyConceptCreator(CopyCreatorMixin, BulkConceptCreator):
+    pass
+
+
+class CopyMappingCreator(CopyCreatorMixin, BulkMappingCreator):
+    pass
+
+
 class BulkImportInline(BaseImporter):
     PROGRESS_NOTIFY_INTERVAL_SECONDS = 2
 
     def __init__(  # pylint: disable=too-many-arguments
             self, content, username, update_if_exists=False, input_list=None, user=None, set_user=True,
-            self_task_id=None, skip_hierarchy_tasks=False
+            self_task_id=None, skip_hierarchy_tasks=False, bulk_create_batch_size=None
     ):
         super().__init__(content, username, update_if_exists, user, not bool(input_list), set_user)
         self.self_task_id = self_task_id
         self.skip_hierarchy_tasks = skip_hierarchy_tasks
+        # new concepts/mappings are created in chunks of this many lines (see BulkResourceCreator), 0 disables it
+        self.bulk_create_batch_size = get(
+            settings, 'BULK_IMPORT_CREATE_BATCH_SIZE', 0) if bulk_create_batch_size is None else bulk_create_batch_size
+        self.bulk_creator = None
         # Lookup cache shared across this run's items (see ConceptImporter/MappingImporter).
         # It caches misses too (None/False), so it's only safe because a chunk is single-resource-type
         # in the production parallel path (BulkImportParallelRunner.make_parts splits concepts and
@@ -802,7 +1258,8 @@ class BulkImportInline(BaseImporter):
         # a concept chunk's parent source already exists. If a future change interleaves resource types
         # within one BulkImportInline run (e.g. the deprecated BulkImportInlineView), a mapping could
         # cache a "not found" for a concept created earlier in the same run. Don't share this cache
-        # across resource types unless that invariant is re-verified.
+        # across resource types unless that invariant is re-verified. The mapping lookups are seeded upfront
+        # (see prefetch_mapping_relations), misses included only when the run has nothing but mappings.
         self.cache = {}
         self.set_task()
         if input_list:
@@ -825,6 +1282,9 @@ class BulkImportInline(BaseImporter):
         self.last_progress_notified_at = 0
         self.elapsed_seconds = 0
         self.index_resources = False
+        self.new_concept_ids = set()
+        self.new_mapping_ids = set()
+        self.deferred_hierarchy = {}  # parent_uri -> [child_uris] of the concepts created in this run
 
     def set_task(self):
         self.task = Task.objects.filter(id=self.self_task_id).first()
@@ -883,107 +1343,183 @@ class BulkImportInline(BaseImporter):
             'not_found': len(self.not_found),
             'permission_denied': len(self.permission_denied),
             'unchanged': len(self.unchanged),
+            **self.lookup_stats,
         }
         self.task.save()
 
-    def run(self):  # pylint: disable=too-many-branches,too-many-statements,too-many-locals
+    @property
+    def lookup_stats(self):
+        stats = self.cache.get('lookup_stats', {})
+        return {f'cache_{key}': stats.get(key, 0) for key in ['hits', 'misses', 'prefetched']}
+
+    def prefetch_mapping_relations(self):
+        items = [item for item in self.input_list if (item.get('type') or '').lower() == 'mapping']
+        if items:
+            # unresolved URIs can only be cached upfront when no line of this run can create them
+            MappingImporter.prefetch_relations(items, self.cache, seed_misses=len(items) == len(self.input_list))
+
+    def get_bulk_creator(self, item_type, item, action):
+        creator_class = {'concept': BulkConceptCreator, 'mapping': BulkMappingCreator}.get(item_type)
+        # the hierarchy of new concepts is always deferred, by this run or by BulkImportParallelRunner
+        if not self.bulk_create_batch_size or not creator_class or not creator_class.can_handle(item, action, True):
+            return None
+        if not isinstance(self.bulk_creator, creator_class):
+            self.flush_bulk_creator()
+            self.bulk_creator = creator_class(
+                self.user, self.update_if_exists, cache=self.cache, skip_hierarchy_tasks=True)
+        return self.bulk_creator
+
+    def flush_bulk_creator(self):
+        creator = self.bulk_creator
+        self.bulk_creator = None
+        if not creator:
+            return
+        is_concept = isinstance(creator, BulkConceptCreator)
+        for original_item, result in creator.run():
+            self.handle_item_import_result(result, original_item)
+            if is_concept and result == CREATED and original_item.get(
+                    'parent_concept_urls') and not self.skip_hierarchy_tasks:
+                self.add_deferred_hierarchy(
+                    BulkImportParallelRunner.get_resource_uri(original_item, 'concepts'),
+                    original_item['parent_concept_urls'])
+        if self.index_resources:
+            (self.new_concept_ids if is_concept else self.new_mapping_ids).update(creator.new_ids)
+        import_line = self.import_concept if is_concept else self.import_mapping
+        for original_item in creator.fallback:
+            item = original_item.copy()
+            item.pop('type', None)
+            import_line(item, item.pop('__action', '').lower(), original_item)
+
+    def import_concept(self, item, action, original_item):
+        parent_concept_urls = item.get('parent_concept_urls')
+        try:
+            # hierarchy of new concepts is linked in bulk at the end of the run (see make_deferred_hierarchy)
+            concept_importer = ConceptImporter(
+                item, self.user, self.update_if_exists, skip_hierarchy_tasks=True, cache=self.cache)
+            _result = concept_importer.delete() if action == 'delete' else concept_importer.run()
+            if _result == CREATED and parent_concept_urls and not (self.skip_hierarchy_tasks and item.get('id')):
+                self.add_deferred_hierarchy(concept_importer.instance.uri, parent_concept_urls)
+            if self.index_resources and get(concept_importer.instance, 'id'):
+                self.new_concept_ids.update(set(compact(
+                    [
+                        concept_importer.instance.versioned_object_id,
+                        get(concept_importer.instance, 'prev_latest_version_id'),
+                        get(concept_importer.instance, 'latest_version_id'),
+                        concept_importer.instance.id,
+                    ]
+                )))
+        except Exception as ex:
+            ERRBIT_LOGGER.log(ex)
+            _result = {'__all__': str(ex)}
+        self.handle_item_import_result(_result, original_item)
+
+    def add_deferred_hierarchy(self, child_uri, parent_uris):
+        for parent_uri in parent_uris:
+            self.deferred_hierarchy.setdefault(parent_uri, []).append(child_uri)
+
+    def make_deferred_hierarchy(self):
+        """
+        Links the concepts created in this run to their parents with one set based pass
+        (Concept.add_parent_concepts_in_bulk) instead of a process_hierarchy_for_new_concept task per concept.
+        Concepts with an id imported by BulkImportParallelRunner (skip_hierarchy_tasks) are left to the runner,
+        that links them after all its units.
+        """
+        if self.deferred_hierarchy:
+            Concept.add_parent_concepts_in_bulk(self.deferred_hierarchy)
+            self.deferred_hierarchy = {}
+
+    def import_mapping(self, item, action, original_item):
+        try:
+            mapping_importer = MappingImporter(item, self.user, self.update_if_exists, cache=self.cache)
+            _result = mapping_importer.delete() if action == 'delete' else mapping_importer.run()
+            if self.index_resources and get(mapping_importer.instance, 'id'):
+                self.new_mapping_ids.update(set(compact(
+                    [
+                        mapping_importer.instance.versioned_object_id,
+                        get(mapping_importer.instance, 'prev_latest_version_id'),
+                        get(mapping_importer.instance, 'latest_version_id'),
+                        mapping_importer.instance.id,
+                    ]
+                )))
+        except Exception as ex:
+            ERRBIT_LOGGER.log(ex)
+            _result = {'__all__': str(ex)}
+        self.handle_item_import_result(_result, original_item)
+
+    def import_item(self, original_item):  # pylint: disable=too-many-return-statements
+        item = original_item.copy()
+        item_type = item.pop('type', '').lower()
+        action = item.pop('__action', '').lower()
+        if not item_type:
+            self.unknown.append(original_item)
+        bulk_creator = self.get_bulk_creator(item_type, item, action)
+        if bulk_creator:
+            bulk_creator.add(original_item, item)
+            if len(bulk_creator) >= self.bulk_create_batch_size:
+                self.flush_bulk_creator()
+            return
+        self.flush_bulk_creator()
+        if item_type == 'organization':
+            org_importer = OrganizationImporter(item, self.user, self.update_if_exists)
+            self.handle_item_import_result(
+                org_importer.delete() if action == 'delete' else org_importer.run(), original_item
+            )
+            return
+        if item_type == 'source':
+            source_importer = SourceImporter(item, self.user, self.update_if_exists)
+            self.handle_item_import_result(
+                source_importer.delete() if action == 'delete' else source_importer.run(), original_item
+            )
+            return
+        if item_type == 'source version':
+            self.handle_item_import_result(
+                SourceVersionImporter(item, self.user, self.update_if_exists).run(), original_item
+            )
+            return
+        if item_type == 'collection':
+            collection_importer = CollectionImporter(item, self.user, self.update_if_exists)
+            self.handle_item_import_result(
+                collection_importer.delete() if action == 'delete' else collection_importer.run(), original_item
+            )
+            return
+        if item_type == 'collection version':
+            self.handle_item_import_result(
+                CollectionVersionImporter(item, self.user, self.update_if_exists).run(), original_item
+            )
+            return
+        if item_type == 'concept':
+            self.import_concept(item, action, original_item)
+            return
+        if item_type == 'mapping':
+            self.import_mapping(item, action, original_item)
+            return
+        if item_type == 'reference':
+            reference_importer = ReferenceImporter(item, self.user, self.update_if_exists)
+            self.handle_item_import_result(
+                reference_importer.delete() if action == 'delete' else reference_importer.run(), original_item
+            )
+
+    def run(self):
         if self.self_task_id:  # pragma: no cover
             print("****STARTED SUBPROCESS****")
             print(f"TASK ID: {self.self_task_id}")
             print("***************")
-        new_concept_ids = set()
-        new_mapping_ids = set()
+        self.prefetch_mapping_relations()
         for original_item in self.input_list:
             self.processed += 1
             logger.info('Processing %s of %s', str(self.processed), str(self.total))
             self.notify_progress()
-            item = original_item.copy()
-            item_type = item.pop('type', '').lower()
-            action = item.pop('__action', '').lower()
-            if not item_type:
-                self.unknown.append(original_item)
-            if item_type == 'organization':
-                org_importer = OrganizationImporter(item, self.user, self.update_if_exists)
-                self.handle_item_import_result(
-                    org_importer.delete() if action == 'delete' else org_importer.run(), original_item
-                )
-                continue
-            if item_type == 'source':
-                source_importer = SourceImporter(item, self.user, self.update_if_exists)
-                self.handle_item_import_result(
-                    source_importer.delete() if action == 'delete' else source_importer.run(), original_item
-                )
-                continue
-            if item_type == 'source version':
-                self.handle_item_import_result(
-                    SourceVersionImporter(item, self.user, self.update_if_exists).run(), original_item
-                )
-                continue
-            if item_type == 'collection':
-                collection_importer = CollectionImporter(item, self.user, self.update_if_exists)
-                self.handle_item_import_result(
-                    collection_importer.delete() if action == 'delete' else collection_importer.run(), original_item
-                )
-                continue
-            if item_type == 'collection version':
-                self.handle_item_import_result(
-                    CollectionVersionImporter(item, self.user, self.update_if_exists).run(), original_item
-                )
-                continue
-            if item_type == 'concept':
-                try:
-                    concept_importer = ConceptImporter(
-                        item, self.user, self.update_if_exists,
-                        skip_hierarchy_tasks=self.skip_hierarchy_tasks and bool(item.get('id')),
-                        cache=self.cache
-                    )
-                    _result = concept_importer.delete() if action == 'delete' else concept_importer.run()
-                    if self.index_resources and get(concept_importer.instance, 'id'):
-                        new_concept_ids.update(set(compact(
-                            [
-                                concept_importer.instance.versioned_object_id,
-                                get(concept_importer.instance, 'prev_latest_version_id'),
-                                get(concept_importer.instance, 'latest_version_id'),
-                                concept_importer.instance.id,
-                            ]
-                        )))
-                except Exception as ex:
-                    ERRBIT_LOGGER.log(ex)
-                    _result = {'__all__': str(ex)}
-                self.handle_item_import_result(_result, original_item)
-                continue
-            if item_type == 'mapping':
-                try:
-                    mapping_importer = MappingImporter(item, self.user, self.update_if_exists, cache=self.cache)
-                    _result = mapping_importer.delete() if action == 'delete' else mapping_importer.run()
-                    if self.index_resources and get(mapping_importer.instance, 'id'):
-                        new_mapping_ids.update(set(compact(
-                            [
-                                mapping_importer.instance.versioned_object_id,
-                                get(mapping_importer.instance, 'prev_latest_version_id'),
-                                get(mapping_importer.instance, 'latest_version_id'),
-                                mapping_importer.instance.id,
-                            ]
-                        )))
-                except Exception as ex:
-                    ERRBIT_LOGGER.log(ex)
-                    _result = {'__all__': str(ex)}
-                self.handle_item_import_result(_result, original_item)
-                continue
-            if item_type == 'reference':
-                reference_importer = ReferenceImporter(item, self.user, self.update_if_exists)
-                self.handle_item_import_result(
-                    reference_importer.delete() if action == 'delete' else reference_importer.run(), original_item
-                )
-                continue
+            self.import_item(original_item)
+        self.flush_bulk_creator()
+        self.make_deferred_hierarchy()
 
         self.notify_progress(force=True)
-        if new_concept_ids:
-            for chunk in chunks(list(set(new_concept_ids)), 5000):
+        if self.new_concept_ids:
+            for chunk in chunks(list(set(self.new_concept_ids)), 5000):
                 batch_index_resources.apply_async(
                     ('concept', {'id__in': chunk}, True), queue='indexing', permanent=False)
-        if new_mapping_ids:
-            for chunk in chunks(list(set(new_mapping_ids)), 5000):
+        if self.new_mapping_ids:
+            for chunk in chunks(list(set(self.new_mapping_ids)), 5000):
                 batch_index_resources.apply_async(
                     ('mapping', {'id__in': chunk}, True), queue='indexing', permanent=False)
         self.elapsed_seconds = round(time.time() - self.start_time, 4)
@@ -1017,6 +1553,7 @@ class BulkImportInline(BaseImporter):
             'unchanged': self.unchanged,
             'others': self.others,
             'unknown': self.unknown,
+            **self.lookup_stats,
             'elapsed_seconds': self.elapsed_seconds
         }
 
@@ -1035,10 +1572,15 @@ class BulkImportInline(BaseImporter):
 
 
 class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
+    CHILD_TYPES = ['concept', 'mapping', 'reference']
+    MAX_UNIT_SIZE = 2500
+    POLL_INTERVAL_SECONDS = 2
+
     def __init__(
-            self, content, username, update_if_exists, parallel=None, self_task_id=None
+            self, content, username, update_if_exists, parallel=None, self_task_id=None, stream=False
     ):  # pylint: disable=too-many-arguments
-        super().__init__(content, username, update_if_exists, None, False)
+        # with stream, content is the path/URL of a JSON lines file, read lazily (see JSONLinesStream)
+        super().__init__(JSONLinesStream(content) if stream else content, username, update_if_exists, None, False)
         self.start_time = time.time()
         self.self_task_id = self_task_id
         self.set_task()
@@ -1048,10 +1590,12 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
         self.parallel = int(parallel) if parallel else 5
         self.tasks = []
         self.groups = []
+        self.units = []
         self.results = []
         self.elapsed_seconds = 0
         self.resource_wise_time = {}
         self.parts = deque([])
+        self.lines = []  # input lines, those of units are read again from it when they are queued
         self.result = None
         self._json_result = None
         self.concept_hierarchy_map = {}  # child_uri -> [parent_uris], built before input_list is cleared
@@ -1061,7 +1605,9 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
             self.total = len(self.input_list)
         self.make_resource_distribution()
         self.make_parts()
+        self.make_units()
         self.collect_concept_hierarchy_map()
+        self.lines = self.input_list
         self.content = None  # memory optimization
         self.input_list = []  # memory optimization
 
@@ -1069,13 +1615,28 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
         self.task = Task.objects.filter(id=self.self_task_id).first()
 
     def make_resource_distribution(self):
-        for line in self.input_list:
+        for number, line in enumerate(self.input_list):
             data_type = line.get('type', None)
             if not data_type or data_type.lower() not in ['organization', 'source', 'collection']:
                 continue
             if data_type not in self.resource_distribution:
                 self.resource_distribution[data_type] = []
-            self.resource_distribution[data_type].append(line)
+            self.resource_distribution[data_type].append(self.make_line_ref(number, line))
+
+    def make_line_ref(self, number, line):
+        """
+        What parts and units keep of an input line: its number in input_list, to read it again when its unit is
+        queued (see get_unit_lines), its type, id and action, and the keys of a concept/mapping/reference line (see
+        get_line_keys). So they don't hold every parsed line of a streamed file (see JSONLinesStream).
+        """
+        data_type = line.get('type')
+        ref = {'number': number, 'type': data_type, 'id': line.get('id'), '__action': line.get('__action')}
+        if data_type.lower() in self.CHILD_TYPES:
+            ref['keys'] = self.get_line_keys(line, data_type.lower())
+        return ref
+
+    def get_unit_lines(self, unit):
+        return [self.lines[line['number']] for line in unit['lines']]
 
     def make_parts(self):
         prev_line = None
@@ -1091,11 +1652,12 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
 
         self.parts.append([])
 
-        for line in self.input_list:
+        for number, line in enumerate(self.input_list):
             data_type = line.get('type', '').lower()
             if not data_type:
                 raise ValidationError('"type" should be present in each line')
             if data_type not in ['organization', 'source', 'collection']:
+                line = self.make_line_ref(number, line)
                 if prev_line:
                     prev_type = prev_line.get('type').lower()
                     children_data_types = ['concept', 'mapping', 'reference']
@@ -1114,19 +1676,151 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
             if line.get('type', '').lower() != 'concept':
                 continue
             parent_urls = line.get('parent_concept_urls') or []
-            concept_id = line.get('id')
-            owner = line.get('owner')
-            source = line.get('source')
-            if parent_urls and concept_id and owner and source:
-                owner_type = line.get('owner_type', '').lower()
-                owner_prefix = 'users' if owner_type in ['user', 'users'] else 'orgs'
-                # P2: normalize concept_id the same way ConceptImporter.parse() does,
-                # so the URI matches what was actually persisted in the database.
-                if not is_url_encoded_string(concept_id):
-                    concept_id = encode_string(concept_id, safe='')
-                child_uri = f'/{owner_prefix}/{owner}/sources/{source}/concepts/{concept_id}/'
+            child_uri = self.get_resource_uri(line, 'concepts')
+            if parent_urls and child_uri:
                 self.concept_hierarchy_map[child_uri] = parent_urls
 
+    @staticmethod
+    def get_source_uri(line):
+        """URI of the source of a concept/mapping input line, None if the line doesn't carry owner and source"""
+        owner = line.get('owner')
+        source = line.get('source')
+        if not owner or not source:
+            return None
+        owner_type = (line.get('owner_type') or '').lower()
+        owner_prefix = 'users' if owner_type in ['user', 'users'] else 'orgs'
+        return f'/{owner_prefix}/{owner}/sources/{source}/'
+
+    @classmethod
+    def get_resource_uri(cls, line, resource):
+        """URI of the concept/mapping of an input line, None if the line doesn't carry id, owner and source"""
+        resource_id = line.get('id')
+        source_uri = cls.get_source_uri(line)
+        if not resource_id or not source_uri:
+            return None
+        resource_id = str(resource_id)
+        # P2: normalize the id the same way ConceptImporter.parse() does,
+        # so the URI matches what was actually persisted in the database.
+        if not is_url_encoded_string(resource_id):
+            resource_id = encode_string(resource_id, safe='')
+        return f'{source_uri}{resource}/{resource_id}/'
+
+    @classmethod
+    def get_source_concepts_key(cls, line):
+        """Key of all the concepts of the source of a line, see get_line_keys"""
+        source_uri = cls.get_source_uri(line)
+        return f'{source_uri}concepts/' if source_uri else None
+
+    @staticmethod
+    def is_concept_key(uri):
+        return bool(uri) and uri.startswith('/') and '/concepts/' in uri
+
+    @staticmethod
+    def to_versionless_uri(url):
+        if not url or not isinstance(url, str):
+            return None
+        return drop_version(url if url.endswith('/') else url + '/')
+
+    @classmethod
+    def get_line_keys(cls, line, line_type):
+        """
+        (key, dependency_keys) of a concept/mapping/reference line for the dependency graph of units.
+        key is the URI of the resource the line writes, dependency_keys the URIs of resources it needs. A from/to
+        concept of a mapping that has no such URI (e.g. a canonical URL) is, conservatively, any concept of the
+        mapping's source (see get_source_concepts_key).
+        """
+        if line_type == 'concept':
+            # no parent concept keys, hierarchy is linked after all units are done (see run)
+            return cls.get_resource_uri(line, 'concepts'), []
+        if line_type == 'mapping':
+            dependency_keys = []
+            for prefix in ['from', 'to']:
+                concept_url = line.get(f'{prefix}_concept_url')
+                source_url = line.get(f'{prefix}_source_url')
+                concept_code = line.get(f'{prefix}_concept_code')
+                if not concept_url and source_url and concept_code and isinstance(source_url, str):
+                    concept_code = str(concept_code)
+                    if not is_url_encoded_string(concept_code):
+                        concept_code = encode_string(concept_code, safe='')
+                    concept_url = f"{source_url.rstrip('/')}/concepts/{concept_code}/"
+                concept_uri = cls.to_versionless_uri(concept_url)
+                dependency_keys.append(
+                    concept_uri if cls.is_concept_key(concept_uri) else cls.get_source_concepts_key(line))
+            return cls.get_resource_uri(line, 'mappings'), compact(dependency_keys)
+        data = line.get('data') or {}
+        expressions = []
+        if isinstance(data, dict):
+            for field in ['expressions', 'concepts', 'mappings']:
+                values = data.get(field)
+                if isinstance(values, list):
+                    expressions += values
+        return None, compact([cls.to_versionless_uri(expression) for expression in expressions])
+
+    def add_unit(self, lines, unit_type, dependencies):
+        unit_id = len(self.units)
+        self.units.append({'id': unit_id, 'type': unit_type, 'lines': lines, 'dependencies': set(dependencies)})
+        return unit_id
+
+    def get_units_count(self, lines_count):
+        return max(self.parallel, math.ceil(lines_count / self.MAX_UNIT_SIZE))
+
+    def add_child_units(self, child_lines, barrier):  # pylint: disable=too-many-locals
+        """
+        Adds the units of the concept/mapping/reference lines between two barriers.
+        Lines are grouped by type (in file order) and each type is chunked with chunker_list, so versions of a
+        concept stay in one unit. A unit depends on the barrier and on the units writing the concepts/mappings
+        its lines refer to (mapping -> from/to concept, reference -> expressions) or write again. Concepts are
+        added before mappings and mappings before references, so dependencies always point to earlier units.
+        """
+        unit_ids = set()
+        unit_by_key = {}
+        concept_units_by_source = {}  # get_source_concepts_key -> units writing concepts of that source
+        for child_type in self.CHILD_TYPES:
+            lines = child_lines.get(child_type)
+            if not lines:
+                continue
+            for chunk in compact(self.chunker_list(lines, self.get_units_count(len(lines)), True)):
+                dependencies = set(barrier)
+                keys = []
+                for line in chunk:
+                    key, dependency_keys = line['keys']
+                    dependencies.update(unit_by_key[_key] for _key in [key, *dependency_keys] if _key in unit_by_key)
+                    for _key in dependency_keys:
+                        dependencies.update(concept_units_by_source.get(_key, ()))
+                    keys.append(key)
+                unit_id = self.add_unit(chunk, child_type, dependencies)
+                unit_ids.add(unit_id)
+                unit_by_key.update({key: unit_id for key in compact(keys)})
+                if child_type == 'concept':
+                    for source_key in compact({self.get_source_concepts_key(line) for line in chunk}):
+                        concept_units_by_source.setdefault(source_key, set()).add(unit_id)
+        return unit_ids
+
+    def make_units(self):
+        """
+        Turns parts into units (lines imported by one bulk_import_parts_inline task) and their dependencies.
+        Parts of organizations, sources, collections, source/collection versions etc. are barriers: their units
+        depend on all the units before them and all the units after them depend on them. Concept, mapping and
+        reference parts in between are merged and only depend on the units they actually need (see
+        add_child_units), so interleaved concepts and mappings don't become a series of small phases.
+        """
+        self.units = []
+        barrier = set()
+        child_lines = {}
+        for part in self.parts:
+            part_type = get(part, '0.type', '').lower()
+            if not part_type:
+                continue
+            if part_type in self.CHILD_TYPES:
+                child_lines.setdefault(part_type, []).extend(part)
+                continue
+            dependencies = self.add_child_units(child_lines, barrier) or barrier
+            child_lines = {}
+            has_delete_action = any(line.get('__action') == 'DELETE' for line in part)
+            chunked_lists = [part] if has_delete_action else compact(self.chunker_list(part, self.parallel, False))
+            barrier = {self.add_unit(_list, part_type, dependencies) for _list in chunked_lists}
+        self.add_child_units(child_lines, barrier)
+
     @staticmethod
     def get_resource_id(resource):
         """Normalized (lowercased string) "id" of an input line, '' when absent/blank/null.
@@ -1178,25 +1872,18 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
         return result
 
     def is_any_process_alive(self):
+        """Whether any of the running units (self.groups) is not done yet and has a worker that is still up"""
         if not self.groups:
             return False
 
-        result = False
-
         try:
-            for grp in self.groups:
-                if result:
-                    return result
-                if grp.ready():  # all tasks in that group are done
-                    result = False
-                else:
-                    workers = list(set(compact([task.worker for task in self.tasks if task.status == 'STARTED'])))
-                    workers_status = app.control.ping(destination=workers)  # check if workers are up
-                    result = len(workers_status) != 0
+            running = [task for task in self.groups if not task.ready()]
+            if not running:
+                return False
+            workers = list(set(compact([task.worker for task in running if task.status == 'STARTED'])))
+            return len(app.control.ping(destination=workers)) != 0  # check if workers are up
         except:  # pylint: disable=bare-except
-            result = True
-
-        return result
+            return True
 
     def get_sub_tasks(self):
         if self.tasks:
@@ -1229,30 +1916,51 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
             self.task.summary = {'processed': self.get_completed_progress(), 'total': self.get_total_progress_target()}
             self.task.save()
 
-    def wait_till_tasks_alive(self):
-        while self.is_any_process_alive():
-            time.sleep(5)
+    def wait_for_units(self, running):
+        """Blocks till one of the running units is done. If their workers are gone, all of them are done."""
+        self.groups = list(running.values())
+        while True:
+            done = [unit_id for unit_id, task in running.items() if task.ready()]
+            if done:
+                return done
+            if not self.is_any_process_alive():
+                return list(running.keys())
+            time.sleep(self.POLL_INTERVAL_SECONDS)
             self.update_elapsed_seconds()
             self.notify_progress()
 
+    def run_units(self):
+        """Queues every unit as soon as all the units it depends on are done"""
+        pending = {unit['id']: unit for unit in self.units}
+        running = {}
+        started_at = {}
+        done = set()
+        while pending or running:
+            ready = [unit for unit in pending.values() if unit['dependencies'] <= done]
+            for unit in ready:
+                del pending[unit['id']]
+                started_at[unit['id']] = time.time()
+                running[unit['id']] = self.queue_unit(unit)
+            if not running:
+                break  # dependencies always point to earlier units, so this is only a safety net
+            for unit_id in self.wait_for_units(running):
+                del running[unit_id]
+                done.add(unit_id)
+                unit_type = self.units[unit_id]['type']
+                if unit_type in self.CHILD_TYPES:
+                    self.resource_wise_time[unit_type] = self.resource_wise_time.get(unit_type, 0) + round(
+                        time.time() - started_at[unit_id], 4)
+            self.notify_progress()
+
     def run(self):
         if self.self_task_id:
             print("****STARTED MAIN****")
             print(f"TASK ID: {self.self_task_id}")
             print("***************")
-        while len(self.parts) > 0:
-            part_list = self.parts.popleft()
-            if part_list:
-                part_type = get(part_list, '0.type', '').lower()
-                if part_type:
-                    is_child = part_type in ['concept', 'mapping', 'reference']
-                    start_time = time.time()
-                    self.queue_tasks(part_list, is_child)
-                    self.wait_till_tasks_alive()
-                    if is_child:
-                        if part_type not in self.resource_wise_time:
-                            self.resource_wise_time[part_type] = 0
-                        self.resource_wise_time[part_type] += round(time.time() - start_time, 4)
+        self.run_units()
+        if isinstance(self.lines, JSONLinesStream):
+            self.lines.close()
+        self.lines = []
 
         self.notify_progress()
         if self.concept_hierarchy_map:
@@ -1335,6 +2043,9 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
             'unknown': [],
             'permission_denied': [],
             'unchanged': [],
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'cache_prefetched': 0,
             'elapsed_seconds': self.elapsed_seconds
         }
         for task in self.tasks:
@@ -1370,14 +2081,11 @@ class BulkImportParallelRunner(BaseImporter):  # pragma: no cover
             'report': self.report
         }
 
-    def queue_tasks(self, part_list, is_child):
-        has_delete_action = not is_child and any(line.get('__action') == 'DELETE' for line in part_list)
-        chunked_lists = [part_list] if has_delete_action else compact(
-            self.chunker_list(part_list, self.parallel, is_child))
-        jobs = group(bulk_import_parts_inline.s(_list, self.username, self.update_if_exists) for _list in chunked_lists)
-        group_result = jobs.apply_async(queue='concurrent')
-        self.groups.append(group_result)
-        self.tasks += group_result.results
-        self.task.children += list({task.task_id for task in self.tasks})
-        self.task.children = list(set(self.task.children))
-        self.task.save()
+    def queue_unit(self, unit):
+        result = bulk_import_parts_inline.apply_async(
+            (self.get_unit_lines(unit), self.username, self.update_if_exists), queue='concurrent')
+        self.tasks.append(result)
+        if self.task:
+            self.task.children = list({*self.task.children, result.task_id})
+            self.task.save()
+        return result
@@ -13,6 +13,7 @@ import responses
 from celery_once import AlreadyQueued
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
+from django.db import IntegrityError
 from django.db.models import F
 from ijson import JSONError
 from mock import patch, Mock, ANY, PropertyMock, call
@@ -26,10 +27,12 @@ from core.common.tasks import post_import_update_resource_counts, bulk_import_pa
     bulk_import
 from core.common.tests import OCLAPITestCase, OCLTestCase
 from core.common.utils import decode_string, startswith_temp_version
+from core.concepts.constants import MAX_LOCALES_LIMIT
 from core.concepts.models import Concept
 from core.concepts.tests.factories import ConceptFactory
-from core.importers.importer import ImporterSubtask, ImportTask, ImportTaskSummary, Importer, ResourceImporter
-from core.importers.input_parsers import ImportContentParser
+from core.importers.importer import ImporterSubtask, ImportTask, ImportTaskSummary, Importer, ResourceImporter, \
+    InitialLoadImporter
+from core.importers.input_parsers import ImportContentParser, JSONLinesStream
 from core.importers.models import BulkImport, BulkImportInline, BulkImportParallelRunner, \
     CREATED, UPDATED, DELETED, PERMISSION_DENIED, UNCHANGED, FAILED, NOT_FOUND, \
     BaseImporter, BaseResourceImporter, OrganizationImporter, SourceImporter, SourceVersionImporter, \
@@ -1047,6 +1050,87 @@ class BulkImportInlineTest(OCLTestCase):
         self.assertEqual(len(importer.cache['concept_versioned_id_by_uri']), 3)  # Vegetable, Corn, Carrot
         self.assertEqual(len(importer.cache['concept_by_expr']), 3)
 
+    @patch('core.importers.models.batch_index_resources')
+    def test_mapping_import_prefetches_relations(self, batch_index_resources_mock):
+        batch_index_resources_mock.__name__ = 'batch_index_resources'
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        vegetable = ConceptFactory(parent=source, mnemonic='Vegetable')
+        corn = ConceptFactory(parent=source, mnemonic='Corn')
+
+        input_list = [
+            {
+                "to_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Corn/",
+                "from_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Vegetable/",
+                "type": "Mapping", "source": "DemoSource",
+                "owner": "DemoOrg", "map_type": "Has Child", "owner_type": "Organization",
+            },
+            {
+                "to_concept_url": "/orgs/Other/sources/Other/concepts/Potato/",
+                "from_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Vegetable/",
+                "type": "Mapping", "source": "DemoSource",
+                "owner": "DemoOrg", "map_type": "Same As", "owner_type": "Organization",
+            },
+        ]
+
+        importer = BulkImportInline(content=None, username='ocladmin', update_if_exists=True, input_list=input_list)
+        importer.prefetch_mapping_relations()
+
+        self.assertEqual(
+            importer.cache['concept_versioned_id_by_uri'],
+            {
+                vegetable.uri: vegetable.id,
+                corn.uri: corn.id,
+                '/orgs/Other/sources/Other/concepts/Potato/': None,
+            }
+        )
+        self.assertEqual(importer.cache['concept_by_expr'][vegetable.uri], vegetable)
+        self.assertEqual(
+            importer.cache['concept_by_expr']['/orgs/Other/sources/Other/concepts/Potato/'], {'mnemonic': 'Potato'})
+        self.assertEqual(
+            importer.cache['source_exists_by_uri'],
+            {source.uri: True, '/orgs/Other/sources/Other/': False}
+        )
+        self.assertEqual(importer.lookup_stats, {'cache_hits': 0, 'cache_misses': 0, 'cache_prefetched': 8})
+
+        importer.run()
+
+        self.assertEqual(len(importer.created), 2)
+        self.assertEqual(importer.failed, [])
+        self.assertEqual(importer.lookup_stats['cache_misses'], 2)  # source_resolve_ref of both sources
+        self.assertTrue(importer.lookup_stats['cache_hits'] > 0)
+        self.assertEqual(importer.report['cache_prefetched'], 8)
+        mapping = Mapping.objects.filter(map_type='Same As', id=F('versioned_object_id')).first()
+        self.assertEqual(mapping.from_concept_id, vegetable.id)
+        self.assertIsNone(mapping.to_concept_id)
+        self.assertEqual(mapping.to_concept_code, 'Potato')
+
+    def test_mapping_import_prefetch_does_not_cache_misses_with_other_resource_types(self):
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        vegetable = ConceptFactory(parent=source, mnemonic='Vegetable')
+        input_list = [
+            {
+                "id": "Sugar", "type": "Concept", "concept_class": "Misc", "datatype": "None",
+                "source": "DemoSource", "owner": "DemoOrg", "owner_type": "Organization",
+            },
+            {
+                "to_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Sugar/",
+                "from_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Vegetable/",
+                "type": "Mapping", "source": "DemoSource",
+                "owner": "DemoOrg", "map_type": "Same As", "owner_type": "Organization",
+            },
+        ]
+
+        importer = BulkImportInline(content=None, username='ocladmin', update_if_exists=True, input_list=input_list)
+        importer.prefetch_mapping_relations()
+
+        self.assertEqual(importer.cache['concept_versioned_id_by_uri'], {vegetable.uri: vegetable.id})
+        self.assertEqual(list(importer.cache['concept_by_expr'].keys()), [vegetable.uri])
+        self.assertEqual(importer.cache['source_exists_by_uri'], {source.uri: True})
+
     @patch('core.importers.models.batch_index_resources')
     def test_mapping_import_cache_stale_after_concept_created_in_same_run(self, batch_index_resources_mock):
         # Documents the invariant called out on BulkImportInline.cache: the lookup cache stores
@@ -1526,6 +1610,209 @@ class BulkImportInlineTest(OCLTestCase):
         self.assertEqual(len(importer.permission_denied), 0)
         batch_index_resources_mock.apply_async.assert_not_called()
 
+    @patch('core.importers.models.batch_index_resources')
+    def test_concept_import_with_bulk_create(self, batch_index_resources_mock):  # pylint: disable=too-many-locals,too-many-statements
+        batch_index_resources_mock.__name__ = 'batch_index_resources'
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        existing = ConceptFactory(parent=source, mnemonic='Existing')
+
+        def concept_data(mnemonic, **kwargs):
+            return {
+                "type": "Concept", "id": mnemonic, "concept_class": "Root",
+                "datatype": "None", "source": "DemoSource", "owner": "DemoOrg", "owner_type": "Organization",
+                "names": [{
+                    "name": mnemonic, "locale": "en", "locale_preferred": "True", "name_type": "Fully Specified"
+                }],
+                "descriptions": [{"description": f"{mnemonic} desc", "locale": "en"}],
+                **kwargs
+            }
+
+        food = concept_data('Food')
+        drink = concept_data('Drink', extras={'foo': 'bar'})
+        drink_again = concept_data('Drink', datatype='Text')
+        existing_line = concept_data('Existing', datatype='Text')
+        invalid = concept_data('Invalid')
+        invalid.pop('concept_class')
+        no_source = concept_data('NoSource', source='Foobar')
+        too_many_names = concept_data('TooManyNames')
+        too_many_names['names'] = [
+            {"name": f"name {i}", "locale": "en", "name_type": "Short"} for i in range(MAX_LOCALES_LIMIT + 1)]
+        lines = [food, drink, drink_again, existing_line, invalid, no_source, too_many_names]
+
+        importer = BulkImportInline(
+            '\n'.join(json.dumps(data) for data in lines), 'ocladmin', True, bulk_create_batch_size=100)
+        importer.index_resources = True
+        importer.run()
+
+        self.assertEqual(importer.processed, 7)
+        self.assertEqual(importer.created, [food, drink])
+        self.assertEqual(importer.updated, [drink_again, existing_line])
+        self.assertEqual(importer.invalid, [invalid])
+        self.assertEqual(len(importer.failed), 2)
+        self.assertEqual(importer.failed[0]['errors'], {'source': 'Not Found'})
+        self.assertEqual(importer.failed[1]['id'], 'TooManyNames')
+        self.assertIn('names', importer.failed[1]['errors'])
+
+        food_concept = Concept.objects.get(mnemonic='Food', id=F('versioned_object_id'))
+        food_version = food_concept.versions.exclude(id=food_concept.id).get()
+        self.assertEqual(food_concept.uri, '/orgs/DemoOrg/sources/DemoSource/concepts/Food/')
+        self.assertEqual(food_concept.version, str(food_concept.id))
+        self.assertFalse(food_concept.is_latest_version)
+        self.assertIsNone(food_concept._counted)  # pylint: disable=protected-access
+        self.assertEqual(
+            food_version.uri, f'/orgs/DemoOrg/sources/DemoSource/concepts/Food/{food_version.id}/')
+        self.assertEqual(food_version.version, str(food_version.id))
+        self.assertTrue(food_version.is_latest_version)
+        self.assertTrue(food_version.released)
+        self.assertEqual(food_concept.created_by.username, 'ocladmin')
+        for concept in [food_concept, food_version]:
+            self.assertEqual(list(concept.names.values_list('name', flat=True)), ['Food'])
+            self.assertEqual(list(concept.descriptions.values_list('name', flat=True)), ['Food desc'])
+            self.assertEqual(list(concept.sources.values_list('id', flat=True)), [source.id])
+        self.assertEqual(food_concept.checksums, food_concept.get_checksums(recalculate=True))
+        name = food_concept.names.first()
+        self.assertEqual(name.checksums, name.get_checksums(recalculate=True))
+
+        drink_concept = Concept.objects.get(mnemonic='Drink', id=F('versioned_object_id'))
+        self.assertEqual(drink_concept.versions.count(), 2)
+        self.assertEqual(drink_concept.get_latest_version().datatype, 'Text')
+        self.assertEqual(drink_concept.extras, {'foo': 'bar'})
+        self.assertEqual(existing.versions.count(), 2)
+        self.assertFalse(Concept.objects.filter(mnemonic__in=['Invalid', 'NoSource', 'TooManyNames']).exists())
+
+        indexed_ids = set()
+        for mock_call in batch_index_resources_mock.apply_async.mock_calls:
+            indexed_ids.update(mock_call[1][0][1]['id__in'])
+        self.assertTrue({food_concept.id, food_version.id, drink_concept.id}.issubset(indexed_ids))
+
+    def test_concept_import_with_bulk_create_links_existing_mappings(self):
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        mapping = MappingFactory(
+            parent=source, to_concept=None, to_concept_code='Food', to_source_url=source.uri)
+
+        importer = BulkImportInline(
+            json.dumps({
+                "type": "Concept", "id": "Food", "concept_class": "Root",
+                "datatype": "None", "source": "DemoSource", "owner": "DemoOrg", "owner_type": "Organization",
+                "names": [{"name": "Food", "locale": "en", "locale_preferred": "True"}],
+            }), 'ocladmin', True, bulk_create_batch_size=100)
+        importer.run()
+
+        self.assertEqual(len(importer.created), 1)
+        mapping.refresh_from_db()
+        self.assertEqual(mapping.to_concept, Concept.objects.get(mnemonic='Food', id=F('versioned_object_id')))
+
+    @patch('core.concepts.models.process_hierarchy_for_new_concept')
+    def test_concept_import_defers_hierarchy_to_end_of_run(self, process_hierarchy_mock):
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        lines = [
+            {
+                "type": "Concept", "id": mnemonic, "concept_class": "Root",
+                "datatype": "None", "source": "DemoSource", "owner": "DemoOrg", "owner_type": "Organization",
+                "names": [{"name": mnemonic, "locale": "en", "locale_preferred": "True"}],
+                **({"parent_concept_urls": ["/orgs/DemoOrg/sources/DemoSource/concepts/Food/"]} if parent else {})
+            } for mnemonic, parent in [('Fruit', True), ('Food', False), ('Drink', True)]
+        ]
+
+        for bulk_create_batch_size in [0, 100]:
+            source.concepts_set.all().delete()
+            importer = BulkImportInline(
+                '\n'.join(json.dumps(data) for data in lines), 'ocladmin', True,
+                bulk_create_batch_size=bulk_create_batch_size)
+            importer.run()
+
+            self.assertEqual(importer.created, lines)
+            self.assertEqual(importer.deferred_hierarchy, {})
+            food = Concept.objects.get(mnemonic='Food', id=F('versioned_object_id'))
+            for mnemonic in ['Fruit', 'Drink']:
+                concept = Concept.objects.get(mnemonic=mnemonic, id=F('versioned_object_id'))
+                self.assertEqual(list(concept.parent_concept_urls), [food.uri])
+                self.assertEqual(list(concept.get_latest_version().parent_concept_urls), [food.uri])
+        process_hierarchy_mock.assert_not_called()
+        process_hierarchy_mock.apply_async.assert_not_called()
+
+    @patch('core.importers.models.BulkConceptCreator.write')
+    def test_concept_import_with_bulk_create_falls_back_to_lines_on_write_error(self, write_mock):
+        write_mock.side_effect = IntegrityError('duplicate key')
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        lines = [
+            {
+                "type": "Concept", "id": mnemonic, "concept_class": "Root",
+                "datatype": "None", "source": "DemoSource", "owner": "DemoOrg", "owner_type": "Organization",
+                "names": [{"name": mnemonic, "locale": "en", "locale_preferred": "True"}],
+            } for mnemonic in ['Food', 'Drink', 'Fruit']
+        ]
+
+        importer = BulkImportInline(
+            '\n'.join(json.dumps(data) for data in lines), 'ocladmin', True, bulk_create_batch_size=2)
+        importer.run()
+
+        self.assertEqual(write_mock.call_count, 2)
+        self.assertEqual(importer.created, lines)
+        self.assertEqual(source.concepts_set.filter(id=F('versioned_object_id')).count(), 3)
+
+    def test_mapping_import_with_bulk_create(self):
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        vegetable = ConceptFactory(parent=source, mnemonic='Vegetable')
+        corn = ConceptFactory(parent=source, mnemonic='Corn')
+        ConceptFactory(parent=source, mnemonic='Food')
+        MappingFactory(
+            parent=source, mnemonic='Existing', from_concept=vegetable, to_concept=corn, map_type='Foo',
+            from_concept_code='Vegetable', to_concept_code='Corn', from_source_url=source.uri, to_source_url=source.uri
+        )
+
+        def mapping_data(mnemonic, to_concept, **kwargs):
+            return {
+                "type": "Mapping", "id": mnemonic, "source": "DemoSource", "owner": "DemoOrg",
+                "owner_type": "Organization", "map_type": "Has Child",
+                "from_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Vegetable/",
+                "to_concept_url": f"/orgs/DemoOrg/sources/DemoSource/concepts/{to_concept}/",
+                **kwargs
+            }
+
+        corn_line = mapping_data('M1', 'Corn')
+        food_line = mapping_data('M2', 'Food', extras={'foo': 'bar'})
+        repeated_line = mapping_data('M3', 'Corn')
+        existing_line = mapping_data('Existing', 'Corn', map_type='Foo', retired=True)
+        no_id_line = mapping_data(None, 'Food', map_type='Bar')
+        no_id_line.pop('id')
+        lines = [corn_line, food_line, repeated_line, existing_line, no_id_line]
+
+        importer = BulkImportInline(
+            '\n'.join(json.dumps(data) for data in lines), 'ocladmin', True, bulk_create_batch_size=100)
+        importer.run()
+
+        self.assertEqual(importer.processed, 5)
+        self.assertEqual(importer.created, [corn_line, food_line, no_id_line])
+        self.assertEqual(importer.updated, [existing_line])
+        self.assertEqual(len(importer.failed), 1)
+        self.assertEqual(importer.failed[0]['id'], 'M3')
+
+        mapping = Mapping.objects.get(mnemonic='M1', id=F('versioned_object_id'))
+        version = mapping.versions.exclude(id=mapping.id).get()
+        self.assertEqual(mapping.uri, '/orgs/DemoOrg/sources/DemoSource/mappings/M1/')
+        self.assertEqual(version.uri, f'/orgs/DemoOrg/sources/DemoSource/mappings/M1/{version.id}/')
+        self.assertFalse(mapping.is_latest_version)
+        self.assertTrue(version.is_latest_version)
+        self.assertEqual(mapping.from_concept_id, vegetable.id)
+        self.assertEqual(mapping.to_concept_id, corn.id)
+        self.assertEqual(version.to_concept_id, corn.id)
+        self.assertEqual(list(mapping.sources.values_list('id', flat=True)), [source.id])
+        self.assertEqual(list(version.sources.values_list('id', flat=True)), [source.id])
+        self.assertEqual(mapping.checksums, mapping.get_checksums(recalculate=True))
+        self.assertEqual(Mapping.objects.get(mnemonic='M2', id=F('versioned_object_id')).extras, {'foo': 'bar'})
+        self.assertTrue(Mapping.objects.get(mnemonic='Existing', is_latest_version=True).retired)
+
 
 class ResourceImporterModelsTest(OCLTestCase):
     def test_base_importer_run_not_implemented(self):
@@ -2228,23 +2515,18 @@ class BulkImportParallelRunnerTest(OCLTestCase):
         self.assertFalse(importer.is_any_process_alive())
 
         # worker1 and worker2 failed after processing some jobs and/or part of started jobs
-        # worker3 finished everything
-        importer.tasks = [
-            Mock(task_id='task1', worker='worker1', status='SUCCESS'),
-            Mock(task_id='task2', worker='worker1', status='FAILED'),
-            Mock(task_id='task3', worker='worker1', status='STARTED'),
-            Mock(task_id='task4', worker='worker1', status='STARTED'),
-            Mock(task_id='task5', worker='worker2', status='PENDING'),
-            Mock(task_id='task6', worker='worker2', status='STARTED'),
-            Mock(task_id='task7', worker='worker3', status='SUCCESS'),
+        # worker3 finished everything, only the units still running are polled
+        importer.tasks = [Mock(task_id='task1', worker='worker4', status='STARTED')]
+        importer.groups = [
+            Mock(task_id='task2', worker='worker1', status='STARTED', ready=Mock(return_value=False)),
+            Mock(task_id='task3', worker='worker1', status='STARTED', ready=Mock(return_value=False)),
+            Mock(task_id='task4', worker='worker2', status='PENDING', ready=Mock(return_value=False)),
+            Mock(task_id='task5', worker='worker2', status='STARTED', ready=Mock(return_value=False)),
+            Mock(task_id='task6', worker='worker3', status='SUCCESS', ready=Mock(return_value=True)),
         ]
 
         celery_app_mock.ping = Mock(return_value=[])
 
-        importer.groups = [
-            Mock(ready=Mock(return_value=True)),
-            Mock(ready=Mock(return_value=False)),
-        ]
         self.assertFalse(importer.is_any_process_alive())
         self.assertCountEqual(celery_app_mock.ping.call_args[1]['destination'], ['worker1', 'worker2'])
 
@@ -2329,6 +2611,149 @@ class BulkImportParallelRunnerTest(OCLTestCase):
         task.refresh_from_db()
         self.assertEqual(task.summary, {'processed': 151, 'total': 2})
 
+    @staticmethod
+    def get_interleaved_content():
+        def concept(mnemonic):
+            return {"type": "Concept", "id": mnemonic, "owner": "O", "owner_type": "Organization", "source": "S"}
+
+        def mapping(mnemonic, to_concept_url):
+            return {
+                "type": "Mapping", "id": mnemonic, "owner": "O", "owner_type": "Organization", "source": "S",
+                "map_type": "Same As", "from_concept_url": "/orgs/O/sources/S/concepts/A/",
+                "to_concept_url": to_concept_url
+            }
+        return '\n'.join(json.dumps(line) for line in [
+            {"type": "Organization", "id": "O"},
+            {"type": "Source", "id": "S", "owner": "O", "owner_type": "Organization"},
+            concept('A'),
+            mapping('M1', "/orgs/O/sources/S/concepts/B/1/"),
+            concept('B'),
+            mapping('M2', "/orgs/O/sources/X/concepts/X/"),
+            {"type": "Source Version", "id": "v1", "owner": "O", "owner_type": "Organization", "source": "S"},
+            concept('C'),
+        ])
+
+    def test_stream(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'samples/sample_ocldev.json')
+        importer = BulkImportParallelRunner(path, 'ocladmin', True, stream=True)
+        expected = BulkImportParallelRunner(open(path, 'r').read(), 'ocladmin', True)
+
+        self.assertEqual(importer.total, 64)
+        self.assertEqual(list(importer.parts), list(expected.parts))
+        self.assertEqual(importer.units, expected.units)
+        self.assertIsNone(importer.content)
+        self.assertEqual(importer.input_list, [])
+        self.assertIsInstance(importer.lines, JSONLinesStream)
+        self.assertTrue(all('name' not in line for unit in importer.units for line in unit['lines']))
+        self.assertEqual(
+            [importer.get_unit_lines(unit) for unit in importer.units],
+            [expected.get_unit_lines(unit) for unit in expected.units]
+        )
+        importer.lines.close()
+
+    def test_make_units(self):
+        importer = BulkImportParallelRunner(self.get_interleaved_content(), 'ocladmin', True, 2)
+
+        self.assertEqual(
+            [(unit['type'], [line['id'] for line in unit['lines']], unit['dependencies']) for unit in importer.units],
+            [
+                ('organization', ['O'], set()),
+                ('source', ['S'], {0}),
+                ('concept', ['A'], {1}),
+                ('concept', ['B'], {1}),
+                ('mapping', ['M1'], {1, 2, 3}),
+                ('mapping', ['M2'], {1, 2}),
+                ('source version', ['v1'], {2, 3, 4, 5}),
+                ('concept', ['C'], {6}),
+            ]
+        )
+
+    def test_make_units_with_canonical_concept_url(self):
+        content = self.get_interleaved_content().replace(
+            '/orgs/O/sources/X/concepts/X/', 'http://example.org/concepts/X')
+        importer = BulkImportParallelRunner(content, 'ocladmin', True, 2)
+
+        self.assertEqual(
+            [(unit['type'], [line['id'] for line in unit['lines']], unit['dependencies']) for unit in importer.units],
+            [
+                ('organization', ['O'], set()),
+                ('source', ['S'], {0}),
+                ('concept', ['A'], {1}),
+                ('concept', ['B'], {1}),
+                ('mapping', ['M1'], {1, 2, 3}),
+                ('mapping', ['M2'], {1, 2, 3}),
+                ('source version', ['v1'], {2, 3, 4, 5}),
+                ('concept', ['C'], {6}),
+            ]
+        )
+
+    def test_make_units_for_sample(self):
+        importer = BulkImportParallelRunner(
+            open(
+                os.path.join(os.path.dirname(__file__), '..', 'samples/sample_ocldev.json'), 'r'
+            ).read(),
+            'ocladmin', True
+        )
+
+        self.assertEqual(sum(len(unit['lines']) for unit in importer.units), 64)
+        for unit in importer.units:
+            self.assertTrue(all(dependency < unit['id'] for dependency in unit['dependencies']))
+            self.assertEqual(len({line['type'] for line in unit['lines']}), 1)
+
+    def test_get_line_keys(self):
+        self.assertEqual(
+            BulkImportParallelRunner.get_line_keys(
+                {"id": "A&B", "owner": "U", "owner_type": "User", "source": "S"}, 'concept'),
+            ('/users/U/sources/S/concepts/A%26B/', [])
+        )
+        self.assertEqual(
+            BulkImportParallelRunner.get_line_keys(
+                {"owner": "O", "source": "S", "from_concept_url": "/orgs/O/sources/S/concepts/A/1/",
+                 "to_source_url": "/orgs/O/sources/T/", "to_concept_code": "B"}, 'mapping'),
+            (None, ['/orgs/O/sources/S/concepts/A/', '/orgs/O/sources/T/concepts/B/'])
+        )
+        self.assertEqual(
+            BulkImportParallelRunner.get_line_keys(
+                {"id": "M", "owner": "O", "source": "S", "from_concept_url": "/orgs/O/sources/S/concepts/A/",
+                 "to_concept_url": "http://loinc.org/concepts/B"}, 'mapping'),
+            ('/orgs/O/sources/S/mappings/M/', ['/orgs/O/sources/S/concepts/A/', '/orgs/O/sources/S/concepts/'])
+        )
+        self.assertEqual(
+            BulkImportParallelRunner.get_line_keys(
+                {"collection": "C", "data": {"expressions": ["/orgs/O/sources/S/concepts/A/1/"]}}, 'reference'),
+            (None, ['/orgs/O/sources/S/concepts/A/'])
+        )
+
+    @patch('core.importers.models.BulkImportParallelRunner.wait_for_units')
+    @patch('core.importers.models.BulkImportParallelRunner.queue_unit')
+    def test_run_units(self, queue_unit_mock, wait_for_units_mock):
+        queue_unit_mock.side_effect = lambda unit: f"task-{unit['id']}"
+        wait_for_units_mock.side_effect = lambda running: list(running.keys())
+        importer = BulkImportParallelRunner(self.get_interleaved_content(), 'ocladmin', True, 2)
+
+        importer.run_units()
+
+        self.assertEqual([_call[0][0]['id'] for _call in queue_unit_mock.call_args_list], [0, 1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(
+            [sorted(_call[0][0].keys()) for _call in wait_for_units_mock.call_args_list],
+            [[0], [1], [2, 3], [4, 5], [6], [7]]
+        )
+        self.assertEqual(sorted(importer.resource_wise_time.keys()), ['concept', 'mapping'])
+
+    @patch('core.importers.models.BulkImportParallelRunner.is_any_process_alive')
+    def test_wait_for_units(self, is_any_process_alive_mock):
+        importer = BulkImportParallelRunner(self.get_interleaved_content(), 'ocladmin', True, 2)
+        running = {1: Mock(ready=Mock(return_value=False)), 2: Mock(ready=Mock(return_value=True))}
+
+        self.assertEqual(importer.wait_for_units(running), [2])
+        is_any_process_alive_mock.assert_not_called()
+
+        running = {1: Mock(ready=Mock(return_value=False)), 3: Mock(ready=Mock(return_value=False))}
+        is_any_process_alive_mock.return_value = False
+
+        self.assertEqual(importer.wait_for_units(running), [1, 3])
+        self.assertEqual(importer.groups, list(running.values()))
+
     def test_chunker_list(self):
         self.assertEqual(
             list(BulkImportParallelRunner.chunker_list([1, 2, 3], 3, False)), [[1], [2], [3]]
@@ -2594,8 +3019,7 @@ class BulkImportParallelRunnerTest(OCLTestCase):
     # ── run() hierarchy reconciliation ───────────────────────────────────────
 
     @patch('core.importers.models.post_import_update_resource_counts.apply_async', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.wait_till_tasks_alive', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.queue_tasks', Mock())
+    @patch('core.importers.models.BulkImportParallelRunner.run_units', Mock())
     @patch('core.importers.models.make_hierarchy')
     def test_run_calls_make_hierarchy_with_inverted_map(self, make_hierarchy_mock):
         """After all chunks complete, make_hierarchy receives the inverted {parent_uri: [child_uris]} map."""
@@ -2627,8 +3051,7 @@ class BulkImportParallelRunnerTest(OCLTestCase):
         self.assertIn(child.uri, inverted[parent.uri])
 
     @patch('core.importers.models.post_import_update_resource_counts.apply_async', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.wait_till_tasks_alive', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.queue_tasks', Mock())
+    @patch('core.importers.models.BulkImportParallelRunner.run_units', Mock())
     @patch('core.importers.models.make_hierarchy')
     def test_run_skips_make_hierarchy_when_no_hierarchy(self, make_hierarchy_mock):
         """make_hierarchy is not called when no concept in the import has parent_concept_urls."""
@@ -2644,8 +3067,7 @@ class BulkImportParallelRunnerTest(OCLTestCase):
         make_hierarchy_mock.assert_not_called()
 
     @patch('core.importers.models.post_import_update_resource_counts.apply_async', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.wait_till_tasks_alive', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.queue_tasks', Mock())
+    @patch('core.importers.models.BulkImportParallelRunner.run_units', Mock())
     def test_run_hierarchy_child_before_parent(self):
         """
         End-to-end: when child appears before parent in the import file, the reconciliation
@@ -2677,8 +3099,7 @@ class BulkImportParallelRunnerTest(OCLTestCase):
         self.assertIn(parent.get_latest_version(), child.parent_concepts.all())
 
     @patch('core.importers.models.post_import_update_resource_counts.apply_async', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.wait_till_tasks_alive', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.queue_tasks', Mock())
+    @patch('core.importers.models.BulkImportParallelRunner.run_units', Mock())
     def test_run_hierarchy_parent_before_child(self):
         """
         End-to-end: when parent appears before child (natural order), the reconciliation
@@ -2709,8 +3130,7 @@ class BulkImportParallelRunnerTest(OCLTestCase):
         self.assertIn(parent.get_latest_version(), child.parent_concepts.all())
 
     @patch('core.importers.models.post_import_update_resource_counts.apply_async', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.wait_till_tasks_alive', Mock())
-    @patch('core.importers.models.BulkImportParallelRunner.queue_tasks', Mock())
+    @patch('core.importers.models.BulkImportParallelRunner.run_units', Mock())
     @patch('core.importers.models.make_hierarchy')
     def test_run_excludes_inaccessible_concepts(self, make_hierarchy_mock):
         """
@@ -3190,6 +3610,51 @@ class BulkImportViewTest(OCLAPITestCase):
         self.assertEqual(bulk_import_mock.apply_async.call_args[1]['task_id'][37:], 'ocladmin~bulk_import_root')
         self.assertEqual(bulk_import_mock.apply_async.call_args[1]['queue'], 'bulk_import_root')
 
+    @patch('core.common.tasks.bulk_import_parallel_inline')
+    def test_post_inline_parallel_stream_file_url_202(self, bulk_import_mock):
+        bulk_import_mock.__name__ = 'bulk_import_parallel_inline'
+
+        response = self.client.post(
+            "/importers/bulk-import-parallel-inline/?update_if_exists=true",
+            {'file_url': 'https://fetch/file.json', 'stream': 'true', 'parallel': 2},
+            HTTP_AUTHORIZATION='Token ' + self.token,
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(bulk_import_mock.apply_async.call_count, 1)
+        self.assertEqual(
+            bulk_import_mock.apply_async.call_args[0], (('https://fetch/file.json', 'ocladmin', True, '2', True),))
+
+    @patch('core.importers.views.store_import_file')
+    @patch('core.common.tasks.bulk_import_parallel_inline')
+    def test_post_inline_parallel_stream_file_upload_202(self, bulk_import_mock, store_import_file_mock):
+        bulk_import_mock.__name__ = 'bulk_import_parallel_inline'
+        store_import_file_mock.return_value = 'import_cache/import_upload_1'
+        file = SimpleUploadedFile('file.json', b'{"key": "value"}', "application/json")
+
+        response = self.client.post(
+            "/importers/bulk-import-parallel-inline/?update_if_exists=true",
+            {'file': file, 'stream': 'true'},
+            HTTP_AUTHORIZATION='Token ' + self.token,
+        )
+
+        self.assertEqual(response.status_code, 202)
+        store_import_file_mock.assert_called_once()
+        self.assertEqual(
+            bulk_import_mock.apply_async.call_args[0], (('import_cache/import_upload_1', 'ocladmin', True, 5, True),))
+
+    @patch('core.common.tasks.bulk_import_parallel_inline')
+    def test_post_inline_parallel_stream_csv_400(self, bulk_import_mock):
+        response = self.client.post(
+            "/importers/bulk-import-parallel-inline/?update_if_exists=true",
+            {'file_url': 'https://fetch/file.csv', 'stream': 'true'},
+            HTTP_AUTHORIZATION='Token ' + self.token,
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'exception': 'Only JSON lines files can be streamed.'})
+        bulk_import_mock.apply_async.assert_not_called()
+
     @patch('core.common.tasks.bulk_import_inline')
     def test_post_inline_202(self, bulk_import_mock):
         bulk_import_mock.__name__ = 'bulk_import_inline'
@@ -4090,6 +4555,103 @@ class ImporterTest(OCLTestCase):
                 importer.categorize_resources(io.BytesIO(b'garbage'), '/path', 'file.json', ['CodeSystem'], {})
 
 
+class InitialLoadImporterTest(OCLTestCase):
+    @staticmethod
+    def write_lines(lines):
+        file = tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False)  # pylint: disable=consider-using-with
+        file.write('\n'.join(json.dumps(line) for line in lines))
+        file.close()
+        return file.name
+
+    @staticmethod
+    def concept_data(mnemonic, **kwargs):
+        return {
+            "type": "Concept", "id": mnemonic, "concept_class": "Root", "datatype": "None", "source": "DemoSource",
+            "owner": "DemoOrg", "owner_type": "Organization",
+            "names": [{"name": mnemonic, "locale": "en", "locale_preferred": "True", "name_type": "Fully Specified"}],
+            "descriptions": [{"description": f"{mnemonic} desc", "locale": "en"}],
+            **kwargs
+        }
+
+    def test_is_csv(self):
+        self.assertFalse(InitialLoadImporter.is_csv(io.BytesIO(b'  {"type": "Concept"}')))
+        self.assertFalse(InitialLoadImporter.is_csv(io.BytesIO(b'// comment')))
+        self.assertFalse(InitialLoadImporter.is_csv(io.BytesIO(b'')))
+        self.assertTrue(InitialLoadImporter.is_csv(io.BytesIO(b'resource_type,id\nConcept,A')))
+
+    @patch('core.importers.importer.InitialLoadImporter')
+    def test_run_initial_load_import_type(self, initial_load_importer_mock):
+        initial_load_importer_mock.return_value.run.return_value.model_dump.return_value = {'result': 'done'}
+
+        result = Importer('task-1', '/path/file.json', 'ocladmin', 'users', 'ocladmin', 'initial_load').run()
+
+        self.assertEqual(result, {'result': 'done'})
+        initial_load_importer_mock.assert_called_once_with('/path/file.json', 'ocladmin', 'users', 'ocladmin')
+
+    @patch('core.sources.models.Source.index_children_async')
+    def test_run(self, index_children_async_mock):
+        path = self.write_lines([
+            {"type": "Organization", "id": "DemoOrg", "name": "Demo Org"},
+            {"type": "Source", "id": "DemoSource", "name": "Demo Source", "owner": "DemoOrg",
+             "owner_type": "Organization"},
+            self.concept_data('Food'),
+            {"type": "Mapping", "id": "M1", "map_type": "Q-AND-A",
+             "from_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Food/",
+             "to_concept_url": "/orgs/DemoOrg/sources/DemoSource/concepts/Drink/", "source": "DemoSource",
+             "owner": "DemoOrg", "owner_type": "Organization"},
+            self.concept_data('Drink', extras={'foo': 'bar\tbaz'}),
+            self.concept_data('Food', datatype='Text'),
+            {"type": "Source Version", "id": "v1", "source": "DemoSource", "description": "v1",
+             "owner": "DemoOrg", "owner_type": "Organization", "released": True},
+        ])
+
+        import_task = InitialLoadImporter(path, 'ocladmin', 'users', 'ocladmin', batch_size=10).run()
+        os.remove(path)
+
+        summary = import_task.summary
+        self.assertEqual(summary.total, 7)
+        self.assertEqual(summary.created, 6)
+        self.assertEqual(summary.updated, 1)
+        self.assertEqual(summary.failed, 0)
+        self.assertIsNotNone(import_task.time_finished)
+
+        source = Source.objects.get(mnemonic='DemoSource', version='HEAD')
+        self.assertEqual(source.get_concepts_queryset().count(), 2)
+        food = source.get_concepts_queryset().get(mnemonic='Food')
+        self.assertEqual(food.datatype, 'Text')
+        drink = source.get_concepts_queryset().get(mnemonic='Drink')
+        self.assertEqual(drink.extras, {'foo': 'bar\tbaz'})
+        self.assertEqual(drink.uri, '/orgs/DemoOrg/sources/DemoSource/concepts/Drink/')
+        self.assertEqual(drink.names.first().name, 'Drink')
+        self.assertEqual(drink.descriptions.first().description, 'Drink desc')
+        self.assertTrue(drink.get_latest_version().is_latest_version)
+        self.assertTrue(drink.checksums['standard'])
+        mapping = source.get_mappings_queryset().get(mnemonic='M1')
+        self.assertEqual(mapping.from_concept_id, food.id)
+        self.assertEqual(mapping.to_concept_id, drink.id)
+        self.assertEqual(source.active_concepts, 2)
+        self.assertEqual(source.active_mappings, 1)
+        self.assertTrue(Source.objects.filter(mnemonic='DemoSource', version='v1').exists())
+        index_children_async_mock.assert_called_once()
+
+    @patch('core.sources.models.Source.index_children_async')
+    @patch('core.services.storages.postgres.PostgresQL.copy_rows')
+    def test_run_for_source_with_concepts(self, copy_rows_mock, index_children_async_mock):
+        source = OrganizationSourceFactory(
+            organization=(OrganizationFactory(mnemonic='DemoOrg')), mnemonic='DemoSource', version='HEAD'
+        )
+        ConceptFactory(parent=source, mnemonic='Existing')
+        path = self.write_lines([self.concept_data('Food')])
+
+        import_task = InitialLoadImporter(path, 'ocladmin', 'users', 'ocladmin').run()
+        os.remove(path)
+
+        self.assertEqual(import_task.summary.created, 1)
+        self.assertTrue(source.get_concepts_queryset().filter(mnemonic='Food').exists())
+        copy_rows_mock.assert_not_called()
+        index_children_async_mock.assert_not_called()
+
+
 class ImporterSubtaskTest(OCLTestCase):
 
     @staticmethod
@@ -4718,6 +5280,54 @@ class ResourceImporterTest(OCLAPITestCase):
         serializer_cls_mock.assert_called_once_with(source, data={'resourceType': 'CodeSystem'}, context=ANY)
 
 
+class JSONLinesStreamTest(OCLTestCase):
+    def test_iter_local_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as file:
+            file.write(b'{"type": "Concept", "id": "A"}\n\n{"type": "Concept", "id": "B"}')
+            file.flush()
+            stream = JSONLinesStream(file.name)
+
+            with patch.object(stream, 'open_source', wraps=stream.open_source) as open_source_mock:
+                self.assertEqual(list(stream), [{"type": "Concept", "id": "A"}, {"type": "Concept", "id": "B"}])
+                self.assertEqual(len(stream), 2)
+                self.assertEqual(list(stream), [{"type": "Concept", "id": "A"}, {"type": "Concept", "id": "B"}])
+                self.assertEqual(stream[1], {"type": "Concept", "id": "B"})
+                self.assertEqual(stream[0], {"type": "Concept", "id": "A"})
+                open_source_mock.assert_called_once()
+
+            stream.close()
+            self.assertIsNone(stream.spill)
+            self.assertEqual(len(stream), 2)
+
+    def test_iter_invalid_json(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as file:
+            file.write(b'{"type": "Concept"}\n{"type": ')
+            file.flush()
+
+            with self.assertRaises(JSONDecodeError):
+                list(JSONLinesStream(file.name))
+
+    @patch('core.importers.input_parsers.get_export_service')
+    @patch('core.importers.input_parsers.requests.get')
+    def test_iter_import_cache_file(self, requests_get_mock, get_export_service_mock):
+        get_export_service_mock.return_value.url_for.return_value = 'https://bucket/import_cache/file'
+        requests_get_mock.return_value = Mock(ok=True, raw=io.BytesIO(b'{"id": 1}\n{"id": 2}\n'))
+
+        stream = JSONLinesStream('import_cache/file')
+
+        self.assertEqual(list(stream), [{"id": 1}, {"id": 2}])
+        get_export_service_mock.return_value.url_for.assert_called_once_with('import_cache/file')
+        requests_get_mock.assert_called_once_with(
+            'https://bucket/import_cache/file', headers={'User-Agent': 'OCL'}, stream=True, timeout=30)
+
+    @patch('core.importers.input_parsers.requests.get')
+    def test_iter_url_failure(self, requests_get_mock):
+        requests_get_mock.return_value = Mock(ok=False, status_code=404)
+
+        with self.assertRaises(ImportError):
+            list(JSONLinesStream('https://fetch/file.json'))
+
+
 class ImportContentParserTest(OCLTestCase):
 
     def test_parse_content(self):
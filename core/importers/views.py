@@ -26,7 +26,7 @@ from core.common.tasks import bulk_import_new
 from core.common.swagger_parameters import update_if_exists_param, task_param, result_param, username_param, \
     file_upload_param, file_url_param, parallel_threads_param, verbose_param
 from core.common.utils import queue_bulk_import, is_csv_file, get_truthy_values, get_queue_task_names, \
-    get_export_service
+    get_export_service, is_zip_file
 from core.importers.constants import ALREADY_QUEUED, INVALID_UPDATE_IF_EXISTS, NO_CONTENT_TO_IMPORT
 from core.importers.importer import Importer
 from core.importers.input_parsers import ImportContentParser
@@ -41,7 +41,29 @@ def csv_file_data_to_input_list(file_content):
     return [row for row in csv.DictReader(io.StringIO(file_content))]  # pylint: disable=unnecessary-comprehension
 
 
-def import_response(request, import_queue, data, threads=None, inline=False, deprecated=False):  # pylint: disable=too-many-arguments
+def store_import_file(file):
+    """Saves an import file (upload or text stream), returns the path/import cache key the import tasks read it from"""
+    timestamp = datetime.now()
+    key = f'import_upload_{timestamp.strftime("%Y%m%d_%H%M%S")}_{str(uuid.uuid4())[:8]}'
+    from core import settings
+    if settings.DEBUG:
+        dir_url = os.path.join(settings.MEDIA_ROOT, 'import_uploads')
+        os.makedirs(dir_url, exist_ok=True)
+        file_url = os.path.join(dir_url, key)
+        with open(file_url, 'wb') as f:
+            shutil.copyfileobj(file, f)
+        return file_url
+    if not key.startswith(Importer.IMPORT_CACHE):
+        key = Importer.IMPORT_CACHE + key
+    upload_service = get_export_service()
+    upload_service.upload(key, file,
+                          metadata={'ContentType': 'application/octet-stream'},
+                          headers={'content-type': 'application/octet-stream'})
+    return key
+
+
+def import_response(  # pylint: disable=too-many-arguments
+        request, import_queue, data, threads=None, inline=False, deprecated=False, stream=False):
     if not data:
         return Response({'exception': NO_CONTENT_TO_IMPORT}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -58,7 +80,7 @@ def import_response(request, import_queue, data, threads=None, inline=False, dep
     data = data.decode('utf-8') if isinstance(data, bytes) else data
     task = None
     try:
-        task = queue_bulk_import(data, import_queue, username, update_if_exists, threads, inline)
+        task = queue_bulk_import(data, import_queue, username, update_if_exists, threads, inline, stream=stream)
         task.refresh_from_db()
     except AlreadyQueued:
         if task:
@@ -166,6 +188,8 @@ class BulkImportParallelInlineView(APIView):
         is_upload = 'file' in request.data
         is_file_url = 'file_url' in request.data
         is_data = 'data' in request.data
+        if get(request.data, 'stream') in TRUTHY and (is_upload or is_file_url):
+            return self.stream_import(request, import_queue, parallel_threads, is_upload)
         parser = ImportContentParser(
             file=get(request.data, 'file') if is_upload else None,
             file_url=get(request.data, 'file_url') if is_file_url else None,
@@ -183,6 +207,17 @@ class BulkImportParallelInlineView(APIView):
 
         return import_response(self.request, import_queue, parser.content, parallel_threads, True, self.deprecated)
 
+    def stream_import(self, request, import_queue, parallel_threads, is_upload):
+        """JSON lines file (upload or URL) stored as it is and read lazily by the import task (see JSONLinesStream)"""
+        file = get(request.data, 'file') if is_upload else None
+        name = get(file, 'name') if is_upload else get(request.data, 'file_url')
+        if is_zip_file(name=name) or is_csv_file(name=name):
+            return Response(
+                {'exception': 'Only JSON lines files can be streamed.'}, status=status.HTTP_400_BAD_REQUEST)
+        path = store_import_file(file) if is_upload else get(request.data, 'file_url')
+        return import_response(
+            self.request, import_queue, path, parallel_threads, True, self.deprecated, stream=True)
+
 
 class ImportView(BulkImportParallelInlineView, ImportRetrieveDestroyMixin):
     deprecated = False
@@ -200,23 +235,7 @@ class ImportView(BulkImportParallelInlineView, ImportRetrieveDestroyMixin):
                 else:
                     file = get(request.data, 'file')  # importing by uploading a file with multipart/form-data
                 if file:
-                    timestamp = datetime.now()
-                    key = f'import_upload_{timestamp.strftime("%Y%m%d_%H%M%S")}_{str(uuid.uuid4())[:8]}'
-                    from core import settings
-                    if settings.DEBUG:
-                        dir_url = os.path.join(settings.MEDIA_ROOT, 'import_uploads')
-                        os.makedirs(dir_url, exist_ok=True)
-                        file_url = os.path.join(dir_url, key)
-                        with open(file_url, 'wb') as f:
-                            shutil.copyfileobj(file, f)
-                    else:
-                        if not key.startswith(Importer.IMPORT_CACHE):
-                            key = Importer.IMPORT_CACHE + key
-                        upload_service = get_export_service()
-                        upload_service.upload(key, file,
-                                              metadata={'ContentType': 'application/octet-stream'},
-                                              headers={'content-type': 'application/octet-stream'})
-                        file_url = key
+                    file_url = store_import_file(file)
 
             task = get_queue_task_names(import_queue, self.request.user.username)
             new_task = bulk_import_new.apply_async(
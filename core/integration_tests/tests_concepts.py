@@ -1,6 +1,7 @@
 from unittest.mock import patch
 
 from celery.states import PENDING
+from django.test import override_settings
 from mock import ANY
 
 from core.bundles.models import Bundle
@@ -61,6 +62,41 @@ class ConceptRetrieveUpdateDestroyViewTest(OCLAPITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
 
+    def test_get_not_modified(self):
+        concept = ConceptFactory(parent=self.source)
+
+        response = self.client.get(concept.uri)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        self.assertTrue(etag)
+        self.assertTrue(last_modified)
+
+        response = self.client.get(concept.uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(concept.uri, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(concept.uri + '?includeMappings=true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(concept.uri + '?verbose=true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.put(
+            concept.uri, {**self.concept_payload, 'id': concept.mnemonic, 'datatype': 'Text'},
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(concept.uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_post_201(self):
         concepts_url = f"/orgs/{self.organization.mnemonic}/sources/{self.source.mnemonic}/concepts/"
 
@@ -2742,6 +2778,105 @@ class ConceptListViewTest(OCLAPITestCase):
         self.token = self.user.get_token()
         self.random_user = UserProfileFactory()
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_get_cached_response(self):
+        response = self.client.get(self.source.concepts_url + '?brief=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+        num_found = response['num_found']
+
+        response = self.client.get(self.source.concepts_url + '?brief=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Status'], 'ocl-api; hit')
+        self.assertEqual(response['num_found'], num_found)
+
+        response = self.client.get(self.source.concepts_url + '?brief=true&q=MyConcept1')
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+
+        self.concept1.get_latest_version().save()
+
+        response = self.client.get(self.source.concepts_url + '?brief=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_get_cached_facets_response(self):
+        response = self.client.get(
+            self.source.concepts_url + '?facetsOnly=true', HTTP_AUTHORIZATION='Token ' + self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+        self.assertIn('updatedBy', response.data['facets']['fields'])
+
+        response = self.client.get(self.source.concepts_url + '?facetsOnly=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Status'], 'ocl-api; fwd=miss')
+        self.assertNotIn('updatedBy', response.data['facets']['fields'])
+
+        response = self.client.get(
+            self.source.concepts_url + '?facetsOnly=true', HTTP_AUTHORIZATION='Token ' + self.token)
+        self.assertEqual(response['Cache-Status'], 'ocl-api; hit')
+        self.assertIn('updatedBy', response.data['facets']['fields'])
+
+    def test_get_not_modified(self):
+        for concept in self.source.concepts_set.all():
+            concept.set_checksums()
+
+        response = self.client.get(self.source.concepts_url + '?brief=true')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag)
+
+        response = self.client.get(self.source.concepts_url + '?brief=true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(self.source.concepts_url + '?brief=true&limit=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(
+            self.source.concepts_url + '?brief=true&includeMappings=true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+        concept = self.concept1.get_latest_version()
+        concept.extras = {'foo': 'foobar'}
+        concept.save()
+        concept.set_checksums()
+
+        response = self.client.get(self.source.concepts_url + '?brief=true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_not_modified_changes_with_source(self):
+        for concept in self.source.concepts_set.all():
+            concept.set_checksums()
+
+        response = self.client.get(self.source.concepts_url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(self.source.concepts_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        OrganizationSourceFactory(
+            version='v2', mnemonic='MySource', organization=self.source.parent, released=True)
+
+        response = self.client.get(self.source.concepts_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+
+        self.source.properties = [{'code': 'foo', 'type': 'string'}]
+        self.source.save()
+
+        response = self.client.get(self.source.concepts_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.get('/concepts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
     def test_search(self):  # pylint: disable=too-many-statements
         ConceptDocument().update(self.source.concepts_set.all())
 
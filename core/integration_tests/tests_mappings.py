@@ -1,7 +1,11 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework.exceptions import ErrorDetail
 
 from core.collections.tests.factories import OrganizationCollectionFactory, ExpansionFactory
 from core.common.tests import OCLAPITestCase
+from core.concepts.models import Concept
 from core.concepts.tests.factories import ConceptFactory, ConceptNameFactory
 from core.mappings.constants import SAME_AS
 from core.mappings.models import Mapping
@@ -632,6 +636,24 @@ class MappingRetrieveUpdateDestroyViewTest(OCLAPITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['uuid'], str(self.mapping.id))
 
+    def test_get_not_modified_changes_with_concepts(self):
+        self.mapping.set_checksums()
+        for url in [self.mapping.uri, self.source.mappings_url]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            # e.g. its name changed, which is in from_concept_name_resolved
+            Concept.objects.filter(id=self.mapping.from_concept_id).update(
+                updated_at=timezone.now() + timedelta(seconds=1))
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
     def test_get_404(self):
         response = self.client.get(
             self.source.mappings_url + '123/', format='json'
@@ -1317,6 +1317,118 @@ class SourceVersionExportViewTest(OCLAPITestCase):
         s3_remove_mock.assert_not_called()
 
 
+class SourceVersionExportDeltaViewTest(OCLAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = UserProfileFactory(username='username')
+        self.token = self.user.get_token()
+        self.source = UserSourceFactory(mnemonic='source1', user=self.user)
+        self.source_v1 = UserSourceFactory(version='v1', mnemonic='source1', user=self.user, released=True)
+        self.source_v2 = UserSourceFactory(version='v2', mnemonic='source1', user=self.user, released=True)
+
+    def test_get_405_head(self):
+        response = self.client.get(
+            self.source.uri + 'HEAD/export/delta/',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_get_404_no_base(self):
+        response = self.client.get(
+            self.source_v1.uri + 'export/delta/',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_400_newer_base(self):
+        response = self.client.get(
+            self.source_v1.uri + 'export/delta/?base=v2',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'detail': 'Base version must be older than the version.'})
+
+    @patch('core.sources.views.export_source_delta')
+    def test_post_400_newer_base(self, export_source_delta_mock):
+        response = self.client.post(
+            self.source_v1.uri + 'export/delta/?base=v2',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        export_source_delta_mock.apply_async.assert_not_called()
+
+    @patch('core.services.storages.cloud.aws.S3.url_for')
+    @patch('core.services.storages.cloud.aws.S3.exists')
+    def test_get(self, s3_exists_mock, s3_url_for_mock):
+        s3_exists_mock.return_value = False
+
+        response = self.client.get(
+            self.source_v2.uri + 'export/delta/',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 204)
+        s3_exists_mock.assert_called_once_with("users/username/username_source1_v2/deltas/v1.zip")
+
+        s3_exists_mock.return_value = True
+        s3_url_for_mock.return_value = 'https://signed.example/delta.zip'
+
+        response = self.client.get(
+            self.source_v2.uri + 'export/delta/?base=v1',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://signed.example/delta.zip')
+
+    @patch('core.sources.views.export_source_delta')
+    def test_post_202(self, export_source_delta_mock):
+        response = self.client.post(
+            self.source_v2.uri + 'export/delta/',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 202)
+        export_source_delta_mock.apply_async.assert_called_once_with(
+            (self.source_v2.id, self.source_v1.id), queue='default', task_id=ANY)
+
+    @patch('core.sources.views.export_source_from_deltas')
+    @patch('core.services.storages.cloud.aws.S3.has_path')
+    def test_rebuild(self, s3_has_path_mock, export_source_from_deltas_mock):
+        s3_has_path_mock.return_value = False
+
+        response = self.client.post(
+            self.source_v2.uri + 'export/rebuild/',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+        self.source_v2.update_extras('__export_delta_base', 'v1')
+
+        response = self.client.post(
+            self.source_v2.uri + 'export/rebuild/',
+            HTTP_AUTHORIZATION='Token ' + self.token,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 202)
+        export_source_from_deltas_mock.apply_async.assert_called_once_with(
+            (self.source_v2.id,), queue='default', task_id=ANY)
+
+
 class SourceVersionExternalExportViewTest(OCLAPITestCase):
     def setUp(self):
         super().setUp()
@@ -1934,6 +2046,26 @@ class SourceHierarchyViewTest(OCLAPITestCase):
         self.assertEqual(response.data, 'hierarchy-response')
         hierarchy_mock.assert_called_once_with(offset=100, limit=1000)
 
+    @patch('core.sources.views.build_hierarchy_closure')
+    def test_put_202(self, build_hierarchy_closure_mock):
+        build_hierarchy_closure_mock.__name__ = 'build_hierarchy_closure'
+        source = OrganizationSourceFactory(id=100)
+        user = UserProfileFactory(is_superuser=True, is_staff=True, username='soop')
+
+        response = self.client.put(source.url + 'hierarchy/', HTTP_AUTHORIZATION=f'Token {user.get_token()}')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['name'], 'build_hierarchy_closure')
+        build_hierarchy_closure_mock.apply_async.assert_called_once_with((100,), queue='default', task_id=ANY)
+
+    def test_put_403(self):
+        source = OrganizationSourceFactory()
+        user = UserProfileFactory()
+
+        response = self.client.put(source.url + 'hierarchy/', HTTP_AUTHORIZATION=f'Token {user.get_token()}')
+
+        self.assertEqual(response.status_code, 403)
+
 
 class SourceMappingsIndexViewTest(OCLAPITestCase):
     @patch('core.sources.views.index_source_mappings')
@@ -8,6 +8,11 @@ from core.mappings.models import Mapping
 
 @registry.register_document
 class MappingDocument(Document):
+    # brief is the MappingMinimalSerializer representation, brief lists are served from it without the db.
+    # Bump the version whenever that representation changes, older documents are served from the db until reindexed.
+    # Mappings without a to_concept_name of their own have no brief, their target concept's name is read from the db.
+    BRIEF_FIELDS_VERSION = 2
+
     class Index:
         name = 'mappings'
         settings = {'number_of_shards': 1, 'number_of_replicas': 0}
@@ -47,6 +52,24 @@ class MappingDocument(Document):
     id = fields.TextField(attr='mnemonic')
     extras = fields.ObjectField(dynamic=True)
     created_by = fields.KeywordField(attr='created_by.username')
+    brief = fields.ObjectField(enabled=False)
+    brief_fields_version = fields.IntegerField()
+
+    @staticmethod
+    def get_brief_serializer():
+        from core.mappings.serializers import MappingMinimalSerializer
+        return MappingMinimalSerializer
+
+    def prepare_brief(self, instance):
+        if not instance.to_concept_name and instance.to_concept_id:
+            # cascade_target_concept_name would be the target concept's, which changes without this mapping
+            return None
+        if not instance.checksums or not instance.has_all_checksums():
+            instance.checksums = instance.get_all_checksums()  # only for the document, indexing must not write
+        return dict(self.get_brief_serializer()(instance).data)
+
+    def prepare_brief_fields_version(self, _):
+        return self.BRIEF_FIELDS_VERSION
 
     @staticmethod
     def get_match_phrase_attrs():
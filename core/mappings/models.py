@@ -330,24 +330,29 @@ class Mapping(MappingValidationMixin, SourceChildMixin, VersionedModel):
 
         concept_cache = None if cache is None else cache.setdefault('concept_by_expr', {})
         source_cache = None if cache is None else cache.setdefault('source_resolve_ref', {})
+        lookup_stats = None if cache is None else cache.setdefault(
+            'lookup_stats', {'hits': 0, 'misses': 0, 'prefetched': 0})
 
         def get_concept(expr):
             if expr and not expr.endswith('/'):
                 expr = expr + '/'
-            if concept_cache is not None and expr in concept_cache:
-                return concept_cache[expr]
+            if concept_cache is not None:
+                lookup_stats['hits' if expr in concept_cache else 'misses'] += 1
+                if expr in concept_cache:
+                    return concept_cache[expr]
             concept = Concept.objects.filter(
                 uri=expr).first() or Concept.objects.filter(uri=encode_string(expr, safe='/')).first()
 
-            result = concept or {
-                'mnemonic': expr.replace(to_parent_uri(expr), '').replace('concepts/', '').split('/')[0]}
+            result = concept or self.get_unresolved_concept(expr)
             if concept_cache is not None:
                 concept_cache[expr] = result
             return result
 
         def get_source(url):
-            if source_cache is not None and url in source_cache:
-                return source_cache[url]
+            if source_cache is not None:
+                lookup_stats['hits' if url in source_cache else 'misses'] += 1
+                if url in source_cache:
+                    return source_cache[url]
             source, _ = Source.resolve_reference_expression(url, None, HEAD)
             if source.id:
                 result = (source, source.versioned_object_url or source.resolution_url or url)
@@ -399,6 +404,10 @@ class Mapping(MappingValidationMixin, SourceChildMixin, VersionedModel):
             self.from_source_version = self.from_source_version or from_source_version
             self.from_source_url = from_source_url
 
+    @staticmethod
+    def get_unresolved_concept(expr):
+        return {'mnemonic': expr.replace(to_parent_uri(expr), '').replace('concepts/', '').split('/')[0]}
+
     def is_existing_in_parent(self):
         return self.parent.mappings_set.filter(mnemonic__exact=self.mnemonic).exists()
 
@@ -26,6 +26,22 @@ class MappingTest(OCLTestCase):
     def test_get_search_document(self):
         self.assertEqual(Mapping.get_search_document(), MappingDocument)
 
+    def test_document_prepare_brief(self):
+        to_concept = ConceptFactory()
+        mapping = MappingFactory(to_concept=to_concept)
+        Mapping.objects.filter(id=mapping.id).update(checksums={}, to_concept_name=None)
+        mapping.refresh_from_db()
+
+        self.assertIsNone(MappingDocument().prepare_brief(mapping))
+
+        mapping.to_concept_name = 'foobar'
+        brief = MappingDocument().prepare_brief(mapping)
+
+        self.assertEqual(brief['cascade_target_concept_name'], 'foobar')
+        self.assertEqual(brief['checksums'], mapping.get_all_checksums())
+        mapping.refresh_from_db()
+        self.assertEqual(mapping.checksums, {})
+
     def test_source(self):
         self.assertIsNone(Mapping().source)
         self.assertEqual(Mapping(parent=Source(mnemonic='source')).source, 'source')
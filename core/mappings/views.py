@@ -10,7 +10,7 @@ from rest_framework.response import Response
 
 from core.common.constants import HEAD, ACCESS_TYPE_NONE, LIMIT_PARAM, LIST_DEFAULT_LIMIT
 from core.common.exceptions import Http400
-from core.common.mixins import ListWithHeadersMixin, ConceptDictionaryMixin
+from core.common.mixins import ListWithHeadersMixin, ConceptDictionaryMixin, ConditionalRetrieveMixin
 from core.common.swagger_parameters import (
     q_param, limit_param, sort_desc_param, page_param, sort_asc_param, verbose_param,
     include_facets_header, updated_since_param, include_retired_param,
@@ -169,7 +169,9 @@ class MappingListView(MappingBaseView, ListWithHeadersMixin, CreateModelMixin):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class MappingRetrieveUpdateDestroyView(MappingBaseView, RetrieveAPIView, UpdateAPIView, DestroyAPIView):
+class MappingRetrieveUpdateDestroyView(
+    MappingBaseView, ConditionalRetrieveMixin, RetrieveAPIView, UpdateAPIView, DestroyAPIView
+):
     serializer_class = MappingDetailSerializer
 
     def is_container_version_specified(self):
@@ -327,7 +329,7 @@ class MappingVersionsView(MappingBaseView, ConceptDictionaryMixin, ListWithHeade
         return self.list(request, *args, **kwargs)
 
 
-class MappingVersionRetrieveView(MappingBaseView, RetrieveAPIView, DestroyAPIView):
+class MappingVersionRetrieveView(MappingBaseView, ConditionalRetrieveMixin, RetrieveAPIView, DestroyAPIView):
     serializer_class = MappingVersionDetailSerializer
 
     def get_permissions(self):
@@ -1,5 +1,12 @@
+import io
+import json
+from datetime import date, datetime
+
 from django.db import connection
 
+# text format of COPY: backslash escapes for the characters that delimit columns and rows
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
 
 class PostgresQL:
     @staticmethod
@@ -29,3 +36,51 @@ class PostgresQL:
         with connection.cursor() as cursor:
             cursor.execute(f"SELECT last_value from {seq_name};")
             return cursor.fetchone()[0]
+
+    @staticmethod
+    def next_values(table, count, column='id'):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s);", [table, column, count])
+            return sorted(row[0] for row in cursor.fetchall())
+
+    @staticmethod
+    def to_copy_value(value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        return str(value).translate(COPY_ESCAPES)
+
+    @staticmethod
+    def copy_rows(table, columns, rows):
+        """Loads rows (iterables of python values, in the order of columns) with COPY FROM STDIN"""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(PostgresQL.to_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN;", buffer)
+
+    @staticmethod
+    def copy_instances(model, instances):
+        """
+        COPY counterpart of model.objects.bulk_create(instances), for models without multi-table inheritance.
+        Primary keys are only written if the instances have them, signals are not sent.
+        """
+        if not instances:
+            return
+        fields = [
+            field for field in model._meta.concrete_fields  # pylint: disable=protected-access
+            if not field.primary_key or instances[0].pk is not None
+        ]
+        PostgresQL.copy_rows(
+            model._meta.db_table,  # pylint: disable=protected-access
+            [connection.ops.quote_name(field.column) for field in fields],
+            ([field.get_prep_value(field.pre_save(instance, True)) for field in fields] for instance in instances)
+        )
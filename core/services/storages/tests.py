@@ -70,3 +70,43 @@ class PostgresQLTest(OCLTestCase):
 
         db_connection_mock.cursor.assert_called_once()
         cursor_context_mock.execute.assert_called_once_with("SELECT last_value from foobar_seq;")
+
+    @patch('core.services.storages.postgres.connection')
+    def test_next_values(self, db_connection_mock):
+        cursor_context_mock = Mock(execute=Mock(), fetchall=Mock(return_value=[(12,), (10,), (11,)]))
+        cursor_mock = Mock()
+        cursor_mock.__enter__ = Mock(return_value=cursor_context_mock)
+        cursor_mock.__exit__ = Mock(return_value=None)
+        db_connection_mock.cursor = Mock(return_value=cursor_mock)
+
+        self.assertEqual(PostgresQL.next_values('concepts', 3), [10, 11, 12])
+
+        db_connection_mock.cursor.assert_called_once()
+        cursor_context_mock.execute.assert_called_once_with(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s);", ['concepts', 'id', 3])
+
+    def test_to_copy_value(self):
+        self.assertEqual(PostgresQL.to_copy_value(None), '\\N')
+        self.assertEqual(PostgresQL.to_copy_value(True), 't')
+        self.assertEqual(PostgresQL.to_copy_value(False), 'f')
+        self.assertEqual(PostgresQL.to_copy_value(10), '10')
+        self.assertEqual(PostgresQL.to_copy_value('a\tb\nc\\d\re'), 'a\\tb\\nc\\\\d\\re')
+        self.assertEqual(PostgresQL.to_copy_value({'foo': 'a\tb'}), '{"foo": "a\\\\tb"}')
+        self.assertEqual(PostgresQL.to_copy_value(['a']), '["a"]')
+
+    @patch('core.services.storages.postgres.connection')
+    def test_copy_rows(self, db_connection_mock):
+        cursor_context_mock = Mock(copy_expert=Mock())
+        cursor_mock = Mock()
+        cursor_mock.__enter__ = Mock(return_value=cursor_context_mock)
+        cursor_mock.__exit__ = Mock(return_value=None)
+        db_connection_mock.cursor = Mock(return_value=cursor_mock)
+
+        self.assertEqual(PostgresQL.copy_rows('concepts', ['id', 'mnemonic', 'retired'], [
+            [1, 'A\t1', False], [2, None, True]]), None)
+
+        db_connection_mock.cursor.assert_called_once()
+        cursor_context_mock.copy_expert.assert_called_once()
+        sql, buffer = cursor_context_mock.copy_expert.call_args[0]
+        self.assertEqual(sql, 'COPY concepts (id, mnemonic, retired) FROM STDIN;')
+        self.assertEqual(buffer.getvalue(), '1\tA\\t1\tf\n2\t\\N\tt\n')
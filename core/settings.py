@@ -127,7 +127,7 @@ INSTALLED_APPS = [
     'core.orgs',
     'core.sources.apps.SourceConfig',
     'core.collections',
-    'core.concepts',
+    'core.concepts.apps.ConceptConfig',
     'core.mappings',
     'core.importers',
     'core.pins',
@@ -268,6 +268,21 @@ ES_VERIFY_CERTS = os.environ.get('ES_VERIFY_CERTS', str(ES_SCHEME == 'https'))
 ES_USER = os.environ.get('ES_USER', None)
 ES_PASSWORD = os.environ.get('ES_PASSWORD', None)
 ES_ENABLE_SNIFFING = os.environ.get('ES_ENABLE_SNIFFING', False) in ['TRUE', True]
+# totals of searches are exact up to this many hits and a lower bound past it, 0 for always exact
+ES_TRACK_TOTAL_HITS = int(os.environ.get('ES_TRACK_TOTAL_HITS', 0))
+# brief concept/mapping lists are served from the representation stored in their documents, without the db.
+# Off by default: indexes created before need the brief mapping first (manage.py put_brief_mappings), and documents
+# are served from the db until reindexed
+ES_BRIEF_FROM_SOURCE = os.environ.get('ES_BRIEF_FROM_SOURCE', 'false').lower() == 'true'
+# full reindexing: batches prepared (documents with embeddings) at a time, and prepared batches waiting for ES at most
+INDEX_PIPELINE_PREPARE_WORKERS = int(os.environ.get('INDEX_PIPELINE_PREPARE_WORKERS', 4))
+INDEX_PIPELINE_MAX_IN_FLIGHT = int(os.environ.get('INDEX_PIPELINE_MAX_IN_FLIGHT', 4))
+# searches per multi search request, e.g. of the rows of a $match request
+ES_MULTI_SEARCH_CHUNK_SIZE = int(os.environ.get('ES_MULTI_SEARCH_CHUNK_SIZE', 100))
+# rows of a $match request whose hits are scored/reranked concurrently, 1 for one after the other
+MATCH_CONCURRENCY = int(os.environ.get('MATCH_CONCURRENCY', 1))
+# seconds concept/mapping list, search and facets responses are cached for, 0 to not cache
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60 * 60 * 24))
 http_auth = None
 if ES_USER and ES_PASSWORD:
     http_auth = (ES_USER, ES_PASSWORD)
@@ -391,6 +406,12 @@ AZURE_STORAGE_CONNECTION_STRING = os.environ.get('AZURE_STORAGE_CONNECTION_STRIN
 
 # Repo Export Upload/download
 EXPORT_SERVICE = os.environ.get('EXPORT_SERVICE', 'core.services.storages.cloud.aws.S3')
+# Number of processes serializing concept/mapping batches of an export, 1 serializes inline
+EXPORT_PARALLEL_PROCESSES = int(os.environ.get('EXPORT_PARALLEL_PROCESSES', 1))
+# Export released source versions as deltas from the previous released version instead of full exports
+EXPORT_SOURCE_DELTAS = os.environ.get('EXPORT_SOURCE_DELTAS', 'false').lower() == 'true'
+# New concepts/mappings of a bulk import are created with bulk_create in chunks of this many lines, 0 disables it
+BULK_IMPORT_CREATE_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_CREATE_BATCH_SIZE', 0))
 
 # Highlighted events from User for Guest Users
 HIGHLIGHTED_EVENTS_FROM_USERNAME = os.environ.get('HIGHLIGHTED_EVENTS_FROM_USERNAME', 'ocladmin')
@@ -670,3 +691,6 @@ SERVICE_NAME = os.environ.get('SERVICE_NAME', 'oclapi2')
 DEFAULT_LEXICAL_VARIANTS_REPO = os.environ.get(
     'DEFAULT_LEXICAL_VARIANTS_REPO', '/orgs/OCL/sources/lexical-variants-en/')
 LEXICAL_VARIANTS_CACHE_TIMEOUT = int(os.environ.get('LEXICAL_VARIANTS_CACHE_TIMEOUT', 60 * 60 * 24 * 4))
+# seconds embeddings of $match/semantic search terms are cached for in redis, and how many each process keeps in memory
+EMBEDDINGS_CACHE_TIMEOUT = int(os.environ.get('EMBEDDINGS_CACHE_TIMEOUT', 60 * 60 * 24 * 30))
+EMBEDDINGS_LOCAL_CACHE_SIZE = int(os.environ.get('EMBEDDINGS_LOCAL_CACHE_SIZE', 10000))
@@ -13,6 +13,7 @@ from pydash import get, compact
 
 from core.common.checksums import ChecksumChangelog
 from core.common.constants import HEAD
+from core.common.m2m import M2MWriter
 from core.common.models import ConceptContainerModel
 from core.common.tasks import update_mappings_source, index_source_concepts, index_source_mappings, \
     resolve_url_registry_entries
@@ -383,6 +384,7 @@ class Source(DirtyFieldsMixin, ConceptContainerModel):
         return self.concepts.filter(parent_concepts__isnull=True, id=F('versioned_object_id'))
 
     def hierarchy(self, offset=0, limit=100):
+        from core.concepts.models import ConceptHierarchyClosure
         from core.concepts.serializers import ConceptHierarchySerializer
         hierarchy_root = None
         if offset == 0:
@@ -398,12 +400,17 @@ class Source(DirtyFieldsMixin, ConceptContainerModel):
             adjusted_limit -= 1
         parent_less_children = parent_less_children.order_by('mnemonic')[offset:adjusted_limit+offset]
 
+        parent_less_children = list(parent_less_children)
+        concepts = [*parent_less_children, hierarchy_root] if hierarchy_root else parent_less_children
+        context = {'children_urls': ConceptHierarchyClosure.get_children_urls(
+            [concept.versioned_object_id for concept in concepts if concept.has_hierarchy_closure])}
+
         children = []
-        if parent_less_children.exists():
-            children = ConceptHierarchySerializer(parent_less_children, many=True).data
+        if parent_less_children:
+            children = ConceptHierarchySerializer(parent_less_children, many=True, context=context).data
 
         if hierarchy_root:
-            children.append({**ConceptHierarchySerializer(hierarchy_root).data, 'root': True})
+            children.append({**ConceptHierarchySerializer(hierarchy_root, context=context).data, 'root': True})
 
         return {
             'id': self.mnemonic,
@@ -462,24 +469,19 @@ class Source(DirtyFieldsMixin, ConceptContainerModel):
     def seed_concepts(self, index=True):
         head = self.head
         if head:
-            through_model = Concept.sources.through
-            through_model.objects.filter(source_id=self.id).delete()
-            concept_ids = list(head.concepts.filter(is_latest_version=True).values_list('id', flat=True))
-            through_objects = [through_model(source_id=self.id, concept_id=cid) for cid in concept_ids]
-            through_model.objects.bulk_create(through_objects, batch_size=5000)
+            writer = M2MWriter(self.concepts)
+            writer.clear()
+            writer.add(head.concepts.filter(is_latest_version=True))
             if index:
                 from core.concepts.documents import ConceptDocument
                 self.batch_index(self.concepts, ConceptDocument)
 
     def seed_mappings(self, index=True):
-        from core.mappings.models import Mapping
         head = self.head
         if head:
-            through_model = Mapping.sources.through
-            through_model.objects.filter(source_id=self.id).delete()
-            mapping_ids = list(head.mappings.filter(is_latest_version=True).values_list('id', flat=True))
-            through_objects = [through_model(source_id=self.id, mapping_id=mid) for mid in mapping_ids]
-            through_model.objects.bulk_create(through_objects, batch_size=5000)
+            writer = M2MWriter(self.mappings)
+            writer.clear()
+            writer.add(head.mappings.filter(is_latest_version=True))
             if index:
                 from core.mappings.documents import MappingDocument
                 self.batch_index(self.mappings, MappingDocument)
@@ -1048,6 +1050,37 @@ class Source(DirtyFieldsMixin, ConceptContainerModel):
             'mappings': mappings_diff.result
         }
 
+    @staticmethod
+    def delta(version1, version2):
+        """
+        version1 is the base (older) version
+        version2 is the newer version
+        Returns ChecksumDiff.get_delta of the active concepts and mappings, those of a full export
+        """
+        from core.common.checksums import ChecksumDiff
+        fields = ('mnemonic', 'checksums', 'retired')
+        concepts_diff = ChecksumDiff(
+            resources1=version1.get_concepts_queryset().filter(is_active=True).only(*fields),
+            resources2=version2.get_concepts_queryset().filter(is_active=True).only(*fields),
+        )
+        mappings_diff = ChecksumDiff(
+            resources1=version1.get_mappings_queryset().filter(is_active=True).only(*fields),
+            resources2=version2.get_mappings_queryset().filter(is_active=True).only(*fields),
+        )
+        return {
+            'concepts': concepts_diff.get_delta(),
+            'mappings': mappings_diff.get_delta()
+        }
+
+    def get_export_delta_base_version(self):
+        return self.released_versions.exclude(id=self.id).filter(
+            created_at__lt=self.created_at).order_by('-created_at').first()
+
+    @property
+    def export_delta_base_version(self):
+        base_version = get(self.extras, '__export_delta_base')
+        return self.versions.filter(version=base_version).first() if base_version else None
+
     @staticmethod
     def changelog(version1, version2, verbosity=0):
         """
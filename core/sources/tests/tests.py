@@ -356,6 +356,26 @@ class SourceTest(OCLTestCase):
         self.new_source = OrganizationSourceFactory.build(organization=None)
         self.user = UserProfileFactory()
 
+    def test_delta_leaves_out_inactive_resources(self):
+        source = OrganizationSourceFactory()
+        concept1 = ConceptFactory(parent=source)
+        concept2 = ConceptFactory(parent=source)
+        inactive_concept = ConceptFactory(parent=source, is_active=False)
+        version1 = OrganizationSourceFactory(
+            mnemonic=source.mnemonic, organization=source.organization, version='v1')
+        version2 = OrganizationSourceFactory(
+            mnemonic=source.mnemonic, organization=source.organization, version='v2')
+        for concept in [concept1, concept2, inactive_concept]:
+            concept.set_checksums()
+        version1.concepts.add(concept1)
+        version2.concepts.add(concept1, concept2, inactive_concept)
+
+        delta = Source.delta(version1, version2)
+
+        self.assertEqual(delta['concepts']['new'], [concept2.id])
+        self.assertEqual(delta['concepts']['changed'], [])
+        self.assertEqual(delta['concepts']['removed'], [])
+
     def test_public_can_view(self):
         self.assertFalse(Source(public_access='none').public_can_view)
         self.assertFalse(Source(public_access='foobar').public_can_view)
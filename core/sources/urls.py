@@ -114,6 +114,14 @@ urlpatterns = [
         '<str:source>/<str:version>/export/',
         views.SourceVersionExportView.as_view(), name='sourceversion-export'
     ),
+    path(
+        '<str:source>/<str:version>/export/delta/',
+        views.SourceVersionExportDeltaView.as_view(), name='sourceversion-export-delta'
+    ),
+    path(
+        '<str:source>/<str:version>/export/rebuild/',
+        views.SourceVersionExportRebuildView.as_view(), name='sourceversion-export-rebuild'
+    ),
     path(
         '<str:source>/<str:version>/export/<str:external_export_key>/',
         views.SourceVersionExternalExportView.as_view(), name='sourceversion-external-export'
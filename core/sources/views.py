@@ -5,12 +5,13 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.http import Http404
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, redirect
 from drf_yasg.utils import swagger_auto_schema
 from pydash import get
 from rest_framework import status
 from rest_framework.generics import (
     RetrieveAPIView, ListAPIView, UpdateAPIView, CreateAPIView)
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
@@ -19,16 +20,17 @@ from core.client_configs.views import ResourceClientConfigsView
 from core.common.constants import HEAD, RELEASED_PARAM, PROCESSING_PARAM
 from core.common.exceptions import Http405, Http400
 from core.common.mixins import ListWithHeadersMixin, ConceptDictionaryCreateMixin, ConceptDictionaryUpdateMixin, \
-    ConceptContainerExportMixin, ConceptContainerProcessingMixin
+    ConceptContainerExportMixin, ConceptContainerProcessingMixin, ConditionalRetrieveMixin
 from core.common.permissions import CanViewConceptDictionary, CanEditConceptDictionary, HasAccessToVersionedObject, \
     CanViewConceptDictionaryVersion
 from core.common.swagger_parameters import q_param, limit_param, sort_desc_param, sort_asc_param, \
     page_param, verbose_param, include_retired_param, updated_since_param, include_facets_header, compress_header, \
     canonical_url_param, all_versions_param
 from core.common.tasks import export_source, index_source_concepts, index_source_mappings, delete_source, \
-    generate_source_resources_checksums, source_version_compare
+    generate_source_resources_checksums, source_version_compare, export_source_delta, export_source_from_deltas, \
+    build_hierarchy_closure
 from core.common.utils import parse_boolean_query_param, compact_dict_by_values, to_parent_uri, decode_string, \
-    get_truthy_values
+    get_truthy_values, get_export_service
 from core.common.views import BaseAPIView, BaseLogoView, ConceptContainerExtraRetrieveUpdateDestroyView
 from core.repos.mixins import RepoExternalExportMixin
 from core.repos.serializers import RepoExternalExportSerializer
@@ -176,7 +178,7 @@ class SourceLogoView(SourceBaseView, BaseLogoView):
 
 
 class SourceRetrieveUpdateDestroyView(
-    SourceBaseView, ConceptDictionaryUpdateMixin, RetrieveAPIView, UpdateAPIView, TaskMixin
+    SourceBaseView, ConceptDictionaryUpdateMixin, ConditionalRetrieveMixin, RetrieveAPIView, UpdateAPIView, TaskMixin
 ):
     serializer_class = SourceDetailSerializer
 
@@ -536,11 +538,104 @@ class SourceVersionExportView(ConceptContainerExportMixin, SourceVersionBaseView
             return status.HTTP_409_CONFLICT
 
 
+class SourceVersionExportDeltaBaseView(SourceVersionBaseView):
+    permission_classes = (CanViewConceptDictionary, IsAuthenticated)
+    serializer_class = SourceVersionExportSerializer
+    swagger_schema = None
+
+    def get_object(self, queryset=None):
+        instance = self.get_queryset().first()
+
+        if not instance:
+            raise Http404()
+
+        self.check_object_permissions(self.request, instance)
+
+        return instance
+
+
+class SourceVersionExportDeltaView(SourceVersionExportDeltaBaseView):
+    def get_base_version(self, version):
+        base = self.request.query_params.get('base', None)
+        if base:
+            return version.versions.filter(version=base, is_active=True).exclude(id=version.id).first()
+        return version.export_delta_base_version or version.get_export_delta_base_version()
+
+    def get(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        version = self.get_object()
+        if version.is_head:
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        base_version = self.get_base_version(version)
+        if not base_version:
+            raise Http404()
+        if base_version.created_at >= version.created_at:
+            return Response(
+                {'detail': 'Base version must be older than the version.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if version.is_exporting:
+            return Response(status=status.HTTP_208_ALREADY_REPORTED)
+
+        export_service = get_export_service()
+        export_path = version.get_version_export_delta_path(base_version.version)
+        if export_service.exists(export_path):
+            return redirect(export_service.url_for(export_path))
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def post(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        version = self.get_object()
+        if version.is_head:
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        base_version = self.get_base_version(version)
+        if not base_version:
+            raise Http404()
+        if base_version.created_at >= version.created_at:
+            return Response(
+                {'detail': 'Base version must be older than the version.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if version.is_exporting:
+            return Response(status=status.HTTP_208_ALREADY_REPORTED)
+
+        task = Task.new(queue='default', user=request.user, name=export_source_delta.__name__)
+        try:
+            export_source_delta.apply_async((version.id, base_version.id), queue=task.queue, task_id=task.id)
+            return Response(status=status.HTTP_202_ACCEPTED)
+        except AlreadyQueued:
+            task.delete()
+            return Response(status=status.HTTP_409_CONFLICT)
+
+
+class SourceVersionExportRebuildView(SourceVersionExportDeltaBaseView):
+    def post(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        version = self.get_object()
+        if version.is_head:
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        if version.is_exporting:
+            return Response(status=status.HTTP_208_ALREADY_REPORTED)
+
+        if version.has_export():
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if not version.export_delta_base_version:
+            raise Http404()
+
+        task = Task.new(queue='default', user=request.user, name=export_source_from_deltas.__name__)
+        try:
+            export_source_from_deltas.apply_async((version.id,), queue=task.queue, task_id=task.id)
+            return Response(status=status.HTTP_202_ACCEPTED)
+        except AlreadyQueued:
+            task.delete()
+            return Response(status=status.HTTP_409_CONFLICT)
+
+
 class SourceVersionExternalExportView(RepoExternalExportMixin, SourceVersionBaseView):
     serializer_class = RepoExternalExportSerializer
 
 
-class SourceHierarchyView(SourceBaseView, RetrieveAPIView):
+class SourceHierarchyView(SourceBaseView, RetrieveAPIView, TaskMixin):
     serializer_class = SourceSummaryDetailSerializer
     permission_classes = (CanViewConceptDictionary,)
 
@@ -560,6 +655,14 @@ class SourceHierarchyView(SourceBaseView, RetrieveAPIView):
             offset = int(params.get('offset'))
         return Response(instance.hierarchy(offset=offset, limit=limit))
 
+    def put(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        """Rebuilds the materialized hierarchy of the source, e.g. after hierarchy rows were written directly"""
+        instance = self.get_object()
+        if not instance.has_edit_access(request.user):
+            raise PermissionDenied()
+        result = self.perform_task(build_hierarchy_closure, (instance.id,), is_default_async=True)
+        return result if isinstance(result, Response) else Response(status=status.HTTP_202_ACCEPTED)
+
 
 class SourceSummaryView(SummaryMixin, SourceBaseView, RetrieveAPIView):
     serializer_class = SourceSummaryDetailSerializer
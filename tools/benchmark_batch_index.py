@@ -3,14 +3,17 @@
 Benchmarks full expansion cycle: seed_children(force_reevaluate=True) + indexing.
 
 Compares:
-  [A] Full re-index  — BaseModel.batch_index_full (previous behaviour)
+  [A] Full re-index  — BaseModel.batch_index_full (IndexingPipeline: fetch, prepare and ES bulk stages overlapping)
   [B] Partial update — Expansion.batch_index      (new Painless-script append)
+  [C] Lock-step full re-index — 500-row batches fetched, prepared and sent one after another (previous behaviour)
+
+Each indexing run reports its throughput in docs/sec.
 
 Seeding runs inline (TEST_MODE=True, no celery/Redis required).
 Indexing hits the real ES container.
 
 Usage (inside the api container):
-    python tools/benchmark_batch_index.py <collection_uri> [--runs N]
+    python tools/benchmark_batch_index.py <collection_uri> [--runs N] [--lockstep]
 
 Examples:
     python tools/benchmark_batch_index.py /users/jamlung/collections/gigantic-collection/1/
@@ -31,6 +34,7 @@ from django.conf import settings  # noqa: E402
 
 from core.collections.models import Collection, Expansion  # noqa: E402
 from core.common.models import BaseModel  # noqa: E402
+from core.common.utils import keyset_batches  # noqa: E402
 from core.concepts.documents import ConceptDocument  # noqa: E402
 from core.mappings.documents import MappingDocument  # noqa: E402
 
@@ -92,10 +96,37 @@ def bench_full_index(expansion, run_index):
     )
     mapping_elapsed = time.perf_counter() - t0
 
+    return report_index(expansion, concept_elapsed, mapping_elapsed)
+
+
+def bench_lockstep_index(expansion, run_index):
+    print(f'\n  [C] Lock-step full re-index (run {run_index}) ...')
+
+    def index(queryset, document, prefetch):
+        doc = document()
+        queryset = queryset.prefetch_related(*prefetch).select_related(
+            'parent', 'parent__organization', 'parent__user', 'created_by', 'updated_by')
+        t0 = time.perf_counter()
+        for batch in keyset_batches(queryset, 500):
+            doc.update(batch, parallel=True)
+        return time.perf_counter() - t0
+
+    concept_elapsed = index(expansion.concepts, ConceptDocument, ['sources', 'names', 'descriptions'])
+    mapping_elapsed = index(expansion.mappings, MappingDocument, ['sources'])
+    return report_index(expansion, concept_elapsed, mapping_elapsed)
+
+
+def docs_per_sec(count, elapsed):
+    return count / elapsed if elapsed else 0
+
+
+def report_index(expansion, concept_elapsed, mapping_elapsed):
+    n_concepts = expansion.concepts.count()
+    n_mappings = expansion.mappings.count()
     total = concept_elapsed + mapping_elapsed
-    print(f'    concepts : {concept_elapsed:.3f}s')
-    print(f'    mappings : {mapping_elapsed:.3f}s')
-    print(f'    index total : {total:.3f}s')
+    print(f'    concepts : {concept_elapsed:.3f}s  ({docs_per_sec(n_concepts, concept_elapsed):.0f} docs/sec)')
+    print(f'    mappings : {mapping_elapsed:.3f}s  ({docs_per_sec(n_mappings, mapping_elapsed):.0f} docs/sec)')
+    print(f'    index total : {total:.3f}s  ({docs_per_sec(n_concepts + n_mappings, total):.0f} docs/sec)')
     return total
 
 
@@ -110,21 +141,18 @@ def bench_partial_index(expansion, run_index):
     expansion.batch_index(expansion.mappings, MappingDocument)
     mapping_elapsed = time.perf_counter() - t0
 
-    total = concept_elapsed + mapping_elapsed
-    print(f'    concepts : {concept_elapsed:.3f}s')
-    print(f'    mappings : {mapping_elapsed:.3f}s')
-    print(f'    index total : {total:.3f}s')
-    return total
+    return report_index(expansion, concept_elapsed, mapping_elapsed)
 
 
 def avg(values):
     return sum(values) / len(values) if values else 0
 
 
-def main():
+def main():  # pylint: disable=too-many-locals
     parser = argparse.ArgumentParser(description='Benchmark seed + index for expansion')
     parser.add_argument('collection_uri', help='Collection version URI')
     parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--lockstep', action='store_true', help='Also run [C], the lock-step full re-index')
     args = parser.parse_args()
 
     collection_version = resolve_collection_version(args.collection_uri)
@@ -132,6 +160,7 @@ def main():
 
     results_a = []  # (seed_time, index_time)
     results_b = []
+    results_c = []
 
     for i in range(1, args.runs + 1):
         print(f'\n{"="*60}\n  Run {i} / {args.runs}\n{"="*60}')
@@ -146,6 +175,12 @@ def main():
         results_b.append((seed_b, idx_b))
         exp_b.delete()
 
+        if args.lockstep:
+            exp_c, seed_c, _, _ = seed_expansion(collection_version, f'[C] run {i}')
+            idx_c = bench_lockstep_index(exp_c, i)
+            results_c.append((seed_c, idx_c))
+            exp_c.delete()
+
     print(f'\n{"="*60}\n  SUMMARY  ({n_concepts} concepts, {n_mappings} mappings)\n{"="*60}')
 
     def row(tag, results):
@@ -154,12 +189,14 @@ def main():
         totals = [s + i for s, i in results]
         print(f'  {tag}')
         print(f'    seed  avg: {avg(seeds):.3f}s')
-        print(f'    index avg: {avg(idxs):.3f}s')
+        print(f'    index avg: {avg(idxs):.3f}s  ({docs_per_sec(n_concepts + n_mappings, avg(idxs)):.0f} docs/sec)')
         print(f'    total avg: {avg(totals):.3f}s  '
               f'(min {min(totals):.3f}s  max {max(totals):.3f}s)')
 
     row('[A] Full re-index ', results_a)
     row('[B] Partial update', results_b)
+    if results_c:
+        row('[C] Lock-step     ', results_c)
 
     if results_a and results_b:
         avg_total_a = avg([s + i for s, i in results_a])
@@ -168,6 +205,9 @@ def main():
         avg_idx_b = avg([i for _, i in results_b])
         print(f'\n  Index speedup : {avg_idx_a / avg_idx_b:.1f}x')
         print(f'  Total speedup : {avg_total_a / avg_total_b:.1f}x')
+    if results_a and results_c:
+        print(f'  Pipeline vs lock-step index speedup : '
+              f'{avg([i for _, i in results_c]) / avg([i for _, i in results_a]):.1f}x')
 
 
 if __name__ == '__main__':
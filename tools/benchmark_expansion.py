@@ -10,8 +10,11 @@ Measures wall-clock time and DB query count for:
      refs individually. No DB writes.
   C) On-the-fly path (Path 2, per-repo): user provides specific repo version URIs;
      only refs matching those sources are re-evaluated, others use cached ref.concepts.
+  D) Delta re-evaluation: seed_children(force_reevaluate=True) on an expansion evaluated
+     once already — unchanged refs reuse their stored evaluation and only the rows added or
+     removed are written. Measured with nothing changed and after touching --delta-refs refs.
 
-All writes in paths A are rolled back. Paths B/C are purely read-only.
+All writes in paths A and D are rolled back. Paths B/C are purely read-only.
 
 Usage (inside the api container, or any env with DJANGO_SETTINGS_MODULE set):
     python tools/benchmark_expansion.py <collection_uri> [--repo-version URI] [--runs N]
@@ -21,6 +24,7 @@ Examples:
     python tools/benchmark_expansion.py /orgs/MyOrg/collections/MyCol/HEAD/ --runs 3
     python tools/benchmark_expansion.py /orgs/MyOrg/collections/MyCol/v1.0/ \\
         --repo-version /orgs/MyOrg/sources/MySrc/v2.0/,/orgs/MyOrg/sources/Other/v1.0/
+    python tools/benchmark_expansion.py /orgs/MyOrg/collections/MyCol/v1.0/ --delta --delta-refs 10
 """
 import argparse
 import os
@@ -118,6 +122,46 @@ def bench_existing_expansion(collection_version, run_index):
     return elapsed, n_queries, n_concepts, n_mappings
 
 
+# ---------------------------------------------------------------------------
+# Path D: delta re-evaluation (with rollback)
+# ---------------------------------------------------------------------------
+
+def _timed_seed(expansion, label):
+    with CaptureQueriesContext(connection) as ctx:
+        t0 = time.perf_counter()
+        expansion.seed_children(index=False, force_reevaluate=True)
+        elapsed = time.perf_counter() - t0
+    result = (elapsed, len(ctx.captured_queries), expansion.concepts.count(), expansion.mappings.count())
+    report(label, *result)
+    return result
+
+
+def bench_delta_reevaluation(collection_version, run_index, delta_refs):
+    label = f'[D] Delta re-evaluate (run {run_index})'
+    print(f'\n  Starting {label} ...')
+
+    results = []
+    try:
+        with transaction.atomic():
+            expansion = Expansion(
+                mnemonic=f'__bench_delta_{run_index}__',
+                collection_version=collection_version,
+            )
+            expansion.save()
+            _timed_seed(expansion, f'{label} — first evaluation')
+            results.append(_timed_seed(expansion, f'{label} — nothing changed'))
+            if delta_refs:
+                for reference in collection_version.references.order_by('?')[:delta_refs]:
+                    reference.save()  # bumps updated_at, so its evaluation is stale
+                results.append(_timed_seed(expansion, f'{label} — {delta_refs} ref(s) changed'))
+
+            raise transaction.TransactionManagementError('benchmark rollback')  # always rollback
+    except transaction.TransactionManagementError:
+        pass
+
+    return results
+
+
 # ---------------------------------------------------------------------------
 # Path B: on-the-fly full (Path 1)
 # ---------------------------------------------------------------------------
@@ -247,7 +291,7 @@ def avg(values):
     return sum(values) / len(values) if values else 0
 
 
-def print_summary(results_a, results_b, results_c):
+def print_summary(results_a, results_b, results_c, results_d=None):
     separator('SUMMARY (averages across runs)')
 
     def row(tag, runs):
@@ -262,6 +306,9 @@ def print_summary(results_a, results_b, results_c):
     row('[A] Existing seed_children', results_a)
     row('[B] On-the-fly full       ', results_b)
     row('[C] On-the-fly per-repo   ', results_c)
+    results_d = results_d or []
+    row('[D] Delta, nothing changed', [runs[0] for runs in results_d])
+    row('[D] Delta, refs changed   ', [runs[1] for runs in results_d if len(runs) > 1])
 
     if results_a and results_b:
         speedup = avg([r[0] for r in results_a]) / avg([r[0] for r in results_b])
@@ -269,6 +316,9 @@ def print_summary(results_a, results_b, results_c):
     if results_a and results_c:
         speedup = avg([r[0] for r in results_a]) / avg([r[0] for r in results_c])
         print(f'  C vs A speedup: {speedup:.1f}x')
+    if results_a and results_d:
+        speedup = avg([r[0] for r in results_a]) / avg([runs[0][0] for runs in results_d])
+        print(f'  D (nothing changed) vs A speedup: {speedup:.1f}x')
 
 
 # ---------------------------------------------------------------------------
@@ -326,6 +376,10 @@ def main():
                         help='Skip Path A (existing seed_children) — useful for read-only envs')
     parser.add_argument('--analyse-only', action='store_true',
                         help='Only print reference distribution analysis, no timing')
+    parser.add_argument('--delta', action='store_true',
+                        help='Also run Path D (delta re-evaluation of an already evaluated expansion)')
+    parser.add_argument('--delta-refs', dest='delta_refs', type=int, default=1,
+                        help='Number of refs touched before the last Path D re-evaluation (default: 1)')
     args = parser.parse_args()
 
     collection_version = resolve_collection_version(args.collection_uri)
@@ -336,7 +390,7 @@ def main():
     if args.analyse_only:
         return
 
-    results_a, results_b, results_c = [], [], []
+    results_a, results_b, results_c, results_d = [], [], [], []
 
     for i in range(1, args.runs + 1):
         separator(f'Run {i} / {args.runs}')
@@ -349,7 +403,10 @@ def main():
         if repo_versions:
             results_c.append(bench_on_the_fly_per_repo(collection_version, repo_versions, i))
 
-    print_summary(results_a, results_b, results_c)
+        if args.delta:
+            results_d.append(bench_delta_reevaluation(collection_version, i, args.delta_refs))
+
+    print_summary(results_a, results_b, results_c, results_d)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks OFFSET slicing vs keyset (seek) pagination over a repo version's concepts.
+
+Walks the same queryset batch by batch:
+  [A] OFFSET  — queryset.order_by('-id')[start:start + batch_size] (previous behaviour)
+  [B] Keyset  — core.common.utils.keyset_batches (WHERE id < last_seen ORDER BY id DESC LIMIT n)
+  [C] Keyset with server side cursor — keyset_batches(..., server_side_cursor=True)
+
+Prints time per batch for the first, middle and last batches, so it is easy to see that
+OFFSET batches get slower the deeper they go while keyset batches stay flat. Read-only.
+
+Usage (inside the api container, or any env with DJANGO_SETTINGS_MODULE set):
+    python tools/benchmark_keyset_pagination.py <repo_version_uri> [--batch-size N] [--mappings]
+
+Examples:
+    python tools/benchmark_keyset_pagination.py /orgs/CIEL/sources/CIEL/
+    python tools/benchmark_keyset_pagination.py /orgs/CIEL/sources/CIEL/v2024-01-01/ --batch-size 500 --mappings
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from django.db import transaction  # noqa: E402
+
+from core.common.utils import keyset_batches  # noqa: E402
+from core.sources.models import Source  # noqa: E402
+
+
+def resolve_source_version(uri):
+    version, _ = Source.resolve_reference_expression(uri)
+    if not version.id:
+        print(f'ERROR: Could not resolve: {uri}')
+        sys.exit(1)
+    return version
+
+
+def offset_batches(queryset, batch_size):
+    start = 0
+    queryset = queryset.order_by('-id').values_list('id', flat=True)
+    while True:
+        batch = list(queryset[start:start + batch_size])
+        if not batch:
+            break
+        yield batch
+        start += batch_size
+
+
+def time_batches(batches):
+    timings = []
+    total = 0
+    t0 = time.perf_counter()
+    for batch in batches:
+        elapsed = time.perf_counter() - t0
+        timings.append(elapsed)
+        total += len(batch)
+        t0 = time.perf_counter()
+    return timings, total
+
+
+def report(tag, timings, total):
+    print(f'\n  {tag}')
+    if not timings:
+        print('    no rows')
+        return
+    middle = len(timings) // 2
+    print(f'    rows        : {total}')
+    print(f'    batches     : {len(timings)}')
+    print(f'    total       : {sum(timings):.3f}s')
+    print(f'    first batch : {timings[0] * 1000:.2f}ms')
+    print(f'    mid batch   : {timings[middle] * 1000:.2f}ms')
+    print(f'    last batch  : {timings[-1] * 1000:.2f}ms')
+    print(f'    last/first  : {timings[-1] / timings[0]:.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OFFSET vs keyset pagination')
+    parser.add_argument('repo_version_uri', help='Source version URI')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--mappings', action='store_true', help='Walk mappings instead of concepts')
+    args = parser.parse_args()
+
+    version = resolve_source_version(args.repo_version_uri)
+    queryset = version.get_mappings_queryset() if args.mappings else version.get_concepts_queryset()
+    print(f'\nRepo version : {version.uri}')
+    print(f'Resource     : {"mappings" if args.mappings else "concepts"}')
+    print(f'Batch size   : {args.batch_size}')
+
+    report('[A] OFFSET', *time_batches(offset_batches(queryset, args.batch_size)))
+    report('[B] Keyset', *time_batches(keyset_batches(queryset, args.batch_size, flat=True)))
+    with transaction.atomic():  # server side cursors only live inside a transaction
+        report('[C] Keyset (server side cursor)', *time_batches(
+            keyset_batches(queryset, args.batch_size, flat=True, server_side_cursor=True)))
+
+
+if __name__ == '__main__':
+    main()